@@ -81,17 +81,31 @@ class Settings(BaseSettings):
     reranker_type: str = "vertex_ai_ranking_api"
     reranker_model: str = "semantic-ranker-default-004"  # または semantic-ranker-fast-004
     reranker_top_n: int = 10
+    reranker_timeout: float = 10.0  # Ranking API呼び出しのタイムアウト（秒）
+    reranker_max_workers: int = 8  # 非同期リランキング用スレッドプールのワーカー数
+    reranker_max_chunks: int = 3  # 200件超の候補を分割リランキングする最大チャンク数（1=分割しない）
 
     # Hybrid Search設定
     search_bm25_top_k: int = 500  # BM25で取得する候補数
     search_dense_top_k: int = 50  # Dense Retrievalで取得する候補数
     search_final_top_k: int = 10  # 最終的に返す結果数
+    search_rerank_candidates: int = 50  # リランキングに送る候補数（200件超はチャンク分割）
     search_bm25_weight: float = 0.3
     search_dense_weight: float = 0.7
 
+    # Dense Retrievalインデックス設定
+    dense_index_type: Literal["exact", "flat", "ivf", "int8"] = "exact"  # exact=Embedding行列の全件スキャン
+    dense_index_path: str = ""  # インデックス保存先（.npz、空の場合は保存・読み込みしない）
+    dense_ivf_nlist: int = 0  # IVFリスト数（0=sqrt(N)で自動決定）
+    dense_ivf_nprobe: int = 16  # 検索時に走査するリスト数（大きいほど高recall・高レイテンシ）
+    dense_int8_rescore_factor: int = 4  # int8検索後にフル精度で再スコアリングする倍率（top_k x N件）
+    dense_coarse_dimension: int = 0  # Matryoshka粗検索の次元数（0=無効、256/512推奨、exact時のみ）
+    dense_coarse_candidates: int = 300  # 粗検索後に全次元で再スコアリングする候補数
+
     # 医療用語処理設定
     medical_terms_cache_ttl: int = 3600  # 1時間
     medical_terms_max_synonyms: int = 10
+    medical_terms_fuzzy_min_similarity: float = 0.6  # n-gram類似用語提案の類似度下限（0〜1、1 - 編集距離 / (用語の文字数 + 1)）
 
     # チャット設定
     chat_max_history: int = 10
@@ -109,9 +123,18 @@ class Settings(BaseSettings):
     cache_embeddings_ttl: int = 86400  # 24時間（Embeddings）
     cache_vector_db_ttl: int = 3600  # 1時間（Vector DBデータ）
     cache_search_results_ttl: int = 1800  # 30分（検索結果）
+    cache_rerank_ttl: int = 1800  # 30分（リランキングスコア、0=無効）
+    embedding_disk_cache_path: str = ""  # クエリEmbeddingのディスクキャッシュ（SQLite、同一ホストのワーカー間で共有、空の場合は無効）
+    embedding_disk_cache_max_entries: int = 100000  # ディスクキャッシュの最大エントリ数（LRU）
     cache_cleanup_interval: int = 600  # 10分（クリーンアップ間隔）
     cache_max_size: int = 1000  # 最大キャッシュエントリ数
 
+    # Embeddingスナップショット設定（バイナリ + mmap）
+    embedding_snapshot_dir: str = ""  # スナップショットディレクトリ（空の場合はEmbeddingsシートを直接読み込み）
+    snapshot_refresh_enabled: bool = False  # KnowledgeBase/Embeddingsをバックグラウンドで定期更新（stale-while-revalidate）
+    snapshot_refresh_interval: int = 3600  # バックグラウンド更新の間隔（秒）
+    snapshot_max_stale: int = 86400  # 更新失敗が続いた場合に古いスナップショットを提供し続ける最大秒数
+
     # モニタリング設定
     enable_cloud_logging: bool = True
     enable_cloud_monitoring: bool = True
@@ -131,6 +154,17 @@ class Settings(BaseSettings):
     firestore_vector_field: str = "embedding"  # Embeddingフィールド名
     firestore_vector_distance_measure: str = "COSINE"  # 距離計算方法
     firestore_vector_max_results: int = 1000  # 最大結果数
+    firestore_vector_result_fields: list[str] = [
+        "id", "domain", "source_type", "source_table", "source_id", "user_id", "user_name",
+        "title", "content", "structured_data", "metadata", "tags", "date", "created_at",
+    ]  # 検索・取得で返すフィールド（Embeddingは常に除外）
+    firestore_vector_distance_result_field: str = "vector_distance"  # ベクトル距離の出力フィールド名
+    firestore_batch_get_size: int = 100  # get_all 1回あたりのドキュメント数（ハイブリッド検索の候補取得）
+    firestore_batch_get_concurrency: int = 4  # get_all の同時実行数
+
+    # VectorStore設定
+    vector_store_backend: Literal["", "spreadsheet", "firestore", "mysql", "local"] = ""  # 空の場合は既存フラグ（V3→mysql、Firestore→firestore）から決定
+    local_vector_store_dir: str = "./data/local_vector_store"  # local: SQLiteメタデータ + float32ベクトルファイルの保存先
 
     # LangSmith設定
     langchain_tracing_v2: bool = False  # LangSmithトレーシング有効化
@@ -168,6 +202,9 @@ class Settings(BaseSettings):
     mysql_read_timeout: int = 30  # 読み取りタイムアウト（秒）
     mysql_write_timeout: int = 30  # 書き込みタイムアウト（秒）
 
+    # MySQL ベクトル設定
+    mysql_vector_param_format: Literal["binary", "json"] = "binary"  # ベクトルのバインド形式（binary=float32バイナリ 8KB、json=JSON文字列 約40KB）
+
     # V3機能フラグ
     use_rag_engine_v3: bool = False  # RAG Engine V3使用フラグ（段階的移行）
     prompt_optimizer_enabled: bool = False  # プロンプト最適化有効化
@@ -181,6 +218,10 @@ class Settings(BaseSettings):
     # V3検索設定
     v3_vector_search_limit: int = 100  # Vector Searchで取得する候補数
     v3_rerank_top_n: int = 20  # リランキング後の最終結果数（V2: 10件 → V3: 20件）
+    v3_dense_backend: Literal["mysql", "local_index", "vector_store"] = "mysql"  # local_index=インプロセスANN（dense_index_path）、vector_store=VectorStore経由（vector_store_backend）
+    v3_two_phase_search: bool = False  # True=距離順のID・本文のみで候補取得し、最終結果のみ全カラムを取得
+    v3_hybrid_search: bool = False  # True=FULLTEXT（ngram）とVector Searchを1クエリで取得しRRF統合
+    v3_fulltext_limit: int = 100  # ハイブリッド検索でFULLTEXT側から取得する候補数（統合後はベクトル側と合わせ最大 v3_vector_search_limit + この件数をリランキング）
 
 
 @lru_cache()
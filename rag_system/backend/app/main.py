@@ -29,6 +29,9 @@ settings = get_settings()
 # グローバル変数：クリーンアップタスク
 _cleanup_task = None
 
+# グローバル変数：スナップショット更新タスク
+_snapshot_refresh_task = None
+
 
 async def cache_cleanup_task():
     """
@@ -50,6 +53,28 @@ async def cache_cleanup_task():
             logger.error(f"Cache cleanup error: {e}", exc_info=True)
 
 
+async def snapshot_refresh_task():
+    """
+    スナップショット更新タスク（バックグラウンド）
+
+    起動直後と `snapshot_refresh_interval` ごとにKnowledgeBase・Embedding行列・
+    インデックスを再構築して差し替えます。構築はスレッドで実行し、イベントループを塞ぎません。
+    """
+    from app.services.snapshot_refresher import get_snapshot_refresher
+
+    refresher = get_snapshot_refresher()
+    refresh_interval = settings.snapshot_refresh_interval
+
+    logger.info(f"🔄 Snapshot refresh task started (interval: {refresh_interval}s)")
+
+    while True:
+        try:
+            await asyncio.to_thread(refresher.refresh)
+        except Exception as e:
+            logger.error(f"Snapshot refresh error: {e}", exc_info=True)
+        await asyncio.sleep(refresh_interval)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -57,7 +82,7 @@ async def lifespan(app: FastAPI):
 
     起動時と終了時に実行される処理を定義します。
     """
-    global _cleanup_task
+    global _cleanup_task, _snapshot_refresh_task
 
     # 起動時処理
     logger.info("=" * 60)
@@ -115,6 +140,10 @@ async def lifespan(app: FastAPI):
     if settings.cache_enabled:
         _cleanup_task = asyncio.create_task(cache_cleanup_task())
 
+    # スナップショット更新タスクを開始（stale-while-revalidate）
+    if settings.snapshot_refresh_enabled and settings.cache_enabled:
+        _snapshot_refresh_task = asyncio.create_task(snapshot_refresh_task())
+
     yield
 
     # 終了時処理
@@ -141,6 +170,14 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             logger.info("Cache cleanup task stopped")
 
+    # スナップショット更新タスクを停止
+    if _snapshot_refresh_task:
+        _snapshot_refresh_task.cancel()
+        try:
+            await _snapshot_refresh_task
+        except asyncio.CancelledError:
+            logger.info("Snapshot refresh task stopped")
+
     # キャッシュをクリア
     if settings.cache_enabled:
         cache = get_cache_service()
@@ -75,6 +75,14 @@ async def health_check():
             }
             logger.error(f"❌ MySQL health check failed: {e}", exc_info=True)
 
+    # スナップショットのバックグラウンド更新状況
+    if settings.snapshot_refresh_enabled:
+        from app.services.snapshot_refresher import get_snapshot_refresher
+
+        refresher = get_snapshot_refresher()
+        checks["snapshot"] = not refresher.is_stale()
+        details["snapshot_refresh"] = refresher.status()
+
     all_healthy = all(checks.values())
 
     return HealthResponse(
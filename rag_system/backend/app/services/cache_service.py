@@ -2,13 +2,16 @@
 キャッシュサービス
 
 API使用量を削減するためのキャッシュ機能を提供します。
+同一キーへの同時キャッシュミスは single-flight で1回のロードに集約します。
 """
 
+import asyncio
 import hashlib
 import json
 import logging
+import threading
 import time
-from typing import Any, Dict, List, Optional, Callable
+from typing import Any, Awaitable, Dict, List, Optional, Callable, Tuple
 from datetime import datetime, timedelta
 from functools import wraps
 
@@ -43,6 +46,140 @@ class CacheEntry:
         return self.value
 
 
+class _InFlightCall:
+    """実行中のロード（single-flight）"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # ロード本体のタスク（do_async、呼び出し側のキャンセルから切り離して保持）
+        self.task: Optional[asyncio.Task] = None
+        # 完了を待つasyncioタスク（イベントループ, Future）
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+
+def _resolve_future(future: asyncio.Future, result: Any, error: Optional[BaseException]):
+    """待機中のFutureに結果を設定（待機側がキャンセル済みの場合は何もしない）"""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class SingleFlight:
+    """
+    同一キーの同時実行を1回に集約するプリミティブ
+
+    スレッド（Executor含む）とasyncioタスクのどちらから呼び出しても、
+    同じキーで実行中のロードがあればその完了を待って結果（または例外）を共有します。
+    非同期のロードは呼び出し元から切り離したタスクで実行するため、
+    最初の呼び出し元（リーダー）がキャンセルされても他の待機者には影響しません。
+    """
+
+    def __init__(self):
+        """初期化"""
+        self._calls: Dict[str, _InFlightCall] = {}
+        self._lock = threading.Lock()
+        self.shared_count = 0
+
+    def _join_or_lead(self, key: str) -> Tuple[_InFlightCall, bool]:
+        """実行中のロードに参加、無ければ新規に登録（戻り値: (call, リーダーか)）"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared_count += 1
+                return call, False
+            call = _InFlightCall()
+            self._calls[key] = call
+            return call, True
+
+    def _finish(self, key: str, call: _InFlightCall, result: Any, error: Optional[BaseException]):
+        """ロード完了を通知"""
+        with self._lock:
+            call.result = result
+            call.error = error
+            self._calls.pop(key, None)
+            waiters = call.waiters
+            call.waiters = []
+            call.done.set()
+
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve_future, future, result, error)
+            except RuntimeError:
+                # 待機側のイベントループが終了済み
+                pass
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        同期関数を single-flight で実行
+
+        Args:
+            key: 集約キー
+            fn: ロード関数
+
+        Returns:
+            ロード結果（同時に呼ばれた全員で共有）
+        """
+        call, leader = self._join_or_lead(key)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, call, None, e)
+            raise
+        self._finish(key, call, result, None)
+        return result
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        コルーチン関数を single-flight で実行
+
+        Args:
+            key: 集約キー
+            fn: ロード関数（awaitableを返す）
+
+        Returns:
+            ロード結果（同時に呼ばれた全員で共有）
+        """
+        call, leader = self._join_or_lead(key)
+
+        if not leader:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self._lock:
+                if call.done.is_set():
+                    _resolve_future(future, call.result, call.error)
+                else:
+                    call.waiters.append((loop, future))
+            # 待機側のキャンセルがロード本体に波及しないよう shield
+            return await asyncio.shield(future)
+
+        # ロード本体はどの呼び出し元にも属さないタスクで実行し、リーダーも完了を待つだけにする
+        # （リーダーのキャンセル＝クライアント切断等が待機者に CancelledError として伝播しない）
+        call.task = asyncio.ensure_future(fn())
+        call.task.add_done_callback(lambda task: self._finish_task(key, call, task))
+        return await asyncio.shield(call.task)
+
+    def _finish_task(self, key: str, call: _InFlightCall, task: asyncio.Task):
+        """ロードタスク完了時に待機者へ結果を通知（CancelledErrorは共有しない）"""
+        if task.cancelled():
+            # イベントループ終了等でロード自体が中断された場合も、待機者には通常の例外として通知
+            self._finish(key, call, None, RuntimeError(f"Single-flight load was cancelled: {key}"))
+            return
+        error = task.exception()
+        self._finish(key, call, None if error is not None else task.result(), error)
+
+
 class CacheService:
     """キャッシュサービス"""
 
@@ -55,6 +192,9 @@ class CacheService:
         """
         self._cache: Dict[str, CacheEntry] = {}
         self._max_size = max_size
+        # 辞書操作の排他（Executorスレッドからも呼ばれるため）
+        self._lock = threading.RLock()
+        self._single_flight = SingleFlight()
         self._metrics = {
             "hits": 0,
             "misses": 0,
@@ -105,26 +245,27 @@ class CacheService:
         Returns:
             キャッシュされた値、存在しない場合はNone
         """
-        self._metrics["total_requests"] += 1
         cache_key = self._generate_key(namespace, key)
 
-        if cache_key not in self._cache:
-            self._metrics["misses"] += 1
-            logger.debug(f"Cache miss: {cache_key}")
-            return None
+        with self._lock:
+            self._metrics["total_requests"] += 1
 
-        entry = self._cache[cache_key]
+            entry = self._cache.get(cache_key)
+            if entry is None:
+                self._metrics["misses"] += 1
+                logger.debug(f"Cache miss: {cache_key}")
+                return None
 
-        if entry.is_expired():
-            self._metrics["misses"] += 1
-            self._metrics["evictions"] += 1
-            del self._cache[cache_key]
-            logger.debug(f"Cache expired: {cache_key}")
-            return None
+            if entry.is_expired():
+                self._metrics["misses"] += 1
+                self._metrics["evictions"] += 1
+                del self._cache[cache_key]
+                logger.debug(f"Cache expired: {cache_key}")
+                return None
 
-        self._metrics["hits"] += 1
-        logger.debug(f"Cache hit: {cache_key} (hits: {entry.hits + 1})")
-        return entry.get_value()
+            self._metrics["hits"] += 1
+            logger.debug(f"Cache hit: {cache_key} (hits: {entry.hits + 1})")
+            return entry.get_value()
 
     def _evict_lru(self):
         """LRU（Least Recently Used）に基づいて古いエントリを削除"""
@@ -151,13 +292,109 @@ class CacheService:
             value: 値
             ttl: 有効期限（秒）、デフォルト1時間
         """
-        # キャッシュサイズチェック
-        self._evict_lru()
-
         cache_key = self._generate_key(namespace, key)
-        self._cache[cache_key] = CacheEntry(value, ttl)
+
+        with self._lock:
+            # キャッシュサイズチェック（上書きの場合は削除不要）
+            if cache_key not in self._cache:
+                self._evict_lru()
+
+            self._cache[cache_key] = CacheEntry(value, ttl)
         logger.debug(f"Cache set: {cache_key} (ttl: {ttl}s)")
 
+    def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: int = 3600
+    ) -> Any:
+        """
+        キャッシュから取得し、ミスの場合はロードして保存（同時ミスは1回のロードに集約）
+
+        Args:
+            namespace: 名前空間
+            key: キー
+            loader: ロード関数
+            ttl: 有効期限（秒）
+
+        Returns:
+            キャッシュまたはロードした値
+        """
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+
+        def load():
+            # 先行ロードの完了直後に参加した場合はキャッシュ済みの値を使用
+            cached_value = self.get(namespace, key)
+            if cached_value is not None:
+                return cached_value
+            result = loader()
+            self.set(namespace, key, result, ttl)
+            return result
+
+        return self._single_flight.do(self._generate_key(namespace, key), load)
+
+    async def get_or_load_async(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int = 3600
+    ) -> Any:
+        """
+        get_or_load の非同期版
+
+        Args:
+            namespace: 名前空間
+            key: キー
+            loader: ロード関数（awaitableを返す）
+            ttl: 有効期限（秒）
+
+        Returns:
+            キャッシュまたはロードした値
+        """
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+
+        async def load():
+            cached_value = self.get(namespace, key)
+            if cached_value is not None:
+                return cached_value
+            result = await loader()
+            self.set(namespace, key, result, ttl)
+            return result
+
+        return await self._single_flight.do_async(self._generate_key(namespace, key), load)
+
+    def single_flight(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        同一キーの同時実行を1回に集約して実行（キャッシュ保存は呼び出し側で行う場合）
+
+        Args:
+            key: 集約キー
+            fn: 実行する関数
+
+        Returns:
+            実行結果
+        """
+        return self._single_flight.do(key, fn)
+
+    async def single_flight_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        single_flight の非同期版
+
+        Args:
+            key: 集約キー
+            fn: 実行する関数（awaitableを返す）
+
+        Returns:
+            実行結果
+        """
+        return await self._single_flight.do_async(key, fn)
+
     def delete(self, namespace: str, key: str):
         """
         キャッシュから値を削除
@@ -167,9 +404,9 @@ class CacheService:
             key: キー
         """
         cache_key = self._generate_key(namespace, key)
-        if cache_key in self._cache:
-            del self._cache[cache_key]
-            logger.debug(f"Cache deleted: {cache_key}")
+        with self._lock:
+            if self._cache.pop(cache_key, None) is not None:
+                logger.debug(f"Cache deleted: {cache_key}")
 
     def clear(self, namespace: Optional[str] = None):
         """
@@ -178,26 +415,28 @@ class CacheService:
         Args:
             namespace: 名前空間（指定しない場合は全てクリア）
         """
-        if namespace is None:
-            count = len(self._cache)
-            self._cache.clear()
-            logger.info(f"Cache cleared: {count} entries")
-        else:
-            prefix = f"{namespace}:"
-            keys_to_delete = [key for key in self._cache.keys() if key.startswith(prefix)]
-            for key in keys_to_delete:
-                del self._cache[key]
-            logger.info(f"Cache cleared for namespace '{namespace}': {len(keys_to_delete)} entries")
+        with self._lock:
+            if namespace is None:
+                count = len(self._cache)
+                self._cache.clear()
+                logger.info(f"Cache cleared: {count} entries")
+            else:
+                prefix = f"{namespace}:"
+                keys_to_delete = [key for key in self._cache.keys() if key.startswith(prefix)]
+                for key in keys_to_delete:
+                    del self._cache[key]
+                logger.info(f"Cache cleared for namespace '{namespace}': {len(keys_to_delete)} entries")
 
     def cleanup_expired(self):
         """期限切れのキャッシュを削除"""
-        keys_to_delete = [
-            key for key, entry in self._cache.items()
-            if entry.is_expired()
-        ]
-        for key in keys_to_delete:
-            del self._cache[key]
-            self._metrics["evictions"] += 1
+        with self._lock:
+            keys_to_delete = [
+                key for key, entry in self._cache.items()
+                if entry.is_expired()
+            ]
+            for key in keys_to_delete:
+                del self._cache[key]
+                self._metrics["evictions"] += 1
 
         if keys_to_delete:
             logger.info(f"Cleaned up {len(keys_to_delete)} expired cache entries")
@@ -209,16 +448,18 @@ class CacheService:
         Returns:
             メトリクス情報
         """
-        total = self._metrics["total_requests"]
-        hits = self._metrics["hits"]
-        hit_rate = (hits / total * 100) if total > 0 else 0
-
-        return {
-            **self._metrics,
-            "hit_rate": round(hit_rate, 2),
-            "cache_size": len(self._cache),
-            "total_hits_in_cache": sum(entry.hits for entry in self._cache.values())
-        }
+        with self._lock:
+            total = self._metrics["total_requests"]
+            hits = self._metrics["hits"]
+            hit_rate = (hits / total * 100) if total > 0 else 0
+
+            return {
+                **self._metrics,
+                "hit_rate": round(hit_rate, 2),
+                "cache_size": len(self._cache),
+                "total_hits_in_cache": sum(entry.hits for entry in self._cache.values()),
+                "single_flight_shared": self._single_flight.shared_count
+            }
 
     def get_cache_info(self, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -231,7 +472,10 @@ class CacheService:
             キャッシュエントリ情報のリスト
         """
         info = []
-        for key, entry in self._cache.items():
+        with self._lock:
+            entries = list(self._cache.items())
+
+        for key, entry in entries:
             if namespace is None or key.startswith(f"{namespace}:"):
                 info.append({
                     "key": key,
@@ -292,19 +536,13 @@ def cached(namespace: str, ttl: int = 3600, key_func: Optional[Callable] = None)
                 key_data = {"args": args, "kwargs": kwargs}
                 key = cache._hash_key(key_data)
 
-            # キャッシュから取得
-            cached_value = cache.get(namespace, key)
-            if cached_value is not None:
-                logger.debug(f"Returning cached result for {func.__name__}")
-                return cached_value
-
-            # 関数実行
-            result = func(*args, **kwargs)
-
-            # キャッシュに保存
-            cache.set(namespace, key, result, ttl)
-
-            return result
+            # キャッシュから取得（ミスの場合は同時呼び出しを1回の実行に集約）
+            return cache.get_or_load(
+                namespace,
+                key,
+                lambda: func(*args, **kwargs),
+                ttl
+            )
 
         return wrapper
     return decorator
@@ -337,19 +575,13 @@ def async_cached(namespace: str, ttl: int = 3600, key_func: Optional[Callable] =
                 key_data = {"args": args, "kwargs": kwargs}
                 key = cache._hash_key(key_data)
 
-            # キャッシュから取得
-            cached_value = cache.get(namespace, key)
-            if cached_value is not None:
-                logger.debug(f"Returning cached result for {func.__name__}")
-                return cached_value
-
-            # 関数実行
-            result = await func(*args, **kwargs)
-
-            # キャッシュに保存
-            cache.set(namespace, key, result, ttl)
-
-            return result
+            # キャッシュから取得（ミスの場合は同時呼び出しを1回の実行に集約）
+            return await cache.get_or_load_async(
+                namespace,
+                key,
+                lambda: func(*args, **kwargs),
+                ttl
+            )
 
         return wrapper
     return decorator
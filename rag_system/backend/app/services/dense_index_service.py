@@ -0,0 +1,262 @@
+"""
+Denseインデックスサービス
+
+設定（`dense_index_type`）に応じたインプロセスANNインデックスを管理します。
+IVF/Flatインデックスはディスク（`dense_index_path`）から読み込むか、Embedding行列から構築し、
+新しいスナップショットが来た場合は差分（追加・削除・ベクトルが変わったIDの入れ替え）のみを反映します。
+差分は公開中のインデックスの複製に適用し、反映後に参照を差し替えるため、
+ロックなしで実行中の検索が更新途中のインデックスを参照することはありません。
+int8量子化ストアはスナップショットごとに量子化し直します（線形時間）。
+int8の常駐メモリ削減はEmbeddingスナップショット（`embedding_snapshot_dir`）から読み込んだ行列のみで、
+フル精度ベクトルは`.npy`から遅延mmapします。Spreadsheetから構築した行列は再スコアリング用に共有参照します。
+"""
+
+import logging
+import os
+import threading
+from typing import List, Optional, Union
+
+import numpy as np
+
+from app.config import get_settings
+from app.utils.ann_index import IVFIndex, build_dense_index
+from app.utils.embedding_matrix import EmbeddingMatrix
+from app.utils.embedding_snapshot import load_embedding_snapshot, snapshot_matrix_path
+from app.utils.quantization import Int8VectorStore
+
+# Denseインデックス（共通インターフェース: search / __len__ / source_version）
+DenseIndex = Union[IVFIndex, Int8VectorStore]
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class DenseIndexService:
+    """Denseインデックス管理サービス"""
+
+    def __init__(self):
+        """初期化"""
+        self._index: Optional[DenseIndex] = None
+        self._source: Optional[EmbeddingMatrix] = None
+        self._lock = threading.Lock()
+
+        logger.info(f"Dense Index Service initialized (type: {settings.dense_index_type})")
+
+    @property
+    def enabled(self) -> bool:
+        """インデックス使用が有効か（exactの場合は行列の全件スキャン）"""
+        return settings.dense_index_type != "exact"
+
+    def get_index(self, matrix: Optional[EmbeddingMatrix] = None) -> Optional[DenseIndex]:
+        """
+        インデックスを取得
+
+        Args:
+            matrix: 同期元のEmbedding行列（Noneの場合はディスクから読み込んだインデックスをそのまま使用）
+
+        Returns:
+            Denseインデックス（無効または未構築の場合はNone）
+        """
+        if not self.enabled:
+            return None
+
+        if matrix is None or self._source is matrix:
+            if self._index is None:
+                with self._lock:
+                    if self._index is None:
+                        self._index = self._load()
+            return self._index
+
+        with self._lock:
+            if self._source is matrix:
+                return self._index
+
+            index = self.build_index(matrix)
+            self.install(matrix, index)
+            return index
+
+    def build_index(self, matrix: EmbeddingMatrix) -> Optional[DenseIndex]:
+        """
+        Embedding行列に対応するインデックスを構築（公開中のインデックスは変更しない）
+
+        IVF/Flatは公開中（または保存済み）のインデックスの複製に差分を反映し、
+        int8は行列を量子化します。公開は `install` で行います。
+
+        Args:
+            matrix: Embedding行列
+
+        Returns:
+            Denseインデックス（無効の場合はNone）
+        """
+        if not self.enabled:
+            return None
+
+        if settings.dense_index_type == "int8":
+            return self._quantize(matrix)
+
+        index = self._index if self._index is not None else self._load()
+
+        if index is None:
+            index = build_dense_index(
+                settings.dense_index_type,
+                matrix.ids.tolist(),
+                matrix.matrix,
+                nlist=settings.dense_ivf_nlist,
+                nprobe=settings.dense_ivf_nprobe
+            )
+            changed = True
+        elif matrix.version is not None and index.source_version == matrix.version:
+            changed = False
+        else:
+            # 公開中のインデックスはロックなしで検索されるため、差分は複製に適用して差し替える
+            index = index.copy()
+            changed = self._sync(index, matrix)
+
+        index.source_version = matrix.version
+
+        if changed and settings.dense_index_path:
+            index.save(settings.dense_index_path)
+
+        return index
+
+    def install(self, matrix: EmbeddingMatrix, index: Optional[DenseIndex]):
+        """
+        構築済みインデックスを公開（以降の `get_index(matrix)` で返す）
+
+        Args:
+            matrix: 構築元のEmbedding行列
+            index: `build_index` で構築したインデックス
+        """
+        self._index = index
+        self._source = matrix
+
+    def _load(self) -> Optional[DenseIndex]:
+        """ディスクからインデックスを読み込み"""
+        if settings.dense_index_type == "int8":
+            return self._load_int8()
+
+        path = settings.dense_index_path
+        if not path or not os.path.exists(path):
+            return None
+
+        try:
+            return IVFIndex.load(path)
+        except Exception as e:
+            logger.error(f"Failed to load dense index from {path}: {e}", exc_info=True)
+            return None
+
+    def _load_int8(self) -> Optional[Int8VectorStore]:
+        """Embeddingスナップショット（mmap）を量子化して読み込み"""
+        if not settings.embedding_snapshot_dir:
+            return None
+
+        try:
+            matrix = load_embedding_snapshot(settings.embedding_snapshot_dir)
+        except Exception as e:
+            logger.error(f"Failed to load embedding snapshot: {e}", exc_info=True)
+            return None
+
+        if matrix is None:
+            return None
+
+        return self._quantize(matrix)
+
+    @staticmethod
+    def _quantize(matrix: EmbeddingMatrix) -> Int8VectorStore:
+        """
+        行列をint8量子化（スナップショット由来の場合はフル精度ベクトルを`.npy`から遅延mmap）
+
+        Args:
+            matrix: Embedding行列
+
+        Returns:
+            Int8VectorStore
+        """
+        full_precision_path = None
+        if matrix.version is not None and settings.embedding_snapshot_dir:
+            path = snapshot_matrix_path(settings.embedding_snapshot_dir, matrix.version)
+            if path.exists():
+                full_precision_path = path
+
+        return Int8VectorStore.from_matrix(
+            matrix,
+            full_precision_path=full_precision_path,
+            rescore_factor=settings.dense_int8_rescore_factor
+        )
+
+    @staticmethod
+    def _sync(index: IVFIndex, matrix: EmbeddingMatrix) -> bool:
+        """
+        インデックスをEmbedding行列に合わせて差分更新（未公開のインデックスに対して呼び出す）
+
+        IDの追加・削除に加え、両方に存在するIDのベクトルを比較し、
+        再Embeddingされた（ベクトルが変わった）IDを入れ替えます。
+
+        Returns:
+            変更があった場合True
+        """
+        removed_ids = [doc_id for doc_id in index.ids() if doc_id not in matrix.row_of]
+        added_ids = [doc_id for doc_id in matrix.row_of if doc_id not in index]
+        updated_ids = DenseIndexService._changed_ids(index, matrix)
+
+        index.remove(removed_ids)
+        if added_ids or updated_ids:
+            # add は既存IDを置き換える
+            upserted_ids = added_ids + updated_ids
+            rows = matrix.rows_for(upserted_ids)
+            index.add(upserted_ids, matrix.matrix[rows])
+
+        changed = bool(removed_ids or added_ids or updated_ids)
+        if changed:
+            logger.info(
+                f"Dense index synced - Added: {len(added_ids)}, Updated: {len(updated_ids)}, "
+                f"Removed: {len(removed_ids)}, Total: {len(index)}"
+            )
+
+        return changed
+
+    @staticmethod
+    def _changed_ids(
+        index: IVFIndex,
+        matrix: EmbeddingMatrix,
+        chunk_size: int = 65536,
+        tolerance: float = 1e-5
+    ) -> List[str]:
+        """
+        インデックスと行列の両方に存在し、ベクトルが異なるIDを取得（チャンク単位で比較）
+
+        Args:
+            index: IVFインデックス
+            matrix: Embedding行列（正規化済み）
+            chunk_size: 一度に比較するベクトル数
+            tolerance: 要素ごとの許容誤差
+
+        Returns:
+            ベクトルが変わったIDのリスト
+        """
+        shared_ids = [doc_id for doc_id in index.ids() if doc_id in matrix.row_of]
+
+        changed = []
+        for start in range(0, len(shared_ids), chunk_size):
+            chunk_ids = shared_ids[start:start + chunk_size]
+            current = matrix.matrix[matrix.rows_for(chunk_ids)]
+            differs = np.any(np.abs(index.vectors_for(chunk_ids) - current) > tolerance, axis=1)
+            changed.extend(doc_id for doc_id, d in zip(chunk_ids, differs) if d)
+        return changed
+
+
+# モジュールレベルのシングルトン
+_dense_index_service: Optional[DenseIndexService] = None
+
+
+def get_dense_index_service() -> DenseIndexService:
+    """
+    Denseインデックスサービスを取得（シングルトン）
+
+    Returns:
+        DenseIndexService: Denseインデックスサービス
+    """
+    global _dense_index_service
+    if _dense_index_service is None:
+        _dense_index_service = DenseIndexService()
+    return _dense_index_service
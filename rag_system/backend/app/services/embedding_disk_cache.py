@@ -0,0 +1,207 @@
+"""
+クエリEmbedding ディスクキャッシュ
+
+クエリEmbeddingをSQLite（WALモード）にfloat32のバイナリで永続化し、
+同一ホスト上のワーカープロセス間およびプロセス再起動後にEmbedding APIを再呼び出ししないようにします。
+インメモリの CacheService をL1、このキャッシュをL2として使用します。
+
+SQLiteのファイルロックにより、同一ホストのローカルディスク上のファイルを共有する
+複数ワーカー（プロセス）からの同時書き込みにも対応します（WALはネットワークファイルシステムでは動作しません）。
+Cloud Runではインスタンスごとにファイルシステムが独立し（インメモリ）、インスタンス終了時に破棄されるため、
+新しいインスタンスのコールドスタートやスケールアウト後のインスタンス間では共有されません。
+インスタンス間で共有する場合はRedis（Memorystore）やFirestore等の共有ストアが必要です。
+
+エントリ数が上限を超えた場合は最終アクセスが古い順に削除します。
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 最終アクセス時刻の更新間隔（秒）: ヒットごとの書き込みを抑制
+TOUCH_INTERVAL_SECONDS = 60
+
+# LRU削除を実行する書き込み回数の間隔
+PRUNE_EVERY_WRITES = 100
+
+
+class EmbeddingDiskCache:
+    """SQLiteベースのクエリEmbeddingキャッシュ（LRU上限付き）"""
+
+    def __init__(self, path: str, max_entries: int = 100000, busy_timeout: float = 5.0):
+        """
+        初期化
+
+        Args:
+            path: SQLiteファイルパス
+            max_entries: 最大エントリ数（超過時は最終アクセスが古い順に削除）
+            busy_timeout: ロック待ちのタイムアウト（秒）
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.busy_timeout = busy_timeout
+
+        # スレッドごとの接続（sqlite3接続はスレッド間で共有しない）
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    key TEXT PRIMARY KEY,
+                    dimension INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_access "
+                "ON query_embeddings (last_access)"
+            )
+
+        logger.info(f"Embedding disk cache initialized - Path: {path}, Max entries: {max_entries}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """現在のスレッドの接続を取得（初回のみ作成）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """
+        Embeddingを取得
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            Embedding（未キャッシュ・読み込み失敗時はNone）
+        """
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT dimension, vector, last_access FROM query_embeddings WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            dimension, blob, last_access = row
+            vector = np.frombuffer(blob, dtype=np.float32)
+            if vector.shape[0] != dimension:
+                logger.warning(f"Corrupted embedding cache entry: {key}")
+                return None
+
+            now = time.time()
+            if now - last_access > TOUCH_INTERVAL_SECONDS:
+                conn.execute(
+                    "UPDATE query_embeddings SET last_access = ? WHERE key = ?",
+                    (now, key)
+                )
+
+            return vector.tolist()
+
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache read failed: {e}")
+            return None
+
+    def set(self, key: str, embedding: List[float]):
+        """
+        Embeddingを保存
+
+        Args:
+            key: キャッシュキー
+            embedding: Embedding
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        now = time.time()
+
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings "
+                "(key, dimension, vector, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, vector.shape[0], vector.tobytes(), now, now)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache write failed: {e}")
+            return
+
+        with self._writes_lock:
+            self._writes += 1
+            should_prune = self._writes % PRUNE_EVERY_WRITES == 0
+
+        if should_prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        上限を超えたエントリを最終アクセスが古い順に削除
+
+        Returns:
+            削除したエントリ数
+        """
+        try:
+            conn = self._connection()
+            count = conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            excess = count - self.max_entries
+            if excess <= 0:
+                return 0
+
+            conn.execute(
+                "DELETE FROM query_embeddings WHERE key IN ("
+                "SELECT key FROM query_embeddings ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+            logger.info(f"Embedding disk cache pruned: {excess} entries")
+            return excess
+
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache prune failed: {e}")
+            return 0
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+
+
+# モジュールレベルのシングルトン
+_embedding_disk_cache: Optional[EmbeddingDiskCache] = None
+
+
+def get_embedding_disk_cache() -> Optional[EmbeddingDiskCache]:
+    """
+    クエリEmbedding ディスクキャッシュを取得（シングルトン）
+
+    Returns:
+        EmbeddingDiskCache（`embedding_disk_cache_path` 未設定の場合はNone）
+    """
+    global _embedding_disk_cache
+    if _embedding_disk_cache is None and settings.embedding_disk_cache_path:
+        _embedding_disk_cache = EmbeddingDiskCache(
+            settings.embedding_disk_cache_path,
+            max_entries=settings.embedding_disk_cache_max_entries
+        )
+    return _embedding_disk_cache
@@ -4,15 +4,19 @@ Firestore Vector Search サービス
 Firestore Vector Searchを使用した高速ベクトル検索を提供します。
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 import json
 
+import numpy as np
+
 from google.cloud import firestore
 from google.cloud.firestore_v1.vector import Vector
 from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
 
 from app.config import get_settings
+from app.utils.embedding_matrix import top_k_indices
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -34,26 +38,60 @@ class FirestoreVectorClient:
         self.distance_measure = DistanceMeasure.COSINE  # コサイン類似度
         self.max_results = 1000  # Firestore制限
 
+        # 取得フィールド（Embeddingはダウンロードしない）とベクトル距離の出力フィールド
+        self.result_fields = [
+            field for field in settings.firestore_vector_result_fields
+            if field != self.vector_field
+        ]
+        self.distance_result_field = settings.firestore_vector_distance_result_field
+
         logger.info(
             f"Firestore Vector client initialized - Collection: {self.collection_name}"
         )
 
+    def _projection(self, fields: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        取得するフィールドのリスト（Embeddingフィールドは常に除外）
+
+        Args:
+            fields: 呼び出し元が指定するフィールド（Noneの場合は設定値）
+
+        Returns:
+            フィールドパスのリスト
+        """
+        if fields is None:
+            return list(self.result_fields)
+        return [field for field in fields if field != self.vector_field]
+
+    def _to_similarity(self, distance: float) -> float:
+        """ベクトル距離を類似度（大きいほど近い）に変換"""
+        if self.distance_measure == DistanceMeasure.COSINE:
+            return 1 - distance
+        if self.distance_measure == DistanceMeasure.DOT_PRODUCT:
+            return distance
+        return 1 / (1 + distance)  # EUCLIDEAN
+
     async def vector_search(
         self,
         query_vector: List[float],
         limit: int = 10,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        fields: Optional[Sequence[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         ベクトル類似度検索
 
+        `select` で指定フィールドのみ取得し（Embeddingは転送しない）、
+        ベクトル距離は `distance_result_field` としてFirestore側で付与させます。
+
         Args:
             query_vector: クエリベクトル（2048次元）
             limit: 取得件数（最大1000）
             filters: フィルタ条件（domain, user_id など）
+            fields: 取得するフィールド（Noneの場合は firestore_vector_result_fields）
 
         Returns:
-            検索結果リスト（類似度順）
+            検索結果リスト（類似度順、`_distance` / `_similarity` 付き）
 
         Example:
             results = await client.vector_search(
@@ -66,21 +104,23 @@ class FirestoreVectorClient:
             # クエリベクトルをVector型に変換
             vector_query_obj = Vector(query_vector)
 
-            # ベクトル検索クエリ構築
-            collection_ref = self.db.collection(self.collection_name)
-            vector_query = collection_ref.find_nearest(
+            # フィルタ適用（find_nearest の前に適用する必要がある）
+            query = self.db.collection(self.collection_name)
+            if filters:
+                for key, value in filters.items():
+                    if value:  # 空でないフィルタのみ適用
+                        query = query.where(key, "==", value)
+
+            # 射影（距離の出力フィールドも含める）とベクトル検索クエリ構築
+            query = query.select([*self._projection(fields), self.distance_result_field])
+            vector_query = query.find_nearest(
                 vector_field=self.vector_field,
                 query_vector=vector_query_obj,
                 distance_measure=self.distance_measure,
-                limit=min(limit, self.max_results)
+                limit=min(limit, self.max_results),
+                distance_result_field=self.distance_result_field
             )
 
-            # フィルタ適用
-            if filters:
-                for key, value in filters.items():
-                    if value:  # 空でないフィルタのみ適用
-                        vector_query = vector_query.where(key, "==", value)
-
             # クエリ実行
             logger.info(f"🔍 Firestore Vector Search: limit={limit}, filters={filters}")
             docs = vector_query.stream()
@@ -90,9 +130,10 @@ class FirestoreVectorClient:
             async for doc in docs:
                 data = doc.to_dict()
 
-                # Vectorフィールドを除外（大きすぎるため）
-                if self.vector_field in data:
-                    del data[self.vector_field]
+                distance = data.pop(self.distance_result_field, None)
+                if distance is not None:
+                    data['_distance'] = float(distance)
+                    data['_similarity'] = self._to_similarity(float(distance))
 
                 # ドキュメントIDを追加
                 data['_firestore_id'] = doc.id
@@ -106,30 +147,30 @@ class FirestoreVectorClient:
             logger.error(f"❌ Firestore Vector Search failed: {e}", exc_info=True)
             raise
 
-    async def get_by_id(self, document_id: str) -> Optional[Dict[str, Any]]:
+    async def get_by_id(
+        self,
+        document_id: str,
+        fields: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         IDでドキュメントを取得
 
         Args:
             document_id: ドキュメントID
+            fields: 取得するフィールド（Noneの場合は firestore_vector_result_fields）
 
         Returns:
             ドキュメント（存在しない場合はNone）
         """
         try:
             doc_ref = self.db.collection(self.collection_name).document(document_id)
-            doc = await doc_ref.get()
+            doc = await doc_ref.get(field_paths=self._projection(fields))
 
             if not doc.exists:
                 logger.warning(f"Document not found: {document_id}")
                 return None
 
             data = doc.to_dict()
-
-            # Vectorフィールドを除外
-            if self.vector_field in data:
-                del data[self.vector_field]
-
             data['_firestore_id'] = doc.id
 
             return data
@@ -138,10 +179,37 @@ class FirestoreVectorClient:
             logger.error(f"Failed to get document {document_id}: {e}", exc_info=True)
             return None
 
+    async def get_by_ids(
+        self,
+        document_ids: List[str],
+        fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        IDリストでドキュメントを一括取得（get_all）
+
+        Args:
+            document_ids: ドキュメントIDリスト
+            fields: 取得するフィールド（Noneの場合は firestore_vector_result_fields）
+
+        Returns:
+            ID -> ドキュメント（存在しないIDは含まない）
+        """
+        documents = {}
+        snapshots = await self._batch_get(
+            list(dict.fromkeys(document_ids)), field_paths=self._projection(fields)
+        )
+        for snapshot in snapshots:
+            data = snapshot.to_dict()
+            data['_firestore_id'] = snapshot.id
+            documents[snapshot.id] = data
+
+        return documents
+
     async def query_with_filters(
         self,
         filters: Dict[str, Any],
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         フィルタ条件のみでクエリ（ベクトル検索なし）
@@ -149,6 +217,7 @@ class FirestoreVectorClient:
         Args:
             filters: フィルタ条件
             limit: 取得件数
+            fields: 取得するフィールド（Noneの場合は firestore_vector_result_fields）
 
         Returns:
             クエリ結果リスト
@@ -162,6 +231,9 @@ class FirestoreVectorClient:
                 if value:
                     query = query.where(key, "==", value)
 
+            # 射影（Embeddingフィールドは取得しない）
+            query = query.select(self._projection(fields))
+
             # リミット適用
             if limit:
                 query = query.limit(limit)
@@ -173,11 +245,6 @@ class FirestoreVectorClient:
             results = []
             async for doc in docs:
                 data = doc.to_dict()
-
-                # Vectorフィールドを除外
-                if self.vector_field in data:
-                    del data[self.vector_field]
-
                 data['_firestore_id'] = doc.id
 
                 results.append(data)
@@ -189,94 +256,125 @@ class FirestoreVectorClient:
             logger.error(f"Failed to query with filters: {e}", exc_info=True)
             raise
 
+    async def _batch_get(
+        self,
+        document_ids: List[str],
+        field_paths: Optional[List[str]] = None
+    ) -> List[Any]:
+        """
+        ドキュメントを get_all で一括取得（チャンク単位、同時実行数を制限）
+
+        Args:
+            document_ids: ドキュメントIDリスト
+            field_paths: 取得するフィールド（フィールドマスク、Noneの場合は全フィールド）
+
+        Returns:
+            存在するドキュメントのスナップショットリスト（順不同）
+        """
+        collection_ref = self.db.collection(self.collection_name)
+        batch_size = settings.firestore_batch_get_size
+        semaphore = asyncio.Semaphore(settings.firestore_batch_get_concurrency)
+
+        async def fetch(chunk: List[str]) -> List[Any]:
+            async with semaphore:
+                refs = [collection_ref.document(doc_id) for doc_id in chunk]
+                return [
+                    snapshot
+                    async for snapshot in self.db.get_all(refs, field_paths=field_paths)
+                    if snapshot.exists
+                ]
+
+        chunks = await asyncio.gather(*(
+            fetch(document_ids[i:i + batch_size])
+            for i in range(0, len(document_ids), batch_size)
+        ))
+
+        return [snapshot for chunk in chunks for snapshot in chunk]
+
     async def hybrid_search(
         self,
         query_vector: List[float],
         bm25_candidates: List[str],
         limit: int = 10,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        fields: Optional[Sequence[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         ハイブリッド検索（BM25候補 + ベクトル類似度）
 
+        Firestoreはin句でのベクトル検索をサポートしていないため、候補をPythonでスコアリングします。
+        1. 候補のベクトル（とフィルタ対象フィールド）のみをフィールドマスク付き get_all で一括取得
+        2. 類似度を1回の行列ベクトル積で計算
+        3. 上位limit件のみ結果フィールドを get_all で一括取得
+
         Args:
             query_vector: クエリベクトル
             bm25_candidates: BM25でフィルタリングされた候補ID リスト
             limit: 取得件数
-            filters: 追加フィルタ
+            filters: 追加フィルタ（完全一致）
+            fields: 取得するフィールド（Noneの場合は firestore_vector_result_fields）
 
         Returns:
-            検索結果リスト（類似度順）
+            検索結果リスト（類似度順、`_similarity` 付き）
         """
         try:
             # BM25候補がない場合は通常のベクトル検索
             if not bm25_candidates:
                 logger.info("No BM25 candidates, fallback to vector search")
-                return await self.vector_search(query_vector, limit, filters)
-
-            # BM25候補をFirestoreで取得
-            logger.info(f"Fetching {len(bm25_candidates)} BM25 candidates from Firestore")
-
-            # バッチ取得（最大500件ずつ）
-            batch_size = 500
-            all_candidates = []
+                return await self.vector_search(query_vector, limit, filters, fields)
 
-            for i in range(0, len(bm25_candidates), batch_size):
-                batch = bm25_candidates[i:i+batch_size]
+            active_filters = {key: value for key, value in (filters or {}).items() if value}
+            candidate_ids = list(dict.fromkeys(bm25_candidates))
 
-                # 候補ドキュメントを取得
-                for doc_id in batch:
-                    doc = await self.get_by_id(doc_id)
-                    if doc:
-                        all_candidates.append(doc)
-
-            if not all_candidates:
-                logger.warning("No valid candidates found in Firestore")
-                return []
+            # Step 1: 候補のベクトルのみ一括取得
+            logger.info(f"Fetching {len(candidate_ids)} BM25 candidate vectors from Firestore")
+            snapshots = await self._batch_get(
+                candidate_ids, field_paths=[self.vector_field, *active_filters]
+            )
 
-            # Firestoreのベクトル検索を候補に対して実行
-            # ※ Firestoreはin句でのベクトル検索をサポートしていないため、
-            # 候補を取得後、Pythonでベクトル類似度を計算
-            from app.services.vertex_ai import compute_cosine_similarity
-
-            # 各候補のベクトルを取得してスコア計算
-            scored_candidates = []
-            for candidate in all_candidates:
-                # Firestoreから完全なドキュメント（ベクトル含む）を取得
-                doc_ref = self.db.collection(self.collection_name).document(
-                    candidate.get('id') or candidate.get('_firestore_id')
-                )
-                full_doc = await doc_ref.get()
-
-                if not full_doc.exists:
+            query = np.asarray(query_vector, dtype=np.float32)
+            ids = []
+            vectors = []
+            for snapshot in snapshots:
+                data = snapshot.to_dict() or {}
+                if any(data.get(key) != value for key, value in active_filters.items()):
                     continue
 
-                full_data = full_doc.to_dict()
-                doc_vector = full_data.get(self.vector_field)
-
-                if not doc_vector:
-                    logger.warning(f"No vector for document: {candidate.get('id')}")
+                doc_vector = data.get(self.vector_field)
+                if not doc_vector or len(doc_vector) != len(query):
+                    logger.warning(f"No valid vector for document: {snapshot.id}")
                     continue
 
-                # ベクトルがVector型の場合、リストに変換
-                if isinstance(doc_vector, Vector):
-                    doc_vector = list(doc_vector)
+                ids.append(snapshot.id)
+                vectors.append(list(doc_vector))
 
-                # コサイン類似度計算
-                similarity = compute_cosine_similarity(query_vector, doc_vector)
+            if not ids:
+                logger.warning("No valid candidates found in Firestore")
+                return []
 
-                # ベクトルフィールドを除外
-                if self.vector_field in candidate:
-                    del candidate[self.vector_field]
+            # Step 2: コサイン類似度を一括計算
+            matrix = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+            norms[norms == 0] = np.inf  # ゼロベクトルは類似度0
+            similarities = (matrix @ query) / norms
+            top = top_k_indices(similarities, limit)
 
-                candidate['_similarity'] = similarity
-                scored_candidates.append(candidate)
+            # Step 3: 上位候補のみ結果フィールドを取得
+            top_ids = [ids[i] for i in top]
+            documents = {
+                snapshot.id: snapshot.to_dict()
+                for snapshot in await self._batch_get(top_ids, field_paths=self._projection(fields))
+            }
 
-            # 類似度でソート
-            scored_candidates.sort(key=lambda x: x['_similarity'], reverse=True)
+            results = []
+            for doc_id, i in zip(top_ids, top):
+                data = documents.get(doc_id)
+                if data is None:
+                    continue
 
-            # 上位limit件を返す
-            results = scored_candidates[:limit]
+                data['_firestore_id'] = doc_id
+                data['_similarity'] = float(similarities[i])
+                results.append(data)
 
             logger.info(f"✅ Hybrid search: {len(results)} results (from {len(bm25_candidates)} candidates)")
             return results
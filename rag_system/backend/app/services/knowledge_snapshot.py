@@ -0,0 +1,331 @@
+"""
+KnowledgeBase スナップショットサービス
+
+KnowledgeBaseシートの読み込み結果（スナップショット）ごとに
+検索用インデックス（BM25転置インデックス・フィルタ用ポスティング）を
+1回だけ構築し、リクエスト間で再利用します。
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+import numpy as np
+
+from app.services.spreadsheet import get_spreadsheet_client
+from app.utils.bm25 import BM25Index
+
+logger = logging.getLogger(__name__)
+
+# 利用者IDフィルタのマスクをメモ化する最大件数（スナップショットごと）
+CLIENT_MASK_CACHE_SIZE = 256
+
+
+class RowMaskFilter:
+    """ブールマスクをID集合として扱うフィルタ（`in` 判定、row_of / mask によるベクトル化判定）"""
+
+    def __init__(self, row_of: Dict[str, int], mask: np.ndarray):
+        self.row_of = row_of
+        self.mask = mask
+
+    def __contains__(self, doc_id: object) -> bool:
+        row = self.row_of.get(doc_id)
+        return row is not None and bool(self.mask[row])
+
+
+class KnowledgeBaseSnapshot:
+    """KnowledgeBaseスナップショット（読み取り専用）"""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        """
+        初期化（インデックス構築）
+
+        Args:
+            records: KnowledgeBaseレコードのリスト
+        """
+        start_time = time.time()
+
+        self.records = records
+        self.doc_ids = [str(r.get('id', '')) for r in records]
+        self.row_of: Dict[str, int] = {
+            doc_id: row for row, doc_id in enumerate(self.doc_ids)
+        }
+
+        # BM25転置インデックス
+        self.bm25_index = BM25Index(records, k1=1.5, b=0.75)
+
+        # フィルタ用ポスティング（domain / user_id -> 行番号、source_id -> 行番号）
+        self.domain_rows = self._build_postings(records, 'domain')
+        self.user_rows = self._build_postings(records, 'user_id')
+        self.source_row: Dict[str, int] = {}
+        for row, record in enumerate(records):
+            source_id = str(record.get('source_id') or '')
+            if source_id:
+                self.source_row.setdefault(source_id, row)
+
+        # 利用者ID -> マスク（ポスティングから作成したマスクのメモ化）
+        self._client_masks: Dict[str, np.ndarray] = {}
+        # Embedding行列 -> (スナップショット行 -> 行列の行, 行列の行 -> スナップショット行)
+        self._embedding_rows: Optional[Tuple[Any, np.ndarray, np.ndarray]] = None
+        # 事前構築したDenseインデックス（構築元のEmbedding行列, インデックス）
+        self._dense_index: Optional[Tuple[Any, Any]] = None
+
+        self.built_at = time.time()
+        self.build_duration_ms = (self.built_at - start_time) * 1000
+
+        logger.info(
+            f"KnowledgeBase snapshot built - Records: {len(records)}, "
+            f"Vocabulary: {len(self.bm25_index.bm25.postings)}, "
+            f"Time: {self.build_duration_ms:.2f}ms"
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def _build_postings(records: List[Dict[str, Any]], field: str) -> Dict[str, np.ndarray]:
+        """フィールド値 -> 行番号配列 のポスティングを構築"""
+        postings = defaultdict(list)
+        for row, record in enumerate(records):
+            value = record.get(field)
+            if value:
+                postings[str(value)].append(row)
+        return {value: np.asarray(rows, dtype=np.int64) for value, rows in postings.items()}
+
+    def _rows_to_mask(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        """行番号配列をブールマスクに変換"""
+        mask = np.zeros(len(self.records), dtype=bool)
+        if rows is not None:
+            mask[rows] = True
+        return mask
+
+    def filter_mask(
+        self,
+        domain: Optional[str] = None,
+        client_id: Optional[str] = None
+    ) -> Optional[np.ndarray]:
+        """
+        ドメイン・利用者IDフィルタのブールマスクを作成
+
+        Args:
+            domain: ドメインフィルタ
+            client_id: 利用者IDフィルタ
+
+        Returns:
+            ブールマスク（フィルタ指定なしの場合はNone）
+        """
+        mask = None
+
+        if domain:
+            mask = self._rows_to_mask(self.domain_rows.get(domain))
+
+        if client_id:
+            client_mask = self.client_mask(client_id)
+            mask = client_mask if mask is None else mask & client_mask
+
+        return mask
+
+    def client_mask(self, client_id: str) -> np.ndarray:
+        """
+        利用者IDフィルタのブールマスクを取得（スナップショットごとにメモ化）
+
+        user_id・source_id の完全一致のみを対象とし、フィルタ用ポスティングから作成します
+        （本文の走査は行いません。ベクトルストアの user_id フィルタと同じ方針）。
+
+        Args:
+            client_id: 利用者ID
+
+        Returns:
+            ブールマスク（読み取り専用）
+        """
+        mask = self._client_masks.get(client_id)
+        if mask is not None:
+            return mask
+
+        mask = self._rows_to_mask(self.user_rows.get(client_id))
+        if client_id in self.source_row:
+            mask[self.source_row[client_id]] = True
+        mask.setflags(write=False)
+
+        if len(self._client_masks) >= CLIENT_MASK_CACHE_SIZE:
+            self._client_masks.pop(next(iter(self._client_masks)))
+        self._client_masks[client_id] = mask
+
+        return mask
+
+    def documents_by_ids(self, doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        IDリストに対応するレコードを取得（スナップショットに無いIDは除外）
+
+        Args:
+            doc_ids: IDのリスト
+
+        Returns:
+            ID -> レコード
+        """
+        row_of = self.row_of
+        return {
+            doc_id: self.records[row_of[doc_id]]
+            for doc_id in doc_ids
+            if doc_id in row_of
+        }
+
+    def id_filter(self, mask: np.ndarray) -> RowMaskFilter:
+        """
+        ブールマスクをID集合として扱うフィルタを作成（ANNインデックスの allowed_ids 用）
+
+        Args:
+            mask: ブールマスク
+
+        Returns:
+            RowMaskFilter
+        """
+        return RowMaskFilter(self.row_of, mask)
+
+    def embedding_rows(self, matrix: Any) -> np.ndarray:
+        """
+        スナップショット行 -> Embedding行列の行番号 の対応表を取得（行列ごとにメモ化）
+
+        Args:
+            matrix: EmbeddingMatrix
+
+        Returns:
+            行番号配列（Embeddingが無い行は -1）
+        """
+        return self._row_mappings(matrix)[0]
+
+    def snapshot_rows(self, matrix: Any) -> np.ndarray:
+        """
+        Embedding行列の行番号 -> スナップショット行 の対応表を取得（行列ごとにメモ化）
+
+        Args:
+            matrix: EmbeddingMatrix
+
+        Returns:
+            行番号配列（スナップショットに無い行は -1）
+        """
+        return self._row_mappings(matrix)[1]
+
+    def _row_mappings(self, matrix: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """スナップショット行とEmbedding行列の行の双方向の対応表を構築（行列ごとにメモ化）"""
+        cached = self._embedding_rows
+        if cached is not None and cached[0] is matrix:
+            return cached[1], cached[2]
+
+        row_of = matrix.row_of
+        rows = np.fromiter(
+            (row_of.get(doc_id, -1) for doc_id in self.doc_ids),
+            dtype=np.int64,
+            count=len(self.doc_ids)
+        )
+
+        has_embedding = rows >= 0
+        inverse = np.full(len(matrix), -1, dtype=np.int64)
+        inverse[rows[has_embedding]] = np.flatnonzero(has_embedding)
+
+        self._embedding_rows = (matrix, rows, inverse)
+        return rows, inverse
+
+
+    def attach_dense_index(self, matrix: Any, index: Any):
+        """
+        Embedding行列から構築したDenseインデックスをスナップショットに紐付け（差し替え前に呼び出す）
+
+        Args:
+            matrix: 構築元のEmbeddingMatrix
+            index: Denseインデックス
+        """
+        self._dense_index = (matrix, index)
+
+    def dense_index_for(self, matrix: Any) -> Optional[Any]:
+        """
+        紐付け済みのDenseインデックスを取得
+
+        Args:
+            matrix: EmbeddingMatrix
+
+        Returns:
+            Denseインデックス（未紐付け、または構築元の行列が異なる場合はNone）
+        """
+        cached = self._dense_index
+        if cached is not None and cached[0] is matrix:
+            return cached[1]
+        return None
+
+
+class KnowledgeSnapshotService:
+    """KnowledgeBaseスナップショット管理サービス"""
+
+    def __init__(self):
+        """初期化"""
+        self.spreadsheet_client = get_spreadsheet_client()
+        self._snapshot: Optional[KnowledgeBaseSnapshot] = None
+        self._lock = threading.Lock()
+
+        logger.info("Knowledge Snapshot Service initialized")
+
+    def get_snapshot(self) -> KnowledgeBaseSnapshot:
+        """
+        現在のスナップショットを取得
+
+        KnowledgeBaseの読み込み結果（キャッシュ済みリスト）が前回と同一であれば
+        構築済みのスナップショットをそのまま返し、変わっていれば再構築します。
+
+        Returns:
+            KnowledgeBaseSnapshot: スナップショット
+        """
+        records = self.spreadsheet_client.read_knowledge_base()
+
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.records is records:
+            return snapshot
+
+        with self._lock:
+            # ロック内で再読み込み（バックグラウンド更新による差し替え中の不整合を防ぐ）
+            records = self.spreadsheet_client.read_knowledge_base()
+
+            # 他スレッドが構築済みの場合はそれを使用
+            if self._snapshot is not None and self._snapshot.records is records:
+                return self._snapshot
+
+            self._snapshot = KnowledgeBaseSnapshot(records)
+            return self._snapshot
+
+    def install(self, snapshot: KnowledgeBaseSnapshot, publish: Callable[[], None]):
+        """
+        構築済みスナップショットを差し替え（バックグラウンド更新用）
+
+        `publish`（KnowledgeBaseレコードのキャッシュ更新）とスナップショットの差し替えを
+        同一ロック内で行うため、リクエスト側が新旧の組み合わせを観測することはありません。
+
+        Args:
+            snapshot: 新しいスナップショット
+            publish: 新しいレコードをキャッシュに保存する関数
+        """
+        with self._lock:
+            publish()
+            self._snapshot = snapshot
+
+    @property
+    def current(self) -> Optional[KnowledgeBaseSnapshot]:
+        """現在のスナップショット（未構築の場合はNone）"""
+        return self._snapshot
+
+
+# モジュールレベルのシングルトン
+_knowledge_snapshot_service: Optional[KnowledgeSnapshotService] = None
+
+
+def get_knowledge_snapshot_service() -> KnowledgeSnapshotService:
+    """
+    KnowledgeBaseスナップショットサービスを取得（シングルトン）
+
+    Returns:
+        KnowledgeSnapshotService: スナップショットサービス
+    """
+    global _knowledge_snapshot_service
+    if _knowledge_snapshot_service is None:
+        _knowledge_snapshot_service = KnowledgeSnapshotService()
+    return _knowledge_snapshot_service
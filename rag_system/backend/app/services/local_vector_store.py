@@ -0,0 +1,369 @@
+"""
+ローカル VectorStore（SQLite + NumPy mmap）
+
+クラウドサービスなしでRAGスタック全体を実行・ベンチマーク・負荷試験するためのバックエンドです。
+
+ディレクトリ構成:
+    <directory>/metadata.db   ドキュメント（id, 行番号, domain, user_id, JSON本体）
+    <directory>/vectors.f32   L2正規化済みfloat32ベクトル（行番号順に連結、ヘッダーなし）
+
+- 登録・更新はベクトルをファイル末尾に追記し、更新前の行は検索対象外として残します
+- 削除はメタデータのみ削除し、ベクトル行は検索対象外として残します（`compact` で詰め直し）
+- 検索は mmap した行列に対する1回の行列ベクトル積（フィルタ指定時は該当行のみ）です。
+  有効な行・フィルタ用ポスティングは書き込みまでメモリに保持し、
+  行列ベクトル積はロック外で行います（既存の行は書き換えないため、ロックなしで読み取れます）
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.services.vector_store import FILTER_FIELDS, active_filters
+from app.utils.embedding_matrix import EmbeddingMatrix, normalize_vector
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE = "metadata.db"
+VECTORS_FILE = "vectors.f32"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    row INTEGER NOT NULL UNIQUE,
+    domain TEXT,
+    user_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_domain ON documents (domain);
+CREATE INDEX IF NOT EXISTS idx_documents_user_id ON documents (user_id);
+CREATE TABLE IF NOT EXISTS store_info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class LocalVectorStore:
+    """SQLiteメタデータ + NumPy mmapベクトルファイルのVectorStore"""
+
+    name = "local"
+
+    def __init__(self, directory: Union[str, Path], dimension: int = 2048):
+        """
+        初期化（ディレクトリ・ファイルが無い場合は作成）
+
+        Args:
+            directory: 保存先ディレクトリ
+            dimension: ベクトル次元数（既存ストアの場合は保存済みの値を使用）
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / VECTORS_FILE
+        self.vectors_path.touch(exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.directory / METADATA_FILE), check_same_thread=False
+        )
+        self._conn.executescript(SCHEMA)
+
+        stored = self._conn.execute(
+            "SELECT value FROM store_info WHERE key = 'dimension'"
+        ).fetchone()
+        if stored is None:
+            self._conn.execute(
+                "INSERT INTO store_info (key, value) VALUES ('dimension', ?)", (str(dimension),)
+            )
+            self._conn.commit()
+        self.dimension = int(stored[0]) if stored else dimension
+
+        # 検索用の行列・有効な行・フィルタ項目 -> 値 -> 行番号（書き込み時に破棄し、次回検索時に再構築）
+        self._matrix: Optional[EmbeddingMatrix] = None
+        self._live_rows: Optional[np.ndarray] = None
+        self._postings: Dict[str, Dict[Any, np.ndarray]] = {}
+
+        logger.info(
+            f"Local vector store initialized - Directory: {self.directory}, "
+            f"Dimension: {self.dimension}"
+        )
+
+    def _row_count(self) -> int:
+        """ベクトルファイルの行数（削除済みの行を含む）"""
+        return self.vectors_path.stat().st_size // (self.dimension * 4)
+
+    def _invalidate(self):
+        """検索用の行列・ポスティングを破棄（ロック取得済みで呼び出す）"""
+        self._matrix = None
+        self._live_rows = None
+        self._postings = {}
+
+    def _load_matrix(self) -> EmbeddingMatrix:
+        """ベクトルファイルをmmapした行列と有効な行・ポスティングを取得（ロック取得済みで呼び出す）"""
+        if self._matrix is not None:
+            return self._matrix
+
+        row_count = self._row_count()
+        ids = [""] * row_count
+        live_rows: List[int] = []
+        postings: Dict[str, Dict[Any, List[int]]] = {field: defaultdict(list) for field in FILTER_FIELDS}
+        for doc_id, row, *values in self._conn.execute(
+            f"SELECT id, row, {', '.join(FILTER_FIELDS)} FROM documents ORDER BY row"
+        ):
+            ids[row] = doc_id
+            live_rows.append(row)
+            for field, value in zip(FILTER_FIELDS, values):
+                if value is not None:
+                    postings[field][value].append(row)
+
+        if row_count:
+            vectors = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(row_count, self.dimension)
+            )
+        else:
+            vectors = np.zeros((0, self.dimension), dtype=np.float32)
+
+        self._live_rows = np.asarray(live_rows, dtype=np.int64)
+        self._postings = {
+            field: {value: np.asarray(rows, dtype=np.int64) for value, rows in field_postings.items()}
+            for field, field_postings in postings.items()
+        }
+        self._matrix = EmbeddingMatrix(ids, vectors)
+        return self._matrix
+
+    def _upsert(
+        self,
+        documents: Sequence[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]]
+    ) -> int:
+        """一括登録・更新（同期処理）"""
+        if len(documents) != len(embeddings):
+            raise ValueError(
+                f"Document count doesn't match embeddings: {len(documents)} vs {len(embeddings)}"
+            )
+
+        vectors = np.vstack([normalize_vector(vector) for vector in embeddings]) if len(embeddings) else None
+        if vectors is not None and vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Vector dimensions don't match: {vectors.shape[1]} vs {self.dimension}"
+            )
+
+        with self._lock:
+            # ベクトルは常に末尾へ追記（既存の行は書き換えないため、ロック外の検索と競合しない）
+            # 更新前の行・同一バッチ内の重複IDの先の行は検索対象外となり、compact で除去される
+            next_row = self._row_count()
+            rows = list(range(next_row, next_row + len(documents)))
+
+            with open(self.vectors_path, "ab") as f:
+                if vectors is not None:
+                    f.write(vectors.astype(np.float32).tobytes())
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (id, row, domain, user_id, data) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        str(doc["id"]),
+                        row,
+                        doc.get("domain"),
+                        doc.get("user_id"),
+                        json.dumps(doc, ensure_ascii=False, default=str),
+                    )
+                    for doc, row in zip(documents, rows)
+                ],
+            )
+            self._conn.commit()
+            self._invalidate()
+
+        return len(documents)
+
+    async def upsert_batch(
+        self,
+        documents: Sequence[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]]
+    ) -> int:
+        """
+        ドキュメントとEmbeddingを一括登録・更新
+
+        Args:
+            documents: ドキュメント（`id` 必須、domain / user_id はフィルタ用に索引化）
+            embeddings: Embedding（documents と同順）
+
+        Returns:
+            登録・更新件数
+
+        Raises:
+            ValueError: 件数・次元数が一致しない場合、ゼロベクトルの場合
+        """
+        return await asyncio.to_thread(self._upsert, documents, embeddings)
+
+    def _delete(self, ids: Sequence[str]) -> int:
+        """削除（同期処理）"""
+        with self._lock:
+            cursor = self._conn.executemany(
+                "DELETE FROM documents WHERE id = ?", [(str(doc_id),) for doc_id in ids]
+            )
+            self._conn.commit()
+            self._invalidate()
+        return cursor.rowcount
+
+    async def delete(self, ids: Sequence[str]) -> int:
+        """
+        ドキュメントを削除（ベクトル行は `compact` まで残る）
+
+        Args:
+            ids: 削除するID
+
+        Returns:
+            削除件数
+        """
+        return await asyncio.to_thread(self._delete, ids)
+
+    def _filtered_rows(self, filters: Dict[str, Any]) -> np.ndarray:
+        """フィルタに一致する有効な行番号（`_load_matrix` 後、ロック取得済みで呼び出す）"""
+        rows = self._live_rows
+        for field, value in filters.items():
+            matched = self._postings[field].get(value)
+            if matched is None:
+                return np.empty(0, dtype=np.int64)
+            rows = np.intersect1d(rows, matched, assume_unique=True)
+        return rows
+
+    def _fetch(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """IDでドキュメントを取得（ロック取得済みで呼び出す）"""
+        if not ids:
+            return {}
+        rows = self._conn.execute(
+            f"SELECT id, data FROM documents WHERE id IN ({','.join('?' * len(ids))})",
+            list(ids),
+        )
+        return {doc_id: json.loads(data) for doc_id, data in rows}
+
+    def _search(
+        self,
+        query_vector: Sequence[float],
+        limit: int,
+        filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """ベクトル検索（同期処理）"""
+        with self._lock:
+            matrix = self._load_matrix()
+            # 削除・更新済みの行を除外するため、フィルタなしでも有効な行のみを対象にする
+            rows = self._filtered_rows(filters)
+
+        # 行列ベクトル積はロック外（取得した行列・行番号は以降の書き込みで変更されない）
+        hits: List[Tuple[int, float]] = matrix.search(query_vector, top_k=limit, rows=rows)
+
+        with self._lock:
+            docs = self._fetch([matrix.ids[row] for row, _ in hits])
+
+        results = []
+        for row, similarity in hits:
+            doc = docs.get(matrix.ids[row])
+            if doc is None:
+                continue
+            results.append({**doc, "distance": 1 - similarity, "similarity": similarity})
+        return results
+
+    async def search(
+        self,
+        query_vector: Sequence[float],
+        limit: int = 10,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        コサイン類似度でベクトル検索
+
+        Args:
+            query_vector: クエリベクトル
+            limit: 取得件数
+            filters: フィルタ条件（domain, user_id の完全一致）
+
+        Returns:
+            検索結果リスト（類似度順、distance / similarity 付き）
+        """
+        return await asyncio.to_thread(self._search, query_vector, limit, active_filters(filters))
+
+    def _get_many(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """一括取得（同期処理）"""
+        with self._lock:
+            return self._fetch([str(doc_id) for doc_id in ids])
+
+    async def get_many(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        IDリストでドキュメントを一括取得
+
+        Args:
+            ids: IDのリスト
+
+        Returns:
+            ID -> ドキュメント（存在しないIDは含まない）
+        """
+        return await asyncio.to_thread(self._get_many, ids)
+
+    def _stats(self) -> Dict[str, Any]:
+        """統計情報（同期処理）"""
+        with self._lock:
+            (documents,) = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()
+            row_count = self._row_count()
+        return {
+            "backend": self.name,
+            "documents": documents,
+            "dimension": self.dimension,
+            "vector_rows": row_count,
+            "deleted_rows": row_count - documents,
+            "vector_bytes": row_count * self.dimension * 4,
+        }
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        統計情報
+
+        Returns:
+            documents / dimension / vector_rows（削除済みを含む）/ deleted_rows / vector_bytes
+        """
+        return await asyncio.to_thread(self._stats)
+
+    def compact(self) -> int:
+        """
+        削除済みのベクトル行を詰めてファイルを書き直す
+
+        Returns:
+            除去した行数
+        """
+        with self._lock:
+            live = self._conn.execute("SELECT id, row FROM documents ORDER BY row").fetchall()
+            removed = self._row_count() - len(live)
+            if removed == 0:
+                return 0
+
+            matrix = self._load_matrix()
+            tmp_path = self.vectors_path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                for _, row in live:
+                    f.write(np.asarray(matrix.matrix[row], dtype=np.float32).tobytes())
+
+            self._invalidate()
+            tmp_path.replace(self.vectors_path)
+
+            # 一意制約に衝突しないよう、負の値を経由して行番号を振り直す
+            self._conn.executemany(
+                "UPDATE documents SET row = ? WHERE id = ?",
+                [(-(new_row + 1), doc_id) for new_row, (doc_id, _) in enumerate(live)],
+            )
+            self._conn.execute("UPDATE documents SET row = -row - 1")
+            self._conn.commit()
+
+        logger.info(f"Compacted local vector store - Removed rows: {removed}")
+        return removed
+
+    def close(self):
+        """SQLite接続を閉じる"""
+        with self._lock:
+            self._invalidate()
+            self._conn.close()
@@ -6,11 +6,14 @@
 
 import logging
 import re
+import time
 from typing import List, Dict, Any, Set, Optional
 from functools import lru_cache
 
 from app.config import get_settings
 from app.services.spreadsheet import get_spreadsheet_client
+from app.utils.aho_corasick import AhoCorasick
+from app.utils.ngram_index import NgramIndex
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -25,6 +28,11 @@ class MedicalTermsService:
         self._terms_cache: Optional[List[Dict[str, Any]]] = None
         self._canonical_map: Optional[Dict[str, Dict[str, Any]]] = None
         self._synonym_map: Optional[Dict[str, str]] = None
+        # 用語（canonical + synonyms） -> canonical の照合オートマトン
+        self._term_matcher: Optional[AhoCorasick] = None
+        # 類似用語提案用のn-gramインデックス（辞書ごとに初回提案時に構築）
+        self._ngram_index: Optional[NgramIndex] = None
+        self._ngram_source: Optional[List[Dict[str, Any]]] = None
 
         logger.info("Medical Terms Service initialized")
 
@@ -72,6 +80,8 @@ class MedicalTermsService:
                 except json.JSONDecodeError:
                     pass
 
+        self._term_matcher = AhoCorasick(self._synonym_map)
+
         logger.info(
             f"Built maps - Canonical: {len(self._canonical_map)}, "
             f"Synonyms: {len(self._synonym_map)}"
@@ -81,21 +91,21 @@ class MedicalTermsService:
         """
         テキストから医療用語を抽出
 
+        辞書に登録されている全ての用語（canonical + synonyms）を1回の走査で照合します。
+        重なる場合は最左最長一致を採用し、長い用語に含まれる短い用語は抽出しません。
+
         Args:
             text: 入力テキスト
 
         Returns:
-            抽出された医療用語のリスト（canonical形式）
+            抽出された医療用語のリスト（canonical形式、出現順）
         """
-        if not self._synonym_map:
+        if self._term_matcher is None:
             self.load_terms()
 
-        extracted_terms = []
-
-        # 辞書に登録されている全ての用語（canonical + synonyms）でマッチング
-        for term, canonical in self._synonym_map.items():
-            if term in text:
-                extracted_terms.append(canonical)
+        extracted_terms = [
+            canonical for _, _, canonical in self._term_matcher.find_leftmost_longest(text)
+        ]
 
         # 重複を除去してユニークなリストを返す
         unique_terms = list(dict.fromkeys(extracted_terms))
@@ -140,6 +150,48 @@ class MedicalTermsService:
         logger.debug(f"Expanded {len(terms)} terms to {len(expanded)} terms")
         return expanded
 
+    def _get_ngram_index(self) -> NgramIndex:
+        """
+        n-gramインデックスを取得（辞書が読み込み直された場合のみ再構築）
+
+        Returns:
+            NgramIndex: 表記（canonical + synonyms） -> canonical のインデックス
+        """
+        if self._ngram_index is None or self._ngram_source is not self._terms_cache:
+            start_time = time.time()
+            self._ngram_index = NgramIndex(list(self._synonym_map.items()))
+            self._ngram_source = self._terms_cache
+            logger.info(
+                f"Built n-gram index - Surfaces: {len(self._ngram_index)}, "
+                f"Chars: {len(self._ngram_index.postings)} "
+                f"({(time.time() - start_time) * 1000:.1f}ms)"
+            )
+        return self._ngram_index
+
+    def _suggestion(
+        self,
+        original: str,
+        canonical: str,
+        similarity: float
+    ) -> Optional[Dict[str, Any]]:
+        """提案エントリを作成（辞書に無い・シノニムがパースできない場合はNone）"""
+        term_entry = self._canonical_map.get(canonical)
+        if not term_entry:
+            return None
+
+        synonyms = term_entry.get('synonyms', [])
+        if not isinstance(synonyms, list):
+            return None
+
+        return {
+            'original': original,
+            'canonical': canonical,
+            'alternatives': synonyms[:3],  # Top 3
+            'category': term_entry.get('category', ''),
+            'frequency': term_entry.get('frequency', 0),
+            'similarity': similarity
+        }
+
     def suggest_alternative_terms(
         self,
         query: str,
@@ -148,6 +200,9 @@ class MedicalTermsService:
         """
         代替用語を提案
 
+        クエリに完全一致した用語のシノニムを頻度順に提案し、
+        不足分は文字n-gramの類似度が高い用語（誤字・表記揺れ）で補います。
+
         Args:
             query: クエリテキスト
             top_k: 返す提案数
@@ -164,21 +219,34 @@ class MedicalTermsService:
         suggestions = []
 
         for term in extracted_terms:
-            term_entry = self._canonical_map.get(term)
-            if term_entry:
-                synonyms = term_entry.get('synonyms', [])
-                if isinstance(synonyms, list):
-                    suggestions.append({
-                        'original': term,
-                        'canonical': term,
-                        'alternatives': synonyms[:3],  # Top 3
-                        'category': term_entry.get('category', ''),
-                        'frequency': term_entry.get('frequency', 0)
-                    })
+            suggestion = self._suggestion(term, term, 1.0)
+            if suggestion:
+                suggestions.append(suggestion)
 
         # 頻度順でソート
         suggestions.sort(key=lambda x: x['frequency'], reverse=True)
 
+        # 不足分をn-gram類似用語で補完（完全一致済みのcanonicalは除外）
+        if len(suggestions) < top_k:
+            seen = set(extracted_terms)
+            index = self._get_ngram_index()
+            hits = index.search(
+                query,
+                top_k=top_k * 3,  # 同一canonicalのシノニムの重複分を見込む
+                min_similarity=settings.medical_terms_fuzzy_min_similarity
+            )
+            for row, similarity in hits:
+                canonical = index.values[row]
+                if canonical in seen:
+                    continue
+                seen.add(canonical)
+
+                suggestion = self._suggestion(index.surfaces[row], canonical, round(similarity, 3))
+                if suggestion:
+                    suggestions.append(suggestion)
+                if len(suggestions) >= top_k:
+                    break
+
         logger.info(f"Generated {len(suggestions)} alternative term suggestions")
         return suggestions[:top_k]
 
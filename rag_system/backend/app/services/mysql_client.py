@@ -6,18 +6,267 @@ Cloud SQL (MySQL 9.0+) のVector型を使用した高速ベクトル検索を提
 
 import json
 import logging
+import math
 import time
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.config import get_settings
 from app.database import db_manager
+from app.utils.rank_fusion import RankedList, reciprocal_rank_fusion
+from app.utils.vector_codec import encode_vector_param, vector_param_sql
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# JSON文字列で保存されているカラム
+JSON_FIELDS = ("structured_data", "metadata")
+
+# ベクトル次元数（embeddings.embedding VECTOR(2048)）
+VECTOR_DIMENSION = 2048
+
+
+def _vector_expression(param: str, vector_format: str) -> str:
+    """
+    ベクトルパラメータのSQL式
+
+    binary: リトルエンディアンfloat32のバイナリをそのままバインド（VECTOR型の内部表現）
+    json: JSON配列文字列をMySQL側でVECTOR型に変換
+    """
+    return vector_param_sql(f":{param}", vector_format, VECTOR_DIMENSION)
+
+
+def encode_vector(vector: Sequence[float]) -> Any:
+    """
+    ベクトルをバインドパラメータに変換（`mysql_vector_param_format` に応じて切り替え）
+
+    Args:
+        vector: ベクトル（2048次元）
+
+    Returns:
+        binary: bytes（8KB） / json: JSON文字列（約40KB）
+    """
+    return encode_vector_param(vector, settings.mysql_vector_param_format, VECTOR_DIMENSION)
+
+
+@lru_cache(maxsize=None)
+def _vector_search_sql(vector_format: str):
+    """Vector Search SQL（形式ごとに1回だけ構築し、コンパイル済みキャッシュを再利用）"""
+    return text(f"""
+        SELECT
+            kb.id,
+            kb.domain,
+            kb.source_type,
+            kb.source_table,
+            kb.source_id,
+            kb.user_id,
+            kb.user_name,
+            kb.title,
+            kb.content,
+            kb.structured_data,
+            kb.metadata,
+            kb.tags,
+            kb.date,
+            kb.created_at,
+            VEC_DISTANCE(e.embedding, {_vector_expression("query_vector", vector_format)}, COSINE) as distance
+        FROM knowledge_base kb
+        JOIN embeddings e ON kb.id = e.kb_id
+        WHERE 1=1
+            AND (:domain IS NULL OR kb.domain = :domain)
+            AND (:user_id IS NULL OR kb.user_id = :user_id)
+        ORDER BY distance ASC
+        LIMIT :limit
+    """)
+
+
+@lru_cache(maxsize=None)
+def _vector_search_compact_sql(vector_format: str):
+    """2段階Vector Search SQL（形式ごとに1回だけ構築）"""
+    return text(f"""
+        SELECT
+            kb.id,
+            kb.title,
+            kb.content,
+            hits.distance
+        FROM (
+            SELECT
+                e.kb_id,
+                VEC_DISTANCE(e.embedding, {_vector_expression("query_vector", vector_format)}, COSINE) as distance
+            FROM knowledge_base kb
+            JOIN embeddings e ON kb.id = e.kb_id
+            WHERE 1=1
+                AND (:domain IS NULL OR kb.domain = :domain)
+                AND (:user_id IS NULL OR kb.user_id = :user_id)
+            ORDER BY distance ASC
+            LIMIT :limit
+        ) hits
+        JOIN knowledge_base kb ON kb.id = hits.kb_id
+        ORDER BY hits.distance ASC
+    """)
+
+
+# FULLTEXTインデックス（idx_content_fulltext, ngramパーサ）と同じ列を指定する必要がある
+FULLTEXT_MATCH = "MATCH(kb.title, kb.content, kb.tags) AGAINST (:query_text IN NATURAL LANGUAGE MODE)"
+
+
+@lru_cache(maxsize=None)
+def _hybrid_search_sql(vector_format: str):
+    """ハイブリッド検索SQL（ベクトル距離順・FULLTEXT関連度順の候補を1回のクエリで取得）"""
+    return text(f"""
+        SELECT
+            kb.id,
+            kb.title,
+            kb.content,
+            hits.source,
+            hits.score
+        FROM (
+            (
+                SELECT
+                    e.kb_id AS id,
+                    'vector' AS source,
+                    VEC_DISTANCE(e.embedding, {_vector_expression("query_vector", vector_format)}, COSINE) AS score
+                FROM knowledge_base kb
+                JOIN embeddings e ON kb.id = e.kb_id
+                WHERE 1=1
+                    AND (:domain IS NULL OR kb.domain = :domain)
+                    AND (:user_id IS NULL OR kb.user_id = :user_id)
+                ORDER BY score ASC
+                LIMIT :limit
+            )
+            UNION ALL
+            (
+                SELECT
+                    kb.id AS id,
+                    'fulltext' AS source,
+                    {FULLTEXT_MATCH} AS score
+                FROM knowledge_base kb
+                WHERE {FULLTEXT_MATCH}
+                    AND (:domain IS NULL OR kb.domain = :domain)
+                    AND (:user_id IS NULL OR kb.user_id = :user_id)
+                ORDER BY score DESC
+                LIMIT :fulltext_limit
+            )
+        ) hits
+        JOIN knowledge_base kb ON kb.id = hits.id
+    """)
+
+
+@lru_cache(maxsize=None)
+def _upsert_embedding_sql(vector_format: str):
+    """Embedding一括登録SQL（形式ごとに1回だけ構築、executemanyで複数行INSERTに展開）"""
+    return text(f"""
+        INSERT INTO embeddings (kb_id, embedding, embedding_model)
+        VALUES (:kb_id, {_vector_expression("embedding", vector_format)}, :embedding_model)
+        ON DUPLICATE KEY UPDATE
+            embedding = VALUES(embedding),
+            embedding_model = VALUES(embedding_model),
+            updated_at = NOW()
+    """)
+
+
+def _load_json(value: Any, parse: bool) -> Any:
+    """JSONカラムの値を変換（parse=False の場合は文字列のまま返す）"""
+    if not value:
+        return None
+    return json.loads(value) if parse else value
+
+
+def fuse_hybrid_rows(
+    rows: Sequence[Sequence[Any]],
+    limit: int,
+    vector_weight: float = 0.7,
+    fulltext_weight: float = 0.3,
+    rrf_k: int = 60,
+) -> List[Dict[str, Any]]:
+    """
+    ハイブリッド検索の行（id, title, content, source, score）をRRFで統合
+
+    Args:
+        rows: ハイブリッド検索SQLの結果行
+        limit: 統合後の最大件数
+        vector_weight: ベクトル側のRRF重み
+        fulltext_weight: FULLTEXT側のRRF重み
+        rrf_k: RRF定数
+
+    Returns:
+        検索結果リスト（統合スコア順）
+    """
+    documents: List[Dict[str, Any]] = []
+    positions: Dict[Any, int] = {}
+    vector_hits: List[Tuple[int, float]] = []
+    fulltext_hits: List[Tuple[int, float]] = []
+
+    for doc_id, title, content, source, score in rows:
+        position = positions.get(doc_id)
+        if position is None:
+            position = positions[doc_id] = len(documents)
+            documents.append({"id": doc_id, "title": title, "content": content})
+        if source == "vector":
+            vector_hits.append((position, float(score)))
+        else:
+            fulltext_hits.append((position, float(score)))
+
+    # UNION ALLの結果順は保証されないため、各側の順位はスコアで付け直す
+    vector_hits.sort(key=lambda hit: hit[1])
+    fulltext_hits.sort(key=lambda hit: -hit[1])
+
+    fused = reciprocal_rank_fusion(
+        [
+            RankedList(
+                [position for position, _ in vector_hits],
+                vector_weight,
+                [distance for _, distance in vector_hits],
+                name="vector",
+            ),
+            RankedList(
+                [position for position, _ in fulltext_hits],
+                fulltext_weight,
+                [relevance for _, relevance in fulltext_hits],
+                name="fulltext",
+            ),
+        ],
+        k=rrf_k,
+        top_k=limit,
+    )
+
+    results = []
+    for i, position in enumerate(fused.ids.tolist()):
+        doc = documents[position]
+        distance = fused.list_scores[0][i]
+        if not math.isnan(distance):  # NaN=ベクトル側に該当なし
+            doc["distance"] = float(distance)
+            doc["similarity"] = 1 - float(distance)  # コサイン距離 → 類似度
+        relevance = fused.list_scores[1][i]
+        if not math.isnan(relevance):
+            doc["fulltext_score"] = float(relevance)
+        doc["rrf_score"] = float(fused.scores[i])
+        results.append(doc)
+
+    return results
+
+
+def parse_json_fields(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    未パースのJSONカラム（structured_data, metadata）をパース（インプレース）
+
+    `parse_json=False` で取得したドキュメントのうち、最終結果に残ったものだけに適用します。
+
+    Args:
+        documents: ドキュメントリスト
+
+    Returns:
+        同じドキュメントリスト
+    """
+    for doc in documents:
+        for field in JSON_FIELDS:
+            value = doc.get(field)
+            if isinstance(value, (str, bytes)):
+                doc[field] = json.loads(value) if value else None
+    return documents
+
 
 class MySQLVectorClient:
     """MySQL Vector Search クライアント"""
@@ -33,6 +282,7 @@ class MySQLVectorClient:
         query_vector: List[float],
         limit: int = 100,
         filters: Optional[Dict[str, Any]] = None,
+        parse_json: bool = True,
     ) -> List[Dict[str, Any]]:
         """
         MySQL Vector Search実行
@@ -41,6 +291,7 @@ class MySQLVectorClient:
             query_vector: クエリベクトル（2048次元）
             limit: 検索結果数（デフォルト: 100）
             filters: フィルタ条件（domain, user_id）
+            parse_json: JSONカラムをパースするか（Falseの場合は文字列のまま、`parse_json_fields` で後からパース）
 
         Returns:
             検索結果リスト（類似度順）
@@ -55,8 +306,8 @@ class MySQLVectorClient:
         start_time = time.time()
 
         try:
-            # クエリベクトルをJSON文字列に変換
-            query_vector_str = json.dumps(query_vector)
+            # クエリベクトルをバインドパラメータに変換（binary: float32バイナリ 8KB）
+            query_vector_param = encode_vector(query_vector)
 
             # フィルタ条件構築
             domain_filter = filters.get("domain") if filters else None
@@ -70,37 +321,13 @@ class MySQLVectorClient:
             # Vector Search SQL
             # MySQL 9.0+の VEC_DISTANCE 関数を使用
             # VECTOR型のembeddingフィールドと query_vector のコサイン距離を計算
-            sql = text("""
-                SELECT
-                    kb.id,
-                    kb.domain,
-                    kb.source_type,
-                    kb.source_table,
-                    kb.source_id,
-                    kb.user_id,
-                    kb.user_name,
-                    kb.title,
-                    kb.content,
-                    kb.structured_data,
-                    kb.metadata,
-                    kb.tags,
-                    kb.date,
-                    kb.created_at,
-                    VEC_DISTANCE(e.embedding, CAST(:query_vector AS VECTOR(2048)), COSINE) as distance
-                FROM knowledge_base kb
-                JOIN embeddings e ON kb.id = e.kb_id
-                WHERE 1=1
-                    AND (:domain IS NULL OR kb.domain = :domain)
-                    AND (:user_id IS NULL OR kb.user_id = :user_id)
-                ORDER BY distance ASC
-                LIMIT :limit
-            """)
+            sql = _vector_search_sql(settings.mysql_vector_param_format)
 
             async with db_manager.get_session() as session:
                 result = await session.execute(
                     sql,
                     {
-                        "query_vector": query_vector_str,
+                        "query_vector": query_vector_param,
                         "domain": domain_filter,
                         "user_id": user_id_filter,
                         "limit": limit,
@@ -122,8 +349,8 @@ class MySQLVectorClient:
                         "user_name": row[6],
                         "title": row[7],
                         "content": row[8],
-                        "structured_data": json.loads(row[9]) if row[9] else None,
-                        "metadata": json.loads(row[10]) if row[10] else None,
+                        "structured_data": _load_json(row[9], parse_json),
+                        "metadata": _load_json(row[10], parse_json),
                         "tags": row[11],
                         "date": row[12].isoformat() if row[12] else None,
                         "created_at": row[13].isoformat() if row[13] else None,
@@ -149,6 +376,163 @@ class MySQLVectorClient:
             )
             raise
 
+    async def vector_search_compact(
+        self,
+        query_vector: List[float],
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        MySQL Vector Search実行（2段階検索の1段目: リランキングに必要な列のみ）
+
+        サブクエリで (id, distance) のみを距離順に絞り込んでから、
+        候補行のタイトル・本文のみを主キーで結合します。
+        structured_data / metadata 等の大きなカラムは転送せず、
+        最終結果のみ `get_documents_by_ids` で取得します。
+
+        Args:
+            query_vector: クエリベクトル（2048次元）
+            limit: 検索結果数（デフォルト: 100）
+            filters: フィルタ条件（domain, user_id）
+
+        Returns:
+            検索結果リスト（類似度順、id / title / content / distance / similarity のみ）
+        """
+        start_time = time.time()
+
+        try:
+            query_vector_param = encode_vector(query_vector)
+
+            domain_filter = filters.get("domain") if filters else None
+            user_id_filter = filters.get("user_id") if filters else None
+
+            logger.info(
+                f"[MySQLVectorClient] Vector Search（2段階）開始: limit={limit}, domain={domain_filter}, user_id={user_id_filter}"
+            )
+
+            sql = _vector_search_compact_sql(settings.mysql_vector_param_format)
+
+            async with db_manager.get_session() as session:
+                result = await session.execute(
+                    sql,
+                    {
+                        "query_vector": query_vector_param,
+                        "domain": domain_filter,
+                        "user_id": user_id_filter,
+                        "limit": limit,
+                    },
+                )
+                rows = result.fetchall()
+
+            results = [
+                {
+                    "id": row[0],
+                    "title": row[1],
+                    "content": row[2],
+                    "distance": float(row[3]),
+                    "similarity": 1 - float(row[3]),  # コサイン距離 → 類似度
+                }
+                for row in rows
+            ]
+
+            elapsed_ms = (time.time() - start_time) * 1000
+
+            logger.info(
+                f"[MySQLVectorClient] Vector Search（2段階）完了: {len(results)}件, {elapsed_ms:.2f}ms"
+            )
+
+            return results
+
+        except SQLAlchemyError as e:
+            logger.error(f"[MySQLVectorClient] Vector Search（2段階）失敗: {e}", exc_info=True)
+            raise
+
+    async def hybrid_search(
+        self,
+        query_text: str,
+        query_vector: List[float],
+        limit: int = 100,
+        fulltext_limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+        vector_weight: float = 0.7,
+        fulltext_weight: float = 0.3,
+        rrf_k: int = 60,
+    ) -> List[Dict[str, Any]]:
+        """
+        ハイブリッド検索実行（FULLTEXT + Vector Search、RRF統合）
+
+        ベクトル距離順の候補とFULLTEXT（ngramパーサ）関連度順の候補を
+        UNION ALLで1回のクエリとして取得し、重み付きRRFで統合します。
+        利用者名・記録IDなど、埋め込みでは近傍に現れにくい完全一致語を拾うための経路です。
+        2段階検索と同様にリランキングに必要な列のみ取得します。
+
+        統合結果は両側の和集合を切り詰めずに返します（最大 limit + fulltext_limit 件）。
+        RRFの重みではFULLTEXTのみの下位の候補がベクトル側の下位より後ろに並ぶため、
+        limit で切るとFULLTEXTでしか拾えない完全一致がリランキング前に落ちるためです。
+
+        Args:
+            query_text: FULLTEXT検索に使うクエリ文字列
+            query_vector: クエリベクトル（2048次元）
+            limit: ベクトル側の候補数（デフォルト: 100）
+            fulltext_limit: FULLTEXT側の候補数（デフォルト: 100）
+            filters: フィルタ条件（domain, user_id）
+            vector_weight: ベクトル側のRRF重み
+            fulltext_weight: FULLTEXT側のRRF重み
+            rrf_k: RRF定数
+
+        Returns:
+            検索結果リスト（統合スコア順、id / title / content / rrf_score と
+            該当する側の distance / similarity / fulltext_score）
+        """
+        start_time = time.time()
+
+        try:
+            query_vector_param = encode_vector(query_vector)
+
+            domain_filter = filters.get("domain") if filters else None
+            user_id_filter = filters.get("user_id") if filters else None
+
+            logger.info(
+                f"[MySQLVectorClient] Hybrid Search開始: limit={limit}, fulltext_limit={fulltext_limit}, "
+                f"domain={domain_filter}, user_id={user_id_filter}"
+            )
+
+            sql = _hybrid_search_sql(settings.mysql_vector_param_format)
+
+            async with db_manager.get_session() as session:
+                result = await session.execute(
+                    sql,
+                    {
+                        "query_vector": query_vector_param,
+                        "query_text": query_text,
+                        "domain": domain_filter,
+                        "user_id": user_id_filter,
+                        "limit": limit,
+                        "fulltext_limit": fulltext_limit,
+                    },
+                )
+                rows = result.fetchall()
+
+            results = fuse_hybrid_rows(
+                rows,
+                limit=limit + fulltext_limit,
+                vector_weight=vector_weight,
+                fulltext_weight=fulltext_weight,
+                rrf_k=rrf_k,
+            )
+
+            elapsed_ms = (time.time() - start_time) * 1000
+
+            logger.info(
+                f"[MySQLVectorClient] Hybrid Search完了: {len(results)}件（取得{len(rows)}行）, {elapsed_ms:.2f}ms"
+            )
+
+            return results
+
+        except SQLAlchemyError as e:
+            logger.error(f"[MySQLVectorClient] Hybrid Search失敗: {e}", exc_info=True)
+            raise
+
     async def get_document_by_id(self, document_id: str) -> Optional[Dict[str, Any]]:
         """
         ドキュメントIDで取得
@@ -214,6 +598,112 @@ class MySQLVectorClient:
             logger.error(f"[MySQLVectorClient] ドキュメント取得失敗: {e}", exc_info=True)
             raise
 
+    async def get_ids_by_domain(self, domain: str) -> List[str]:
+        """
+        ドメインに属するドキュメントIDを取得（インプロセスANNインデックスのフィルタ用）
+
+        Args:
+            domain: ドメイン
+
+        Returns:
+            ドキュメントIDのリスト
+        """
+        try:
+            sql = text("SELECT kb.id FROM knowledge_base kb WHERE kb.domain = :domain")
+
+            async with db_manager.get_session() as session:
+                result = await session.execute(sql, {"domain": domain})
+                return [row[0] for row in result.fetchall()]
+
+        except SQLAlchemyError as e:
+            logger.error(f"[MySQLVectorClient] ドメインID取得失敗: {e}", exc_info=True)
+            raise
+
+    async def get_documents_by_ids(
+        self,
+        document_ids: List[str],
+        filters: Optional[Dict[str, Any]] = None,
+        parse_json: bool = True,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        複数のドキュメントIDで一括取得（1クエリ）
+
+        Args:
+            document_ids: ドキュメントIDリスト
+            filters: フィルタ条件（domain, user_id）
+            parse_json: JSONカラムをパースするか（Falseの場合は文字列のまま）
+
+        Returns:
+            ドキュメントID → ドキュメント の辞書（存在しない・フィルタ外のIDは含まない）
+        """
+        if not document_ids:
+            return {}
+
+        try:
+            domain_filter = filters.get("domain") if filters else None
+            user_id_filter = filters.get("user_id") if filters else None
+
+            sql = text("""
+                SELECT
+                    kb.id,
+                    kb.domain,
+                    kb.source_type,
+                    kb.source_table,
+                    kb.source_id,
+                    kb.user_id,
+                    kb.user_name,
+                    kb.title,
+                    kb.content,
+                    kb.structured_data,
+                    kb.metadata,
+                    kb.tags,
+                    kb.date,
+                    kb.created_at
+                FROM knowledge_base kb
+                WHERE kb.id IN :ids
+                    AND (:domain IS NULL OR kb.domain = :domain)
+                    AND (:user_id IS NULL OR kb.user_id = :user_id)
+            """).bindparams(bindparam("ids", expanding=True))
+
+            async with db_manager.get_session() as session:
+                result = await session.execute(
+                    sql,
+                    {
+                        "ids": list(document_ids),
+                        "domain": domain_filter,
+                        "user_id": user_id_filter,
+                    },
+                )
+                rows = result.fetchall()
+
+            docs = {}
+            for row in rows:
+                docs[row[0]] = {
+                    "id": row[0],
+                    "domain": row[1],
+                    "source_type": row[2],
+                    "source_table": row[3],
+                    "source_id": row[4],
+                    "user_id": row[5],
+                    "user_name": row[6],
+                    "title": row[7],
+                    "content": row[8],
+                    "structured_data": _load_json(row[9], parse_json),
+                    "metadata": _load_json(row[10], parse_json),
+                    "tags": row[11],
+                    "date": row[12].isoformat() if row[12] else None,
+                    "created_at": row[13].isoformat() if row[13] else None,
+                }
+
+            logger.info(
+                f"[MySQLVectorClient] 一括取得完了: {len(docs)}/{len(document_ids)}件"
+            )
+            return docs
+
+        except SQLAlchemyError as e:
+            logger.error(f"[MySQLVectorClient] 一括取得失敗: {e}", exc_info=True)
+            raise
+
     async def get_documents_by_user(
         self, user_id: str, limit: int = 100
     ) -> List[Dict[str, Any]]:
@@ -269,6 +759,61 @@ class MySQLVectorClient:
             logger.error(f"[MySQLVectorClient] 利用者検索失敗: {e}", exc_info=True)
             raise
 
+    async def upsert_embeddings(
+        self,
+        embeddings: Sequence[Tuple[str, Sequence[float]]],
+        embedding_model: str = "gemini-embedding-001",
+        batch_size: int = 500,
+    ) -> int:
+        """
+        Embeddingを一括登録・更新（バッチごとに1トランザクション）
+
+        ベクトルはリトルエンディアンfloat32のバイナリでバインドし、
+        executemany により複数行INSERTとして送信します。
+
+        Args:
+            embeddings: (kb_id, ベクトル) のリスト
+            embedding_model: Embeddingモデル名
+            batch_size: 1トランザクションあたりの件数
+
+        Returns:
+            登録・更新した件数
+
+        Raises:
+            ValueError: ベクトルの次元数が2048でない場合
+        """
+        sql = _upsert_embedding_sql(settings.mysql_vector_param_format)
+        start_time = time.time()
+        written = 0
+
+        try:
+            for i in range(0, len(embeddings), batch_size):
+                params = [
+                    {
+                        "kb_id": kb_id,
+                        "embedding": encode_vector(vector),
+                        "embedding_model": embedding_model,
+                    }
+                    for kb_id, vector in embeddings[i:i + batch_size]
+                ]
+
+                async with db_manager.get_session() as session:
+                    await session.execute(sql, params)
+
+                written += len(params)
+
+            elapsed_ms = (time.time() - start_time) * 1000
+            logger.info(
+                f"[MySQLVectorClient] Embedding一括登録完了: {written}件, {elapsed_ms:.2f}ms"
+            )
+            return written
+
+        except SQLAlchemyError as e:
+            logger.error(
+                f"[MySQLVectorClient] Embedding一括登録失敗（{written}件登録済み）: {e}", exc_info=True
+            )
+            raise
+
     async def health_check(self) -> Dict[str, Any]:
         """
         ヘルスチェック
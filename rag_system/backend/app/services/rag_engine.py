@@ -4,18 +4,27 @@ RAG Hybrid Search エンジン
 5段階のHybrid Search (BM25 + Dense Retrieval + RRF + Vertex AI Ranking)を実装します。
 """
 
+import asyncio
 import logging
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
 
 from app.config import get_settings
 from app.services.vertex_ai import get_vertex_ai_client
-from app.services.reranker import get_ranker
+from app.services.reranker import get_ranker, is_fully_reranked
 from app.services.spreadsheet import get_spreadsheet_client
 from app.services.firestore_vector_service import get_firestore_vector_client
 from app.services.medical_terms import get_medical_terms_service
-from app.utils.cosine import calculate_cosine_similarity
-from app.utils.bm25 import simple_tokenize, score_documents_bm25
+from app.services.knowledge_snapshot import KnowledgeBaseSnapshot, get_knowledge_snapshot_service
+from app.services.dense_index_service import get_dense_index_service
+from app.services.search_cache import get_search_result_cache
+from app.utils.candidates import CandidateSet, StageHits
+from app.utils.rank_fusion import RankedList, reciprocal_rank_fusion
+
+# 検索結果キャッシュのエンジンバージョン
+ENGINE_VERSION = "v2"
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -31,6 +40,9 @@ class HybridSearchEngine:
         self.spreadsheet_client = get_spreadsheet_client()
         self.firestore_vector_client = get_firestore_vector_client() if settings.use_firestore_vector_search else None
         self.medical_terms_service = get_medical_terms_service()
+        self.snapshot_service = get_knowledge_snapshot_service()
+        self.dense_index_service = get_dense_index_service()
+        self.result_cache = get_search_result_cache()
 
         if settings.use_firestore_vector_search:
             logger.info("Hybrid Search Engine initialized (Firestore Vector Search enabled)")
@@ -63,16 +75,30 @@ class HybridSearchEngine:
 
         logger.info(f"Starting Hybrid Search - Query: {query[:50]}..., Domain: {domain}, Client ID: {client_id}, Top-K: {top_k}")
 
+        # ステージごとの処理時間（ms）
+        timings: Dict[str, float] = {}
+
         try:
+            # 検索結果キャッシュ（ヒット時は検索・リランキングを省略）
+            cache_key = self.result_cache.make_key(ENGINE_VERSION, query, domain, client_id, top_k)
+            cached_result = self._cached_search_result(query, cache_key, start_time)
+            if cached_result is not None:
+                return cached_result
+
             # Stage 0: Query Preprocessing
+            stage_start = time.time()
             preprocessed = self._preprocess_query(query)
+            timings['preprocess'] = (time.time() - stage_start) * 1000
 
             # Stage 1 & 2: Parallel Search (BM25 + Dense Retrieval)
+            stage_start = time.time()
             candidates = await self._parallel_search(
                 preprocessed['enriched_query'],
                 domain=domain,
-                client_id=client_id
+                client_id=client_id,
+                timings=timings
             )
+            timings['retrieval'] = (time.time() - stage_start) * 1000
 
             if not candidates:
                 logger.warning("No candidates found")
@@ -81,11 +107,15 @@ class HybridSearchEngine:
             # Stage 3: RRF Fusion (すでに並列検索で実施済み)
 
             # Stage 4: Vertex AI Ranking API Re-ranking
-            reranked_results = self.ranker.rerank(
+            stage_start = time.time()
+            # リランキング対象の上位候補のみドキュメント辞書を生成
+            reranked_results = await self.ranker.rerank_async(
                 query=query,
-                documents=candidates[:50],  # Top 50を送信
+                documents=candidates.materialize(settings.search_rerank_candidates),
                 top_n=top_k
             )
+            timings['rerank'] = (time.time() - stage_start) * 1000
+            reranked = is_fully_reranked(reranked_results)
 
             # Stage 5: Result Validation
             validated_result = self._validate_results(
@@ -102,17 +132,34 @@ class HybridSearchEngine:
                 f"Time: {processing_time:.2f}ms"
             )
 
+            metadata = {
+                'extracted_terms': preprocessed['extracted_terms'],
+                'expanded_terms_count': len(preprocessed['expanded_terms']),
+                'candidates_count': candidates.total
+            }
+
+            # リランキングのタイムアウト・エラー時（RRF順のフォールバック）はキャッシュしない
+            if reranked:
+                self.result_cache.set(
+                    cache_key,
+                    validated_result['results'],
+                    extra={
+                        'suggested_terms': validated_result.get('suggested_terms', []),
+                        'metadata': metadata
+                    }
+                )
+
             return {
                 'query': query,
                 'results': validated_result['results'],
                 'total_count': len(validated_result['results']),
                 'processing_time_ms': processing_time,
-                'reranked': True,
+                'reranked': reranked,
                 'suggested_terms': validated_result.get('suggested_terms', []),
                 'metadata': {
-                    'extracted_terms': preprocessed['extracted_terms'],
-                    'expanded_terms_count': len(preprocessed['expanded_terms']),
-                    'candidates_count': len(candidates)
+                    **metadata,
+                    'stage_timings_ms': timings,
+                    'cache_hit': False
                 }
             }
 
@@ -129,6 +176,55 @@ class HybridSearchEngine:
                 'error': str(e)
             }
 
+    def _cached_search_result(
+        self,
+        query: str,
+        cache_key: str,
+        start_time: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        キャッシュ済みの検索結果を現在のスナップショットから再構築
+
+        Args:
+            query: クエリ
+            cache_key: キャッシュキー
+            start_time: 検索開始時刻
+
+        Returns:
+            検索結果（未キャッシュ、またはドキュメントが削除済みの場合はNone）
+        """
+        entry = self.result_cache.get(cache_key)
+        if entry is None:
+            return None
+
+        snapshot = self.snapshot_service.get_snapshot()
+        results = self.result_cache.rehydrate(
+            entry,
+            snapshot.documents_by_ids([hit['id'] for hit in entry['hits']])
+        )
+        if results is None:
+            return None
+
+        processing_time = (time.time() - start_time) * 1000
+
+        logger.info(
+            f"Hybrid Search served from cache - "
+            f"Results: {len(results)}, Time: {processing_time:.2f}ms"
+        )
+
+        return {
+            'query': query,
+            'results': results,
+            'total_count': len(results),
+            'processing_time_ms': processing_time,
+            'reranked': True,
+            'suggested_terms': entry['extra'].get('suggested_terms', []),
+            'metadata': {
+                **entry['extra'].get('metadata', {}),
+                'cache_hit': True
+            }
+        }
+
     def _preprocess_query(self, query: str) -> Dict[str, Any]:
         """
         Stage 0: Query Preprocessing
@@ -155,209 +251,258 @@ class HybridSearchEngine:
         self,
         query: str,
         domain: Optional[str] = None,
-        client_id: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
+        client_id: Optional[str] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> CandidateSet:
         """
         Stage 1 & 2: BM25 + Dense Retrieval (Parallel)
 
+        クエリEmbeddingのAPI呼び出し（またはFirestore Vector Search）を実行している間に
+        BM25スコアリングをワーカースレッドで並行実行し、両方の完了後にRRF統合します。
+        候補はスナップショットの行番号とスコア配列で保持し、ドキュメント辞書は生成しません。
+
         Args:
             query: 拡張済みクエリ
             domain: ドメインフィルタ
             client_id: 利用者IDフィルタ
+            timings: ステージごとの処理時間（ms）の記録先
 
         Returns:
-            候補ドキュメントリスト（RRF統合済み）
+            候補（RRF統合済み）
         """
-        if settings.use_firestore_vector_search:
-            logger.debug("Stage 1 & 2: Parallel Search (BM25 + Firestore Vector Search)")
+        if timings is None:
+            timings = {}
 
-            # Firestore Vector Search使用時
-            # Stage 1: BM25はSpreadsheetから実行（全文検索が必要なため）
-            kb_records = self.spreadsheet_client.read_knowledge_base()
+        # KnowledgeBaseスナップショットを取得（BM25インデックス・フィルタ用ポスティング構築済み）
+        snapshot = self.snapshot_service.get_snapshot()
 
-            # ドメインフィルタ
-            if domain:
-                kb_records = [r for r in kb_records if r.get('domain') == domain]
+        # ドメイン・利用者IDフィルタ（スナップショットのポスティングからマスクを作成）
+        row_mask = snapshot.filter_mask(domain=domain, client_id=client_id)
+        record_count = len(snapshot) if row_mask is None else int(np.count_nonzero(row_mask))
 
-            # 利用者IDフィルタ
-            if client_id:
-                kb_records = [
-                    r for r in kb_records
-                    if (client_id in str(r.get('id', '')) or
-                        client_id in str(r.get('source_id', '')) or
-                        client_id in str(r.get('title', '')) or
-                        client_id in str(r.get('content', '')))
-                ]
-                logger.info(f"Client ID filter applied - {len(kb_records)} records remaining")
+        if client_id:
+            logger.info(f"Client ID filter applied - {record_count} records remaining")
 
-            if not kb_records:
-                logger.warning("No records in KnowledgeBase")
-                return []
+        if record_count == 0:
+            logger.warning("No records in KnowledgeBase")
+            return self._rrf_fusion(snapshot, StageHits.empty(), StageHits.empty())
 
-            logger.debug(f"Loaded {len(kb_records)} KB records for BM25")
+        # スナップショット外のドキュメント（Firestore Vector Search結果のみ）
+        external: List[Dict[str, Any]] = []
 
-            # Stage 1: BM25 Search
-            bm25_results = self._bm25_search(query, kb_records)
+        if settings.use_firestore_vector_search:
+            logger.debug("Stage 1 & 2: Parallel Search (BM25 + Firestore Vector Search)")
+            logger.debug(f"Loaded {record_count} KB records for BM25")
 
-            # Stage 2: Dense Retrieval (Firestore)
-            dense_results = await self._dense_retrieval_firestore(query, domain, client_id)
+            # Stage 1: BM25はSpreadsheetから実行（全文検索が必要なため）
+            # Stage 2: Dense Retrieval (Firestore) と並行実行
+            bm25_hits, (dense_hits, external) = await asyncio.gather(
+                self._run_stage(timings, 'bm25', self._bm25_search, query, snapshot, row_mask),
+                self._timed(timings, 'dense', self._dense_retrieval_firestore(query, snapshot, domain, client_id))
+            )
 
         else:
             logger.debug("Stage 1 & 2: Parallel Search (BM25 + Spreadsheet Dense Retrieval)")
+            logger.debug(f"Loaded {record_count} KB records")
 
-            # Spreadsheet使用時（従来のロジック）
-            # KnowledgeBaseを読み込み
-            kb_records = self.spreadsheet_client.read_knowledge_base()
+            # Stage 1: BM25 Search と クエリEmbedding生成 を並行実行
+            bm25_hits, query_embedding = await asyncio.gather(
+                self._run_stage(timings, 'bm25', self._bm25_search, query, snapshot, row_mask),
+                self._run_stage(timings, 'embedding', self._generate_query_embedding, query)
+            )
 
-            # ドメインフィルタ
-            if domain:
-                kb_records = [r for r in kb_records if r.get('domain') == domain]
+            # Stage 2: Dense Retrieval (Spreadsheet)
+            dense_hits = await self._run_stage(
+                timings, 'dense', self._dense_retrieval, query_embedding, snapshot, row_mask
+            )
 
-            # 利用者IDフィルタ
-            if client_id:
-                kb_records = [
-                    r for r in kb_records
-                    if (client_id in str(r.get('id', '')) or
-                        client_id in str(r.get('source_id', '')) or
-                        client_id in str(r.get('title', '')) or
-                        client_id in str(r.get('content', '')))
-                ]
-                logger.info(f"Client ID filter applied - {len(kb_records)} records remaining")
+        # Stage 3: RRF Fusion（リランキング対象の上位候補のみ保持）
+        stage_start = time.time()
+        candidates = self._rrf_fusion(
+            snapshot,
+            bm25_hits,
+            dense_hits,
+            external=external,
+            top_k=settings.search_rerank_candidates
+        )
+        timings['fusion'] = (time.time() - stage_start) * 1000
 
-            if not kb_records:
-                logger.warning("No records in KnowledgeBase")
-                return []
+        logger.debug(f"RRF Fusion completed - {candidates.total} candidates")
 
-            logger.debug(f"Loaded {len(kb_records)} KB records")
+        return candidates
 
-            # Stage 1: BM25 Search
-            bm25_results = self._bm25_search(query, kb_records)
+    @staticmethod
+    async def _timed(timings: Dict[str, float], stage: str, awaitable: Any) -> Any:
+        """awaitableを実行し、処理時間（ms）を timings[stage] に記録"""
+        stage_start = time.time()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = (time.time() - stage_start) * 1000
 
-            # Stage 2: Dense Retrieval (Spreadsheet)
-            dense_results = self._dense_retrieval(query, kb_records)
+    async def _run_stage(self, timings: Dict[str, float], stage: str, func: Any, *args: Any) -> Any:
+        """同期関数をワーカースレッドで実行し、処理時間（ms）を記録"""
+        return await self._timed(timings, stage, asyncio.to_thread(func, *args))
 
-        # Stage 3: RRF Fusion
-        fused_results = self._rrf_fusion(bm25_results, dense_results)
+    def _generate_query_embedding(self, query: str) -> Optional[List[float]]:
+        """
+        クエリEmbeddingを生成（失敗時はNone）
 
-        logger.debug(f"RRF Fusion completed - {len(fused_results)} candidates")
+        Args:
+            query: クエリ
 
-        return fused_results
+        Returns:
+            クエリEmbedding
+        """
+        try:
+            return self.vertex_ai_client.generate_query_embedding(
+                query=query,
+                output_dimensionality=settings.vertex_ai_embeddings_dimension
+            )
+        except Exception as e:
+            logger.error(f"Query embedding generation failed: {e}", exc_info=True)
+            return None
 
     def _bm25_search(
         self,
         query: str,
-        documents: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
+        snapshot: KnowledgeBaseSnapshot,
+        row_mask: Optional[np.ndarray] = None
+    ) -> StageHits:
         """
         Stage 1: BM25 Keyword Search
 
+        スナップショット構築時に作成済みの転置インデックスを使用するため、
+        コーパスの再トークン化・再フィットは行いません。
+
         Args:
             query: クエリ
-            documents: ドキュメントリスト
+            snapshot: KnowledgeBaseスナップショット
+            row_mask: 検索対象行のブールマスク（Noneの場合は全行）
 
         Returns:
-            BM25スコア付きドキュメント（Top-K）
+            BM25スコア付きの行番号（Top-K）
         """
         try:
-            # BM25スコアリング
-            scored_docs = score_documents_bm25(
-                query=query,
-                documents=documents,
-                k1=1.5,
-                b=0.75
-            )
-
-            # Top-K取得
-            top_k = settings.search_bm25_top_k
-            bm25_results = scored_docs[:top_k]
+            # BM25スコアリング（Top-K）
+            bm25_hits = StageHits.from_pairs(snapshot.bm25_index.search(
+                query,
+                top_k=settings.search_bm25_top_k,
+                row_mask=row_mask
+            ))
 
-            logger.debug(f"BM25 Search completed - Top {len(bm25_results)} results")
+            logger.debug(f"BM25 Search completed - Top {len(bm25_hits)} results")
 
-            return bm25_results
+            return bm25_hits
 
         except Exception as e:
             logger.error(f"BM25 Search failed: {e}", exc_info=True)
-            return []
+            return StageHits.empty()
 
     def _dense_retrieval(
         self,
-        query: str,
-        documents: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
+        query_embedding: Optional[List[float]],
+        snapshot: KnowledgeBaseSnapshot,
+        row_mask: Optional[np.ndarray] = None
+    ) -> StageHits:
         """
         Stage 2: Dense Vector Retrieval
 
         Args:
-            query: クエリ
-            documents: ドキュメントリスト
+            query_embedding: クエリEmbedding（生成失敗時はNone）
+            snapshot: KnowledgeBaseスナップショット
+            row_mask: 検索対象行のブールマスク（Noneの場合は全行）
 
         Returns:
-            類似度スコア付きドキュメント（Top-K）
+            類似度スコア付きの行番号（Top-K）
         """
-        try:
-            # クエリEmbeddingを生成
-            query_embedding = self.vertex_ai_client.generate_query_embedding(
-                query=query,
-                output_dimensionality=settings.vertex_ai_embeddings_dimension
-            )
-
-            # Embeddingsシートを読み込み
-            embeddings_records = self.spreadsheet_client.read_embeddings()
+        if query_embedding is None:
+            return StageHits.empty()
 
-            # KB IDでマッピング
-            embeddings_map = {
-                r.get('kb_id'): r.get('embedding', [])
-                for r in embeddings_records
-            }
-
-            # 各ドキュメントとの類似度を計算
-            scored_docs = []
-            for doc in documents:
-                kb_id = doc.get('id')
-                doc_embedding = embeddings_map.get(kb_id)
-
-                if doc_embedding and len(doc_embedding) > 0:
-                    similarity = calculate_cosine_similarity(query_embedding, doc_embedding)
-                    scored_docs.append({
-                        **doc,
-                        'vector_score': similarity
-                    })
+        try:
+            # 正規化済みEmbedding行列を取得（スナップショット読み込み時に構築済み）
+            embedding_matrix = self.spreadsheet_client.read_embedding_matrix()
 
-            # スコア降順でソート
-            scored_docs.sort(key=lambda x: x['vector_score'], reverse=True)
+            # スナップショット行に対応する行列の行番号（Embeddingが無い行は -1）
+            matrix_rows = snapshot.embedding_rows(embedding_matrix)
+            if row_mask is not None:
+                matrix_rows = matrix_rows[row_mask]
+            matrix_rows = matrix_rows[matrix_rows >= 0]
 
-            # Top-K取得
             top_k = settings.search_dense_top_k
-            dense_results = scored_docs[:top_k]
 
-            logger.debug(f"Dense Retrieval completed - Top {len(dense_results)} results")
+            # 対象が全体の1割未満（利用者フィルタ等）の場合は部分集合を厳密スキャンする方が速い
+            use_index = (
+                self.dense_index_service.enabled and
+                len(matrix_rows) * 10 >= len(embedding_matrix)
+            )
 
-            return dense_results
+            if use_index:
+                # ANNインデックス（IVF等）でTop-K取得
+                allowed_ids = snapshot.id_filter(row_mask) if row_mask is not None else snapshot.row_of
+                # バックグラウンド更新で構築済みのインデックスを優先（旧スナップショットでも再構築しない）
+                index = snapshot.dense_index_for(embedding_matrix)
+                if index is None:
+                    index = self.dense_index_service.get_index(embedding_matrix)
+                id_hits = index.search(
+                    query_embedding,
+                    top_k=top_k,
+                    nprobe=settings.dense_ivf_nprobe,
+                    allowed_ids=allowed_ids
+                )
+                dense_hits = StageHits.from_pairs([
+                    (snapshot.row_of[doc_id], similarity) for doc_id, similarity in id_hits
+                ])
+            else:
+                # 対象行のみを行列ベクトル積 + argpartition でTop-K取得
+                if settings.dense_coarse_dimension > 0:
+                    # プレフィックス次元で粗検索 → 上位候補のみ全次元で再スコアリング
+                    row_hits = embedding_matrix.coarse_search(
+                        query_embedding,
+                        top_k=top_k,
+                        coarse_dimension=settings.dense_coarse_dimension,
+                        candidates=settings.dense_coarse_candidates,
+                        rows=matrix_rows
+                    )
+                else:
+                    row_hits = embedding_matrix.search(query_embedding, top_k=top_k, rows=matrix_rows)
+
+                # 行列の行番号 -> スナップショット行
+                dense_hits = StageHits.from_pairs(row_hits)
+                dense_hits.rows = snapshot.snapshot_rows(embedding_matrix)[dense_hits.rows]
+
+            logger.debug(f"Dense Retrieval completed - Top {len(dense_hits)} results")
+
+            return dense_hits
 
         except Exception as e:
             logger.error(f"Dense Retrieval failed: {e}", exc_info=True)
-            return []
+            return StageHits.empty()
 
     async def _dense_retrieval_firestore(
         self,
         query: str,
+        snapshot: KnowledgeBaseSnapshot,
         domain: Optional[str] = None,
         client_id: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
+    ) -> Tuple[StageHits, List[Dict[str, Any]]]:
         """
         Stage 2: Dense Vector Retrieval (Firestore Vector Search)
 
         Args:
             query: クエリ
+            snapshot: KnowledgeBaseスナップショット
             domain: ドメインフィルタ
             client_id: 利用者IDフィルタ
 
         Returns:
-            類似度スコア付きドキュメント（Top-K）
+            (類似度スコア付きの行番号（Top-K）, スナップショット外のドキュメント)
+            スナップショットに無いドキュメントの行番号は len(snapshot) 以降を割り当てます。
         """
         try:
-            # クエリEmbeddingを生成（2048次元）
-            query_embedding = self.vertex_ai_client.generate_query_embedding(
+            # クエリEmbeddingを生成（2048次元、ブロッキングAPI呼び出しのためワーカースレッドで実行）
+            query_embedding = await asyncio.to_thread(
+                self.vertex_ai_client.generate_query_embedding,
                 query=query,
                 output_dimensionality=settings.vertex_ai_embeddings_dimension
             )
@@ -377,87 +522,69 @@ class HybridSearchEngine:
                 filters=filters
             )
 
-            # vector_scoreフィールドを追加（互換性のため）
+            # Firestoreから返される類似度スコア（_similarityフィールド）をvector_scoreとして使用
+            external: List[Dict[str, Any]] = []
+            pairs = []
             for result in results:
-                # Firestoreから返される類似度スコア（_similarityフィールド）をvector_scoreに変換
-                result['vector_score'] = result.get('_similarity', 0.0)
+                row = snapshot.row_of.get(str(result.get('id', '')))
+                if row is None:
+                    row = len(snapshot) + len(external)
+                    external.append(result)
+                pairs.append((row, result.get('_similarity', 0.0)))
 
-            logger.debug(f"Firestore Dense Retrieval completed - Top {len(results)} results")
+            logger.debug(f"Firestore Dense Retrieval completed - Top {len(pairs)} results")
 
-            return results
+            return StageHits.from_pairs(pairs), external
 
         except Exception as e:
             logger.error(f"Firestore Dense Retrieval failed: {e}", exc_info=True)
-            return []
+            return StageHits.empty(), []
 
     def _rrf_fusion(
         self,
-        bm25_results: List[Dict[str, Any]],
-        dense_results: List[Dict[str, Any]],
-        k: int = 60
-    ) -> List[Dict[str, Any]]:
+        snapshot: KnowledgeBaseSnapshot,
+        bm25_hits: StageHits,
+        dense_hits: StageHits,
+        k: int = 60,
+        external: Optional[List[Dict[str, Any]]] = None,
+        top_k: Optional[int] = None
+    ) -> CandidateSet:
         """
         Stage 3: Reciprocal Rank Fusion (RRF)
 
+        行番号配列のまま統合し、ドキュメント辞書は生成しません。
+
         Args:
-            bm25_results: BM25検索結果
-            dense_results: Dense Retrieval結果
+            snapshot: KnowledgeBaseスナップショット
+            bm25_hits: BM25検索結果
+            dense_hits: Dense Retrieval結果
             k: RRF定数
+            external: スナップショット外のドキュメント
+            top_k: 保持する上位件数（Noneの場合は全件）
 
         Returns:
-            RRF統合済みドキュメント
+            RRF統合済み候補
         """
-        rrf_scores = {}
-
-        # BM25結果のRRFスコア
-        for rank, doc in enumerate(bm25_results):
-            doc_id = doc.get('id')
-            rrf = 1 / (k + rank + 1)
-
-            if doc_id not in rrf_scores:
-                rrf_scores[doc_id] = {
-                    'doc': doc,
-                    'bm25_rrf': 0,
-                    'dense_rrf': 0
-                }
-            rrf_scores[doc_id]['bm25_rrf'] = rrf
-
-        # Dense結果のRRFスコア
-        for rank, doc in enumerate(dense_results):
-            doc_id = doc.get('id')
-            rrf = 1 / (k + rank + 1)
-
-            if doc_id not in rrf_scores:
-                rrf_scores[doc_id] = {
-                    'doc': doc,
-                    'bm25_rrf': 0,
-                    'dense_rrf': 0
-                }
-            rrf_scores[doc_id]['dense_rrf'] = rrf
-
-        # 重み付き統合
-        bm25_weight = settings.search_bm25_weight
-        dense_weight = settings.search_dense_weight
-
-        fused_results = []
-        for doc_id, scores in rrf_scores.items():
-            fused_score = (
-                bm25_weight * scores['bm25_rrf'] +
-                dense_weight * scores['dense_rrf']
-            )
-
-            fused_doc = {
-                **scores['doc'],
-                'rrf_score': fused_score,
-                'bm25_contribution': scores['bm25_rrf'],
-                'dense_contribution': scores['dense_rrf']
-            }
-            fused_results.append(fused_doc)
-
-        # 統合スコア降順でソート
-        fused_results.sort(key=lambda x: x['rrf_score'], reverse=True)
+        fused = reciprocal_rank_fusion(
+            [
+                RankedList(bm25_hits.rows, settings.search_bm25_weight, bm25_hits.scores, name="bm25"),
+                RankedList(dense_hits.rows, settings.search_dense_weight, dense_hits.scores, name="dense"),
+            ],
+            k=k,
+            top_k=top_k
+        )
 
-        return fused_results
+        return CandidateSet(
+            snapshot.records,
+            rows=fused.ids,
+            rrf_scores=fused.scores,
+            bm25_scores=fused.list_scores[0],
+            vector_scores=fused.list_scores[1],
+            bm25_contributions=fused.contributions[0],
+            dense_contributions=fused.contributions[1],
+            external=external,
+            total=fused.total
+        )
 
     def _validate_results(
         self,
@@ -6,7 +6,7 @@ Cloud SQL (MySQL) + プロンプト最適化による高速・高精度なRAGエ
 検索パイプライン:
 1. プロンプト最適化（Gemini 2.5 Flash-Lite）
 2. ベクトル化（gemini-embedding-001）
-3. Vector Search（MySQL VECTOR型）
+3. Vector Search（MySQL VECTOR型、任意でFULLTEXTとのハイブリッド）
 4. リランキング（Vertex AI Ranking API）
 """
 
@@ -15,14 +15,20 @@ import time
 from typing import Any, Dict, List, Optional
 
 from app.config import get_settings
-from app.services.mysql_client import get_mysql_client
+from app.services.dense_index_service import get_dense_index_service
+from app.services.mysql_client import get_mysql_client, parse_json_fields
 from app.services.prompt_optimizer import get_prompt_optimizer
-from app.services.reranker import VertexAIRanker
+from app.services.reranker import VertexAIRanker, is_fully_reranked
+from app.services.search_cache import get_search_result_cache
+from app.services.vector_store import get_vector_store
 from app.services.vertex_ai import get_vertex_ai_client
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# 検索結果キャッシュのエンジンバージョン
+ENGINE_VERSION = "v3"
+
 
 class RAGEngineV3:
     """RAG Engine V3 - 4ステップ検索パイプライン"""
@@ -34,14 +40,28 @@ class RAGEngineV3:
         self.vertex_ai_client = get_vertex_ai_client()
         self.mysql_client = get_mysql_client()
         self.reranker = VertexAIRanker()
+        self.dense_index_service = get_dense_index_service()
+        self.result_cache = get_search_result_cache()
+        self.vector_store = get_vector_store() if settings.v3_dense_backend == "vector_store" else None
 
         # 設定
         self.vector_search_limit = settings.v3_vector_search_limit  # 100件
         self.rerank_top_n = settings.v3_rerank_top_n  # 20件
+        self.dense_backend = settings.v3_dense_backend
+        self.two_phase_search = settings.v3_two_phase_search
+        self.hybrid_search = settings.v3_hybrid_search
+        self.fulltext_limit = settings.v3_fulltext_limit
+
+        # インプロセスANNインデックス用のドメイン -> ID集合（インデックスごとに構築）
+        self._domain_ids: Dict[str, Dict[str, int]] = {}
+        self._domain_ids_index: Optional[Any] = None
 
         logger.info("✅ RAG Engine V3 initialized")
         logger.info(f"   Vector Search Limit: {self.vector_search_limit}")
         logger.info(f"   Rerank Top N: {self.rerank_top_n}")
+        logger.info(f"   Dense Backend: {self.dense_backend}")
+        logger.info(f"   Two-Phase Search: {self.two_phase_search}")
+        logger.info(f"   Hybrid Search: {self.hybrid_search}")
 
     async def search(
         self,
@@ -82,6 +102,7 @@ class RAGEngineV3:
             "total_duration": 0.0,
             "step3_candidates": 0,
             "step4_results": 0,
+            "cache_hit": False,
         }
 
         try:
@@ -92,6 +113,12 @@ class RAGEngineV3:
             logger.info(f"   Top K: {top_k}")
             logger.info("=" * 80)
 
+            # 検索結果キャッシュ（ヒット時はStep 1〜4を省略し、本文のみMySQLから取得）
+            cache_key = self.result_cache.make_key(ENGINE_VERSION, query, domain, client_id, top_k)
+            cached_result = await self._cached_search_result(query, cache_key, metrics, start_time)
+            if cached_result is not None:
+                return cached_result
+
             # ========================================================================
             # Step 1: プロンプト最適化（Gemini 2.5 Flash-Lite）
             # ========================================================================
@@ -135,10 +162,45 @@ class RAGEngineV3:
             if client_id:
                 filters["user_id"] = client_id
 
-            # ★★★ MySQL Vector Search: 1回のみ実行 ★★★
-            candidates = await self.mysql_client.vector_search(
-                query_vector=query_embedding, limit=self.vector_search_limit, filters=filters
-            )
+            candidates = None
+            hydrate = False
+
+            # インプロセスANNインデックス（利用者指定時はMySQL側の絞り込みの方が高精度）
+            if self.dense_backend == "local_index" and not client_id:
+                candidates = await self._local_index_search(query_embedding, filters)
+
+            if self.vector_store is not None:
+                # ★★★ VectorStore（ローカル・Firestore等）: 全カラム取得済み ★★★
+                candidates = await self.vector_store.search(
+                    query_embedding, limit=self.vector_search_limit, filters=filters
+                )
+            elif candidates is None and self.hybrid_search:
+                # ★★★ MySQL Hybrid Search: FULLTEXT（元のクエリの語句）+ Vector Searchを1クエリで取得 ★★★
+                candidates = await self.mysql_client.hybrid_search(
+                    query_text=query,
+                    query_vector=query_embedding,
+                    limit=self.vector_search_limit,
+                    fulltext_limit=self.fulltext_limit,
+                    filters=filters,
+                    vector_weight=settings.search_dense_weight,
+                    fulltext_weight=settings.search_bm25_weight,
+                )
+                hydrate = True
+            elif candidates is None and self.two_phase_search:
+                # ★★★ MySQL Vector Search（2段階）: ID・距離順に本文のみ取得 ★★★
+                candidates = await self.mysql_client.vector_search_compact(
+                    query_vector=query_embedding, limit=self.vector_search_limit, filters=filters
+                )
+                hydrate = True
+
+            if candidates is None:
+                # ★★★ MySQL Vector Search: 1回のみ実行（JSONカラムは最終結果のみパース） ★★★
+                candidates = await self.mysql_client.vector_search(
+                    query_vector=query_embedding,
+                    limit=self.vector_search_limit,
+                    filters=filters,
+                    parse_json=False,
+                )
 
             metrics["step3_duration"] = time.time() - step3_start
             metrics["step3_candidates"] = len(candidates)
@@ -161,10 +223,13 @@ class RAGEngineV3:
             step4_start = time.time()
 
             # ★★★ Vertex AI Ranking API: 1回のみ実行 ★★★
-            results = self.reranker.rerank(
+            results = await self.reranker.rerank_async(
                 query=optimized_query, documents=candidates, top_n=top_k
             )
 
+            # 最終結果のみ全カラム取得・JSONパース
+            results = await self._hydrate_results(results, hydrate)
+
             metrics["step4_duration"] = time.time() - step4_start
             metrics["step4_results"] = len(results)
             logger.info(f"✅ [Step 4/4] 完了: {metrics['step4_duration']:.3f}秒")
@@ -186,6 +251,12 @@ class RAGEngineV3:
             logger.info(f"Results: {len(results)}件")
             logger.info("=" * 80)
 
+            # リランキングのタイムアウト・エラー時（候補順のフォールバック）はキャッシュしない
+            if is_fully_reranked(results):
+                self.result_cache.set(
+                    cache_key, results, extra={"optimized_query": optimized_query}
+                )
+
             return {
                 "query": query,
                 "optimized_query": optimized_query,
@@ -198,6 +269,167 @@ class RAGEngineV3:
             raise
 
 
+    async def _cached_search_result(
+        self,
+        query: str,
+        cache_key: str,
+        metrics: Dict[str, Any],
+        start_time: float,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        キャッシュ済みの検索結果を現在の本文（MySQLまたはVectorStore）から再構築
+
+        Args:
+            query: ユーザークエリ
+            cache_key: キャッシュキー
+            metrics: メトリクス（cache_hit・total_duration を設定）
+            start_time: 検索開始時刻
+
+        Returns:
+            検索結果（未キャッシュ、またはドキュメントが削除済みの場合はNone）
+        """
+        entry = self.result_cache.get(cache_key)
+        if entry is None:
+            return None
+
+        docs = await self._documents_by_ids([hit["id"] for hit in entry["hits"]])
+        results = self.result_cache.rehydrate(entry, docs)
+        if results is None:
+            return None
+
+        metrics["cache_hit"] = True
+        metrics["step4_results"] = len(results)
+        metrics["total_duration"] = time.time() - start_time
+
+        logger.info(
+            f"✅ キャッシュヒット: {len(results)}件 ({metrics['total_duration']:.3f}秒)"
+        )
+
+        return {
+            "query": query,
+            "optimized_query": entry["extra"].get("optimized_query", query),
+            "results": results,
+            "metrics": metrics,
+        }
+
+    async def _hydrate_results(
+        self, results: List[Dict[str, Any]], hydrate: bool
+    ) -> List[Dict[str, Any]]:
+        """
+        リランキング後の最終結果のみ全カラムを取得し、JSONカラムをパース
+
+        Args:
+            results: リランキング済み結果
+            hydrate: 2段階検索の結果か（Trueの場合は全カラムをMySQLから一括取得）
+
+        Returns:
+            最終結果（2段階検索中に削除されたドキュメントは除外）
+        """
+        if not hydrate:
+            return parse_json_fields(results)
+
+        docs = await self._documents_by_ids([result["id"] for result in results])
+
+        hydrated = []
+        for result in results:
+            doc = docs.get(result["id"])
+            if doc is None:
+                continue
+            # スコア系フィールドはリランキング結果を維持
+            hydrated.append({**result, **doc})
+
+        return hydrated
+
+    async def _documents_by_ids(self, doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """IDリストで最新のドキュメントを一括取得（VectorStore使用時はVectorStoreから）"""
+        if self.vector_store is not None:
+            return await self.vector_store.get_many(doc_ids)
+        return await self.mysql_client.get_documents_by_ids(doc_ids)
+
+    async def _local_index_search(
+        self, query_embedding: List[float], filters: Dict[str, Any]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        インプロセスANNインデックスでVector Search（本文はMySQLから一括取得）
+
+        ドメイン指定時はドメインのID集合を `allowed_ids` としてTop-K選択の前に適用します。
+
+        Args:
+            query_embedding: クエリベクトル
+            filters: フィルタ条件（domain はインデックス側、全条件をMySQL側でも再確認）
+
+        Returns:
+            候補リスト（類似度順）。インデックス未構築の場合、またはフィルタ指定時に
+            候補が不足した場合はNone（MySQL Vector Searchにフォールバック）
+        """
+        index = self.dense_index_service.get_index()
+        if index is None or len(index) == 0:
+            logger.warning("⚠️  Dense index not available, falling back to MySQL Vector Search")
+            return None
+
+        allowed_ids = None
+        if filters.get("domain"):
+            allowed_ids = await self._ids_for_domain(index, filters["domain"])
+
+        hits = index.search(
+            query_embedding,
+            top_k=self.vector_search_limit,
+            nprobe=settings.dense_ivf_nprobe,
+            allowed_ids=allowed_ids
+        )
+
+        docs = await self.mysql_client.get_documents_by_ids(
+            [doc_id for doc_id, _ in hits], filters=filters, parse_json=False
+        )
+
+        candidates = []
+        for doc_id, similarity in hits:
+            doc = docs.get(doc_id)
+            if doc is None:
+                continue
+            candidates.append({**doc, "distance": 1 - similarity, "similarity": similarity})
+            if len(candidates) >= self.vector_search_limit:
+                break
+
+        logger.info(f"   Local index: {len(hits)} hits → {len(candidates)} candidates")
+
+        if filters:
+            # 走査外のリスト・インデックスとMySQLの不一致で不足した場合は厳密検索に切り替え
+            available = len(allowed_ids) if allowed_ids is not None else len(index)
+            if len(candidates) < min(self.vector_search_limit, available):
+                logger.warning(
+                    f"⚠️  Local index returned {len(candidates)} filtered candidates, "
+                    f"falling back to MySQL Vector Search"
+                )
+                return None
+
+        return candidates
+
+    async def _ids_for_domain(self, index: Any, domain: str) -> Dict[str, int]:
+        """
+        ドメインのID集合を取得（インデックスが差し替わるまでメモ化）
+
+        インデックス側で行番号対応表をメモ化してベクトル化判定できるよう、
+        ID -> 連番 の辞書として返します（同じ辞書オブジェクトを再利用）。
+
+        Args:
+            index: 現在のDenseインデックス
+            domain: ドメイン
+
+        Returns:
+            ID -> 連番 の辞書
+        """
+        if self._domain_ids_index is not index:
+            self._domain_ids = {}
+            self._domain_ids_index = index
+
+        ids = self._domain_ids.get(domain)
+        if ids is None:
+            domain_ids = await self.mysql_client.get_ids_by_domain(domain)
+            ids = {str(doc_id): row for row, doc_id in enumerate(domain_ids)}
+            self._domain_ids[domain] = ids
+        return ids
+
 # グローバルインスタンス（シングルトン）
 _rag_engine_v3: Optional[RAGEngineV3] = None
 
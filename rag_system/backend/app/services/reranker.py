@@ -2,19 +2,36 @@
 Re-ranking サービス
 
 Vertex AI Ranking APIを使用してドキュメントをリランキングします。
+非同期パスでは同期gRPCクライアントを専用スレッドプールで実行し、
+イベントループ（他のSSEストリーム）をブロックしません。
+
+同一クエリ・同一候補集合（IDと本文の内容ハッシュ）に対するスコアはメモ化し、
+再試行やストリーミング/非ストリーミングの重複呼び出しでAPIを再実行しません。
 """
 
+import asyncio
+import functools
+import hashlib
+import json
 import logging
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 
 from google.auth import default
 from google.cloud import discoveryengine_v1alpha as discoveryengine
 
 from app.config import get_settings
+from app.services.cache_service import get_cache_service
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Ranking API の1リクエストあたりの最大レコード数
+MAX_RECORDS_PER_REQUEST = 200
+
+# リランキング結果メモ化の名前空間
+RERANK_NAMESPACE = "rerank"
+
 
 class VertexAIRanker:
     """Vertex AI Ranking API クライアント"""
@@ -26,6 +43,13 @@ class VertexAIRanker:
 
         # Ranking Service クライアント
         self.client = discoveryengine.RankServiceClient(credentials=credentials)
+        self.cache = get_cache_service()
+
+        # 非同期リランキング用の専用スレッドプール（デフォルトExecutorを占有しない）
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.reranker_max_workers,
+            thread_name_prefix="reranker"
+        )
 
         # Ranking Config パス
         self.ranking_config = (
@@ -37,7 +61,8 @@ class VertexAIRanker:
             f"Vertex AI Ranker initialized - "
             f"Project: {settings.gcp_project_id}, "
             f"Location: {settings.gcp_location}, "
-            f"Model: {settings.reranker_model}"
+            f"Model: {settings.reranker_model}, "
+            f"Timeout: {settings.reranker_timeout}s"
         )
 
     def rerank(
@@ -69,70 +94,82 @@ class VertexAIRanker:
             logger.warning("No documents to rerank")
             return []
 
-        if len(documents) > 200:
-            logger.error(f"Too many documents: {len(documents)} (max: 200)")
-            raise ValueError("Vertex AI Ranking API supports max 200 records per request")
+        self._validate_size(documents)
 
         if top_n is None:
             top_n = settings.reranker_top_n
 
         try:
-            # Ranking Records を作成
-            records = []
-            for doc in documents:
-                # ドキュメントコンテンツを結合
-                # title + content を使用して関連性を最大化
-                doc_text = f"{doc.get('title', '')}\n{doc.get('content', '')}"
-
-                record = discoveryengine.RankingRecord(
-                    id=str(doc.get('id', '')),
-                    title=doc.get('title', ''),
-                    content=doc_text
-                )
-                records.append(record)
-
-            # Ranking リクエスト
-            request = discoveryengine.RankRequest(
-                ranking_config=self.ranking_config,
-                model=settings.reranker_model,
-                query=query,
-                records=records,
-                top_n=top_n
-            )
+            memo_key = self._memo_key(query, documents, top_n)
+            scores = self._memo_get(memo_key)
 
-            logger.debug(
-                f"Ranking request - Query: {query[:50]}..., "
-                f"Records: {len(records)}, Top_n: {top_n}"
-            )
+            if scores is None:
+                def rank() -> List[Tuple[str, float]]:
+                    # API呼び出し
+                    response = self.client.rank(
+                        self._build_request(query, documents, top_n),
+                        timeout=settings.reranker_timeout
+                    )
+                    return self._memo_set(memo_key, response)
 
-            # API呼び出し
-            response = self.client.rank(request)
-
-            # 結果を処理
-            reranked_docs = []
-            for ranked_record in response.records:
-                # 元のドキュメントを取得
-                doc_id = ranked_record.id
-                original_doc = next(
-                    (doc for doc in documents if str(doc.get('id', '')) == doc_id),
-                    None
-                )
-
-                if original_doc:
-                    # スコアを追加
-                    reranked_doc = {
-                        **original_doc,
-                        'rank_score': ranked_record.score,
-                        'reranked': True
-                    }
-                    reranked_docs.append(reranked_doc)
-
-            logger.info(
-                f"Reranking completed - Input: {len(documents)}, "
-                f"Output: {len(reranked_docs)}"
-            )
+                # 同一候補集合の同時リランキングは1回のAPI呼び出しを共有
+                scores = self.cache.single_flight(f"{RERANK_NAMESPACE}:{memo_key}", rank)
+
+            return self._map_results(scores, documents)
+
+        except Exception as e:
+            logger.error(f"Reranking failed: {e}", exc_info=True)
+            # エラー時は元のドキュメントをそのまま返す（フォールバック）
+            logger.warning("Falling back to original document order")
+            return documents[:top_n]
+
+    async def rerank_async(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_n: int = None
+    ) -> List[Dict[str, Any]]:
+        """
+        ドキュメントをリランキング（非同期）
+
+        Ranking API呼び出しを専用スレッドプールで実行し、`reranker_timeout` 秒で
+        打ち切ります。タイムアウト・エラー時は元の順序にフォールバックします。
+
+        200件を超える場合は `reranker_max_chunks` を上限に200件ずつのチャンクに分割して
+        並行にリランキングし、スコア順にマージします（上限を超えた分は切り捨て）。
+
+        Args:
+            query: クエリテキスト
+            documents: ドキュメントのリスト（rerank と同じ形式）
+            top_n: 返すドキュメント数（Noneの場合は設定値を使用）
+
+        Returns:
+            リランキングされたドキュメントのリスト（スコア付き）
+
+        Raises:
+            ValueError: ドキュメントが200件を超え、チャンク分割が無効な場合
+        """
+        if not documents:
+            logger.warning("No documents to rerank")
+            return []
+
+        if top_n is None:
+            top_n = settings.reranker_top_n
+
+        if len(documents) > MAX_RECORDS_PER_REQUEST and settings.reranker_max_chunks > 1:
+            return await self._rerank_chunks(query, documents, top_n)
 
-            return reranked_docs
+        self._validate_size(documents)
+
+        try:
+            scores = await self._rank_scores_async(query, documents, top_n)
+
+            return self._map_results(scores, documents)
+
+        except asyncio.TimeoutError:
+            logger.error(f"Reranking timed out after {settings.reranker_timeout}s")
+            logger.warning("Falling back to original document order")
+            return documents[:top_n]
 
         except Exception as e:
             logger.error(f"Reranking failed: {e}", exc_info=True)
@@ -140,6 +177,227 @@ class VertexAIRanker:
             logger.warning("Falling back to original document order")
             return documents[:top_n]
 
+    async def _rank_scores_async(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_n: int
+    ) -> List[Tuple[str, float]]:
+        """メモ化済みスコアを取得し、無ければRanking APIを呼び出して (ID, スコア) を返す"""
+        memo_key = self._memo_key(query, documents, top_n)
+        scores = self._memo_get(memo_key)
+        if scores is not None:
+            return scores
+
+        async def rank() -> List[Tuple[str, float]]:
+            response = await self._rank_async(self._build_request(query, documents, top_n))
+            return self._memo_set(memo_key, response)
+
+        # 同一候補集合の同時リランキングは1回のAPI呼び出しを共有
+        return await self.cache.single_flight_async(f"{RERANK_NAMESPACE}:{memo_key}", rank)
+
+    async def _rank_async(self, request: discoveryengine.RankRequest) -> Any:
+        """Ranking APIを専用スレッドプールで呼び出し（イベントループをブロックしない）"""
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(
+            loop.run_in_executor(
+                self._executor,
+                functools.partial(self.client.rank, request, timeout=settings.reranker_timeout)
+            ),
+            timeout=settings.reranker_timeout
+        )
+
+    async def _rerank_chunks(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_n: int
+    ) -> List[Dict[str, Any]]:
+        """
+        200件ずつのチャンクを並行にリランキングし、スコア順にマージ
+
+        Ranking APIのスコアはクエリとレコードの絶対的な関連度のため、チャンク間で比較できます。
+        失敗したチャンクのドキュメントは、成功分の後ろに元の順序で補完します。
+
+        Args:
+            query: クエリテキスト
+            documents: ドキュメントのリスト（200件超）
+            top_n: 返すドキュメント数
+
+        Returns:
+            リランキングされたドキュメントのリスト（スコア付き）
+        """
+        budget = settings.reranker_max_chunks * MAX_RECORDS_PER_REQUEST
+        if len(documents) > budget:
+            logger.warning(
+                f"Reranking budget exceeded - Input: {len(documents)}, "
+                f"Max: {budget} ({settings.reranker_max_chunks} chunks)"
+            )
+            documents = documents[:budget]
+
+        chunks = [
+            documents[start:start + MAX_RECORDS_PER_REQUEST]
+            for start in range(0, len(documents), MAX_RECORDS_PER_REQUEST)
+        ]
+
+        chunk_scores = await asyncio.gather(
+            *(
+                self._rank_scores_async(query, chunk, min(top_n, len(chunk)))
+                for chunk in chunks
+            ),
+            return_exceptions=True
+        )
+
+        reranked_docs = []
+        failed_docs = []
+        for chunk, scores in zip(chunks, chunk_scores):
+            if isinstance(scores, BaseException):
+                logger.error(f"Reranking chunk failed: {scores!r}")
+                failed_docs.extend(chunk)
+                continue
+            reranked_docs.extend(self._map_results(scores, chunk))
+
+        reranked_docs.sort(key=lambda doc: doc['rank_score'], reverse=True)
+
+        if failed_docs:
+            logger.warning(f"Falling back to original order for {len(failed_docs)} documents")
+            reranked_docs.extend(failed_docs)
+
+        logger.info(
+            f"Chunked reranking completed - Input: {len(documents)}, "
+            f"Chunks: {len(chunks)}, Failed: {len(failed_docs)}"
+        )
+
+        return reranked_docs[:top_n]
+
+    @staticmethod
+    def _validate_size(documents: List[Dict[str, Any]]) -> None:
+        """1リクエストあたりのレコード数上限（200件）を確認"""
+        if len(documents) > MAX_RECORDS_PER_REQUEST:
+            logger.error(f"Too many documents: {len(documents)} (max: {MAX_RECORDS_PER_REQUEST})")
+            raise ValueError("Vertex AI Ranking API supports max 200 records per request")
+
+    def _build_request(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_n: int
+    ) -> discoveryengine.RankRequest:
+        """Ranking リクエストを作成"""
+        # Ranking Records を作成
+        records = []
+        for doc in documents:
+            # ドキュメントコンテンツを結合
+            # title + content を使用して関連性を最大化
+            doc_text = f"{doc.get('title', '')}\n{doc.get('content', '')}"
+
+            record = discoveryengine.RankingRecord(
+                id=str(doc.get('id', '')),
+                title=doc.get('title', ''),
+                content=doc_text
+            )
+            records.append(record)
+
+        logger.debug(
+            f"Ranking request - Query: {query[:50]}..., "
+            f"Records: {len(records)}, Top_n: {top_n}"
+        )
+
+        return discoveryengine.RankRequest(
+            ranking_config=self.ranking_config,
+            model=settings.reranker_model,
+            query=query,
+            records=records,
+            top_n=top_n
+        )
+
+    @staticmethod
+    def _memo_key(query: str, documents: List[Dict[str, Any]], top_n: int) -> str:
+        """
+        メモ化キーを生成（クエリ・モデル・top_n・候補の順序付き (ID, 内容ハッシュ)）
+
+        内容ハッシュはAPIに送る title + content から計算するため、
+        本文が更新された候補は別キーになります。
+        """
+        fingerprint = [
+            [
+                str(doc.get('id', '')),
+                hashlib.sha1(
+                    f"{doc.get('title', '')}\n{doc.get('content', '')}".encode()
+                ).hexdigest()
+            ]
+            for doc in documents
+        ]
+        key_data = json.dumps(
+            [settings.reranker_model, query, top_n, fingerprint],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(key_data.encode()).hexdigest()
+
+    def _memo_get(self, memo_key: str) -> Optional[List[Tuple[str, float]]]:
+        """メモ化済みの (ID, スコア) リストを取得"""
+        if not settings.cache_enabled or settings.cache_rerank_ttl <= 0:
+            return None
+
+        scores = self.cache.get(RERANK_NAMESPACE, memo_key)
+        if scores is not None:
+            logger.info(f"✅ Using memoized rerank scores ({len(scores)} records)")
+        return scores
+
+    def _memo_set(self, memo_key: str, response: Any) -> List[Tuple[str, float]]:
+        """Ranking レスポンスを (ID, スコア) リストに変換してメモ化"""
+        scores = [(record.id, record.score) for record in response.records]
+
+        if settings.cache_enabled and settings.cache_rerank_ttl > 0:
+            self.cache.set(RERANK_NAMESPACE, memo_key, scores, settings.cache_rerank_ttl)
+
+        return scores
+
+    @staticmethod
+    def _map_results(
+        scores: List[Tuple[str, float]],
+        documents: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """(ID, スコア) を元のドキュメントに対応付け（IDの辞書引き）"""
+        docs_by_id: Dict[str, Dict[str, Any]] = {}
+        for doc in documents:
+            # 重複IDは先頭のドキュメントを優先（従来の挙動）
+            docs_by_id.setdefault(str(doc.get('id', '')), doc)
+
+        reranked_docs = []
+        for doc_id, score in scores:
+            original_doc = docs_by_id.get(doc_id)
+
+            if original_doc:
+                # スコアを追加
+                reranked_docs.append({
+                    **original_doc,
+                    'rank_score': score,
+                    'reranked': True
+                })
+
+        logger.info(
+            f"Reranking completed - Input: {len(documents)}, "
+            f"Output: {len(reranked_docs)}"
+        )
+
+        return reranked_docs
+
+
+def is_fully_reranked(documents: List[Dict[str, Any]]) -> bool:
+    """
+    全ドキュメントにRanking APIのスコアが付与されているか
+
+    タイムアウト・エラー時のフォールバック（元の順序のまま返したドキュメント）を含む場合はFalse。
+
+    Args:
+        documents: rerank / rerank_async の戻り値
+
+    Returns:
+        全てリランキング済みの場合True
+    """
+    return all(doc.get('reranked') for doc in documents)
+
 
 # モジュールレベルのシングルトン
 _ranker: VertexAIRanker = None
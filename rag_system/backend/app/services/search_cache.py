@@ -0,0 +1,179 @@
+"""
+検索結果キャッシュサービス
+
+最終結果（リランキング済みのID・スコアのみ）を正規化クエリ・フィルタ・top_k・
+エンジンバージョンをキーにキャッシュします。ドキュメント本文はキャッシュせず、
+ヒット時に現在のスナップショット（V2）またはMySQL（V3）から再構築します。
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from typing import List, Dict, Any, Optional, Mapping
+
+from app.config import get_settings
+from app.services.cache_service import get_cache_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# キャッシュ名前空間
+SEARCH_RESULTS_NAMESPACE = "search_results"
+
+# 結果ドキュメントのうち、検索時に付与されるスコア系フィールド（本文以外にキャッシュする値）
+SCORE_FIELDS = (
+    'bm25_score',
+    'vector_score',
+    'rrf_score',
+    'bm25_contribution',
+    'dense_contribution',
+    'rank_score',
+    'reranked',
+    'distance',
+    'similarity',
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    キャッシュキー用にクエリを正規化（NFKC・小文字化・空白の統一）
+
+    Args:
+        query: クエリ
+
+    Returns:
+        正規化済みクエリ
+    """
+    normalized = unicodedata.normalize("NFKC", query).lower()
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+class SearchResultCache:
+    """検索結果キャッシュ"""
+
+    def __init__(self):
+        """初期化"""
+        self.cache = get_cache_service()
+
+    @property
+    def enabled(self) -> bool:
+        """キャッシュが有効か"""
+        return settings.cache_enabled and settings.cache_search_results_ttl > 0
+
+    @staticmethod
+    def make_key(
+        engine: str,
+        query: str,
+        domain: Optional[str] = None,
+        client_id: Optional[str] = None,
+        top_k: Optional[int] = None
+    ) -> str:
+        """
+        キャッシュキーを生成
+
+        Args:
+            engine: エンジンバージョン（例: "v2", "v3"）
+            query: クエリ
+            domain: ドメインフィルタ
+            client_id: 利用者IDフィルタ
+            top_k: 結果数
+
+        Returns:
+            SHA256キー
+        """
+        key_data = json.dumps(
+            [engine, normalize_query(query), domain or "", client_id or "", top_k],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(key_data.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        キャッシュエントリを取得
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            {'hits': [{'id', 'scores'}], 'extra': {...}, 'created_at'}（未キャッシュの場合はNone）
+        """
+        if not self.enabled:
+            return None
+        return self.cache.get(SEARCH_RESULTS_NAMESPACE, key)
+
+    def set(
+        self,
+        key: str,
+        results: List[Dict[str, Any]],
+        extra: Optional[Dict[str, Any]] = None
+    ):
+        """
+        最終結果のID・スコアをキャッシュに保存（空の結果は保存しない）
+
+        Args:
+            key: キャッシュキー
+            results: 最終結果（リランキング済み）
+            extra: 結果と一緒に返す付加情報（suggested_terms 等）
+        """
+        if not self.enabled or not results:
+            return
+
+        hits = [
+            {
+                'id': str(doc.get('id', '')),
+                'scores': {field: doc[field] for field in SCORE_FIELDS if field in doc}
+            }
+            for doc in results
+        ]
+
+        self.cache.set(
+            SEARCH_RESULTS_NAMESPACE,
+            key,
+            {'hits': hits, 'extra': extra or {}, 'created_at': time.time()},
+            settings.cache_search_results_ttl
+        )
+
+    @staticmethod
+    def rehydrate(
+        entry: Dict[str, Any],
+        docs_by_id: Mapping[str, Dict[str, Any]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        キャッシュしたID・スコアから結果ドキュメントを再構築
+
+        Args:
+            entry: キャッシュエントリ
+            docs_by_id: ID -> 現在のドキュメント
+
+        Returns:
+            結果ドキュメントのリスト（いずれかのドキュメントが削除済みの場合はNone）
+        """
+        results = []
+        for hit in entry['hits']:
+            doc = docs_by_id.get(hit['id'])
+            if doc is None:
+                return None
+            results.append({**doc, **hit['scores']})
+        return results
+
+
+# モジュールレベルのシングルトン
+_search_result_cache: Optional[SearchResultCache] = None
+
+
+def get_search_result_cache() -> SearchResultCache:
+    """
+    検索結果キャッシュを取得（シングルトン）
+
+    Returns:
+        SearchResultCache: 検索結果キャッシュ
+    """
+    global _search_result_cache
+    if _search_result_cache is None:
+        _search_result_cache = SearchResultCache()
+    return _search_result_cache
@@ -0,0 +1,180 @@
+"""
+スナップショット バックグラウンド更新サービス（stale-while-revalidate）
+
+KnowledgeBase・Embedding行列・検索用インデックスをバックグラウンドで再構築し、
+完成後にまとめて差し替えます。リクエストは常に構築済みの（多少古い）スナップショットを使用し、
+TTL切れ時にSheets APIの読み込みやインデックス構築を待つことはありません。
+
+更新に失敗した場合は直前のスナップショットを提供し続けます（最大 `snapshot_max_stale` 秒）。
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from app.config import get_settings
+from app.services.cache_service import get_cache_service
+from app.services.dense_index_service import get_dense_index_service
+from app.services.knowledge_snapshot import KnowledgeBaseSnapshot, get_knowledge_snapshot_service
+from app.services.spreadsheet import get_spreadsheet_client
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# KnowledgeBase（全件）のキャッシュキー（SpreadsheetClient.read_knowledge_base と同一）
+KNOWLEDGE_BASE_CACHE_KEY = "knowledge_base_limit_None"
+
+# Embedding行列のキャッシュキー（SpreadsheetClient.read_embedding_matrix と同一）
+EMBEDDING_MATRIX_CACHE_KEY = "embedding_matrix"
+
+
+class SnapshotRefresher:
+    """スナップショットのバックグラウンド更新"""
+
+    def __init__(self):
+        """初期化"""
+        self.cache = get_cache_service()
+        self.spreadsheet_client = get_spreadsheet_client()
+        self.snapshot_service = get_knowledge_snapshot_service()
+        self.dense_index_service = get_dense_index_service()
+
+        # 同時に複数の更新が走らないようにする
+        self._refresh_lock = threading.Lock()
+
+        self.last_refresh_at: Optional[float] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.refresh_count = 0
+        self.failure_count = 0
+        self.record_count = 0
+        self.embedding_count = 0
+
+        logger.info(
+            f"Snapshot Refresher initialized "
+            f"(interval: {settings.snapshot_refresh_interval}s, max stale: {settings.snapshot_max_stale}s)"
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """バックグラウンド更新が有効か（キャッシュ無効時は差し替え先が無いため無効）"""
+        return settings.snapshot_refresh_enabled and settings.cache_enabled
+
+    def refresh(self) -> bool:
+        """
+        スナップショットを再構築して差し替え（同期処理: スレッドで実行すること）
+
+        新しいKnowledgeBase・Embedding行列・インデックスを現在のスナップショットとは別に構築し、
+        全て揃ってから差し替えます。失敗時は現在のスナップショットを維持します。
+
+        Returns:
+            更新に成功したか（他の更新が実行中の場合はFalse）
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.info("Snapshot refresh already in progress, skipping")
+            return False
+
+        start_time = time.time()
+        try:
+            # 1. 新しいデータを取得（キャッシュを経由しない）
+            records = self.spreadsheet_client._fetch_knowledge_base()
+            if settings.embedding_snapshot_dir:
+                # 同期ジョブが書き出したバイナリスナップショット（バージョン単位でキャッシュ済み）
+                matrix = self.spreadsheet_client.read_embedding_matrix()
+            else:
+                matrix = self.spreadsheet_client._build_embedding_matrix()
+
+            # 2. 検索用インデックスを事前構築（リクエスト側での構築を避ける）
+            snapshot = KnowledgeBaseSnapshot(records)
+            snapshot.embedding_rows(matrix)
+            if self.dense_index_service.enabled:
+                # スナップショットに紐付け、差し替えまでは公開しない
+                index = self.dense_index_service.build_index(matrix)
+                snapshot.attach_dense_index(matrix, index)
+
+            # 3. まとめて差し替え（キャッシュ・Denseインデックス・スナップショットを同一ロック内で公開）
+            def publish():
+                self.cache.set("vector_db", EMBEDDING_MATRIX_CACHE_KEY, matrix, settings.snapshot_max_stale)
+                self.cache.set("vector_db", KNOWLEDGE_BASE_CACHE_KEY, records, settings.snapshot_max_stale)
+                if self.dense_index_service.enabled:
+                    self.dense_index_service.install(matrix, index)
+
+            self.snapshot_service.install(snapshot, publish)
+
+            self.last_refresh_at = time.time()
+            self.last_duration_ms = (self.last_refresh_at - start_time) * 1000
+            self.last_error = None
+            self.refresh_count += 1
+            self.record_count = len(records)
+            self.embedding_count = len(matrix)
+
+            logger.info(
+                f"🔄 Snapshot refreshed: {len(records)} records, {len(matrix)} embeddings "
+                f"({self.last_duration_ms:.0f}ms)"
+            )
+            return True
+
+        except Exception as e:
+            self.failure_count += 1
+            self.last_error = str(e)
+            logger.error(f"Snapshot refresh failed (serving previous snapshot): {e}", exc_info=True)
+            return False
+
+        finally:
+            self._refresh_lock.release()
+
+    def age_seconds(self) -> Optional[float]:
+        """
+        最後に更新に成功してからの経過秒数
+
+        Returns:
+            経過秒数（未更新の場合はNone）
+        """
+        if self.last_refresh_at is None:
+            return None
+        return time.time() - self.last_refresh_at
+
+    def is_stale(self) -> bool:
+        """提供中のスナップショットが `snapshot_max_stale` を超えて古いか（初回更新前は失敗時のみTrue）"""
+        age = self.age_seconds()
+        if age is None:
+            return self.failure_count > 0
+        return age > settings.snapshot_max_stale
+
+    def status(self) -> Dict[str, Any]:
+        """
+        ヘルスチェック用の更新状況を取得
+
+        Returns:
+            更新状況
+        """
+        age = self.age_seconds()
+        return {
+            "enabled": self.enabled,
+            "interval_seconds": settings.snapshot_refresh_interval,
+            "max_stale_seconds": settings.snapshot_max_stale,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "last_duration_ms": round(self.last_duration_ms, 1) if self.last_duration_ms is not None else None,
+            "refresh_count": self.refresh_count,
+            "failure_count": self.failure_count,
+            "last_error": self.last_error,
+            "records": self.record_count,
+            "embeddings": self.embedding_count,
+        }
+
+
+# モジュールレベルのシングルトン
+_snapshot_refresher: Optional[SnapshotRefresher] = None
+
+
+def get_snapshot_refresher() -> SnapshotRefresher:
+    """
+    スナップショット更新サービスを取得（シングルトン）
+
+    Returns:
+        SnapshotRefresher: スナップショット更新サービス
+    """
+    global _snapshot_refresher
+    if _snapshot_refresher is None:
+        _snapshot_refresher = SnapshotRefresher()
+    return _snapshot_refresher
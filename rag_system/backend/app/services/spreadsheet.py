@@ -14,6 +14,8 @@ from googleapiclient.errors import HttpError
 
 from app.config import get_settings
 from app.services.cache_service import get_cache_service
+from app.utils.embedding_matrix import EmbeddingMatrix
+from app.utils.embedding_snapshot import current_snapshot_version, load_embedding_snapshot
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -94,12 +96,35 @@ class SpreadsheetClient:
         cache = get_cache_service()
         cache_key = f"knowledge_base_limit_{limit}"
 
-        if settings.cache_enabled:
-            cached_data = cache.get("vector_db", cache_key)
-            if cached_data is not None:
-                logger.info(f"✅ Using cached KnowledgeBase data ({len(cached_data)} records)")
-                return cached_data
+        if not settings.cache_enabled:
+            return self._fetch_knowledge_base(limit)
 
+        cached_data = cache.get("vector_db", cache_key)
+        if cached_data is not None:
+            logger.info(f"✅ Using cached KnowledgeBase data ({len(cached_data)} records)")
+            return cached_data
+
+        # 同時にキャッシュミスしたリクエストは1回のシート読み込みを共有
+        records = cache.get_or_load(
+            "vector_db",
+            cache_key,
+            lambda: self._fetch_knowledge_base(limit),
+            settings.cache_vector_db_ttl
+        )
+        logger.info(f"💾 Cached KnowledgeBase data (TTL: {settings.cache_vector_db_ttl}s)")
+
+        return records
+
+    def _fetch_knowledge_base(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        KnowledgeBaseシートを取得してパース（キャッシュなし）
+
+        Args:
+            limit: 取得する最大行数（Noneの場合は全データ）
+
+        Returns:
+            ナレッジベースのレコードリスト
+        """
         logger.info("📡 Fetching KnowledgeBase from Spreadsheet...")
         sheet_name = self.sheets['knowledge_base']
         values = self.read_sheet(sheet_name)
@@ -136,11 +161,6 @@ class SpreadsheetClient:
 
         logger.info(f"Loaded {len(records)} records from KnowledgeBase")
 
-        # キャッシュに保存
-        if settings.cache_enabled:
-            cache.set("vector_db", cache_key, records, settings.cache_vector_db_ttl)
-            logger.info(f"💾 Cached KnowledgeBase data (TTL: {settings.cache_vector_db_ttl}s)")
-
         return records
 
     def read_embeddings(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
@@ -159,12 +179,118 @@ class SpreadsheetClient:
         cache = get_cache_service()
         cache_key = f"embeddings_limit_{limit}"
 
-        if settings.cache_enabled:
-            cached_data = cache.get("vector_db", cache_key)
-            if cached_data is not None:
-                logger.info(f"✅ Using cached Embeddings data ({len(cached_data)} records)")
-                return cached_data
+        if not settings.cache_enabled:
+            return self._fetch_embedding_records(limit)
+
+        cached_data = cache.get("vector_db", cache_key)
+        if cached_data is not None:
+            logger.info(f"✅ Using cached Embeddings data ({len(cached_data)} records)")
+            return cached_data
+
+        # 同時にキャッシュミスしたリクエストは1回のシート読み込みを共有
+        records = cache.get_or_load(
+            "vector_db",
+            cache_key,
+            lambda: self._fetch_embedding_records(limit),
+            settings.cache_vector_db_ttl
+        )
+
+        logger.info(f"Loaded {len(records)} embeddings")
+        logger.info(f"💾 Cached Embeddings data (TTL: {settings.cache_vector_db_ttl}s)")
+
+        return records
+
+    def read_embedding_matrix(self) -> EmbeddingMatrix:
+        """
+        Embeddingsシートを正規化済みfloat32行列として読み込み（キャッシュ対応）
+
+        Pythonリスト形式のEmbeddingsはキャッシュせず、行列のみを保持します。
+        `embedding_snapshot_dir` が設定されている場合は、同期ジョブが書き出した
+        バイナリスナップショットをmmapで読み込み、Sheets APIは呼び出しません。
+
+        Returns:
+            EmbeddingMatrix: 正規化済みEmbedding行列とID配列
+        """
+        cache = get_cache_service()
+        cache_key = "embedding_matrix"
+
+        if settings.embedding_snapshot_dir:
+            matrix = self._read_embedding_snapshot(cache, cache_key)
+            if matrix is not None:
+                return matrix
+            logger.warning(
+                f"Embedding snapshot not found in {settings.embedding_snapshot_dir}, "
+                f"falling back to Spreadsheet"
+            )
+
+        if not settings.cache_enabled:
+            return self._build_embedding_matrix()
+
+        cached_matrix = cache.get("vector_db", cache_key)
+        if cached_matrix is not None:
+            logger.info(f"✅ Using cached embedding matrix ({len(cached_matrix)} rows)")
+            return cached_matrix
+
+        # 同時にキャッシュミスしたリクエストは1回のシート読み込み・行列構築を共有
+        matrix = cache.get_or_load(
+            "vector_db",
+            cache_key,
+            self._build_embedding_matrix,
+            settings.cache_vector_db_ttl
+        )
+        logger.info(
+            f"💾 Cached embedding matrix ({matrix.nbytes / 1024 / 1024:.1f}MB, "
+            f"TTL: {settings.cache_vector_db_ttl}s)"
+        )
+
+        return matrix
+
+    def _build_embedding_matrix(self) -> EmbeddingMatrix:
+        """Embeddingsシートを取得して正規化済み行列を構築（キャッシュなし）"""
+        records = self._fetch_embedding_records()
+        return EmbeddingMatrix.from_records(
+            records,
+            dimension=settings.vertex_ai_embeddings_dimension
+        )
+
+    def _read_embedding_snapshot(self, cache, cache_key: str) -> Optional[EmbeddingMatrix]:
+        """
+        バイナリスナップショットからEmbedding行列を読み込み（バージョン単位でキャッシュ）
+
+        Args:
+            cache: キャッシュサービス
+            cache_key: キャッシュキー
+
+        Returns:
+            EmbeddingMatrix（スナップショットが無い場合はNone）
+        """
+        version = current_snapshot_version(settings.embedding_snapshot_dir)
+        if version is None:
+            return None
+
+        cached_matrix = cache.get("vector_db", cache_key) if settings.cache_enabled else None
+        if cached_matrix is not None and cached_matrix.version == version:
+            return cached_matrix
+
+        def load():
+            matrix = load_embedding_snapshot(settings.embedding_snapshot_dir, version=version)
+            if settings.cache_enabled and matrix is not None:
+                cache.set("vector_db", cache_key, matrix, settings.cache_vector_db_ttl)
+            return matrix
 
+        # 同一バージョンの同時読み込みは1回に集約
+        return cache.single_flight(f"embedding_snapshot:{version}", load)
+
+    def _fetch_embedding_records(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Embeddingsシートを取得してパース（キャッシュなし）
+
+        Args:
+            limit: 取得する最大行数（Noneの場合は全データ）
+
+        Returns:
+            Embeddingsレコードリスト（統合されたembeddingを含む）
+        """
         logger.info("📡 Fetching Embeddings from Spreadsheet...")
         sheet_name = self.sheets['embeddings']
         values = self.read_sheet(sheet_name)
@@ -198,13 +324,6 @@ class SpreadsheetClient:
 
             records.append(record)
 
-        logger.info(f"Loaded {len(records)} embeddings")
-
-        # キャッシュに保存
-        if settings.cache_enabled:
-            cache.set("vector_db", cache_key, records, settings.cache_vector_db_ttl)
-            logger.info(f"💾 Cached Embeddings data (TTL: {settings.cache_vector_db_ttl}s)")
-
         return records
 
     def read_medical_terms(self) -> List[Dict[str, Any]]:
@@ -0,0 +1,288 @@
+"""
+VectorStore インターフェース
+
+Spreadsheet / Firestore / MySQL / ローカル（SQLite + NumPy mmap）の各バックエンドを
+共通の非同期インターフェースで扱うためのプロトコルとアダプタを提供します。
+
+ドキュメントは `id` を持つ辞書として扱います。
+
+VectorStore（全バックエンド共通・読み取り）:
+- search: フィルタ（domain, user_id の完全一致）付きでコサイン類似度検索し、
+  `similarity`（取得できる場合）付きのドキュメントを類似度順に返す
+- get_many: ID -> ドキュメント（存在しないIDは含まない）
+- stats: 件数・次元数などの統計情報
+
+WritableVectorStore（書き込み可能なバックエンドのみ: ローカル）:
+- upsert_batch / delete: ドキュメントとEmbeddingの登録・更新・削除
+
+Spreadsheet / Firestore / MySQL は同期・移行スクリプトでのみ更新するため読み取り専用です。
+書き込みの可否は `isinstance(store, WritableVectorStore)` で判定できます。
+
+クラウドSDKは各アダプタの生成時にのみ読み込むため、ローカルバックエンドは
+クラウドサービスへの接続・認証なしで利用できます。
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Protocol, Sequence, runtime_checkable
+
+import numpy as np
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 検索時に適用するフィルタ項目（完全一致）
+FILTER_FIELDS = ("domain", "user_id")
+
+
+@runtime_checkable
+class VectorStore(Protocol):
+    """ベクトルストアの共通インターフェース（読み取り）"""
+
+    name: str
+
+    async def search(
+        self,
+        query_vector: Sequence[float],
+        limit: int = 10,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """フィルタ付きベクトル検索（類似度順）"""
+        ...
+
+    async def get_many(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """IDリストでドキュメントを一括取得"""
+        ...
+
+    async def stats(self) -> Dict[str, Any]:
+        """統計情報"""
+        ...
+
+
+@runtime_checkable
+class WritableVectorStore(VectorStore, Protocol):
+    """書き込み可能なベクトルストアのインターフェース"""
+
+    async def upsert_batch(
+        self,
+        documents: Sequence[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]]
+    ) -> int:
+        """ドキュメントとEmbeddingを一括登録・更新し、件数を返す"""
+        ...
+
+    async def delete(self, ids: Sequence[str]) -> int:
+        """ドキュメントを削除し、削除件数を返す"""
+        ...
+
+
+def active_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    検索に適用するフィルタのみ抽出（空値・未対応の項目は除外）
+
+    Args:
+        filters: フィルタ条件
+
+    Returns:
+        フィルタ条件（domain, user_id のうち値があるもの）
+    """
+    if not filters:
+        return {}
+    return {key: filters[key] for key in FILTER_FIELDS if filters.get(key)}
+
+
+class SpreadsheetVectorStore:
+    """Spreadsheet（KnowledgeBaseスナップショット + Embedding行列）のアダプタ（読み取り専用）"""
+
+    name = "spreadsheet"
+
+    def __init__(self, snapshot_service=None, spreadsheet_client=None):
+        """
+        初期化
+
+        Args:
+            snapshot_service: KnowledgeSnapshotService（Noneの場合はシングルトン）
+            spreadsheet_client: SpreadsheetClient（Noneの場合はシングルトン）
+        """
+        if snapshot_service is None:
+            from app.services.knowledge_snapshot import get_knowledge_snapshot_service
+            snapshot_service = get_knowledge_snapshot_service()
+        if spreadsheet_client is None:
+            from app.services.spreadsheet import get_spreadsheet_client
+            spreadsheet_client = get_spreadsheet_client()
+
+        self.snapshot_service = snapshot_service
+        self.spreadsheet_client = spreadsheet_client
+
+    def _search(
+        self,
+        query_vector: Sequence[float],
+        limit: int,
+        filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """スナップショット上でベクトル検索（同期処理）"""
+        snapshot = self.snapshot_service.get_snapshot()
+        matrix = self.spreadsheet_client.read_embedding_matrix()
+
+        rows = None
+        if filters:
+            # 完全一致のポスティングのみ使用（利用者IDの部分一致は行わない）
+            mask = np.ones(len(snapshot), dtype=bool)
+            for field, postings in (("domain", snapshot.domain_rows), ("user_id", snapshot.user_rows)):
+                if field in filters:
+                    matched = np.zeros(len(snapshot), dtype=bool)
+                    matched[postings.get(filters[field], [])] = True
+                    mask &= matched
+            rows = snapshot.embedding_rows(matrix)[mask]
+            rows = rows[rows >= 0]
+
+        snapshot_rows = snapshot.snapshot_rows(matrix)
+
+        results = []
+        for row, similarity in matrix.search(query_vector, top_k=limit, rows=rows):
+            snapshot_row = snapshot_rows[row]
+            if snapshot_row < 0:
+                continue
+            results.append({**snapshot.records[snapshot_row], "similarity": similarity})
+
+        return results
+
+    async def search(self, query_vector, limit=10, filters=None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._search, query_vector, limit, active_filters(filters))
+
+    async def get_many(self, ids) -> Dict[str, Dict[str, Any]]:
+        snapshot = await asyncio.to_thread(self.snapshot_service.get_snapshot)
+        return snapshot.documents_by_ids([str(doc_id) for doc_id in ids])
+
+    async def stats(self) -> Dict[str, Any]:
+        snapshot = self.snapshot_service.current
+        return {
+            "backend": self.name,
+            "documents": len(snapshot) if snapshot is not None else None,
+        }
+
+
+class FirestoreVectorStore:
+    """Firestore Vector Search のアダプタ（読み取り専用）"""
+
+    name = "firestore"
+
+    def __init__(self, client=None):
+        """
+        初期化
+
+        Args:
+            client: FirestoreVectorClient（Noneの場合はシングルトン）
+        """
+        if client is None:
+            from app.services.firestore_vector_service import get_firestore_vector_client
+            client = get_firestore_vector_client()
+        self.client = client
+
+    @staticmethod
+    def _with_id(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """FirestoreのドキュメントID・類似度を `id` / `similarity` に揃える"""
+        doc.setdefault("id", doc.get("_firestore_id"))
+        if "_similarity" in doc:
+            doc.setdefault("similarity", doc["_similarity"])
+        return doc
+
+    async def search(self, query_vector, limit=10, filters=None) -> List[Dict[str, Any]]:
+        docs = await self.client.vector_search(
+            list(query_vector), limit=limit, filters=active_filters(filters)
+        )
+        return [self._with_id(doc) for doc in docs]
+
+    async def get_many(self, ids) -> Dict[str, Dict[str, Any]]:
+        docs = await self.client.get_by_ids(list(ids))
+        return {doc_id: self._with_id(doc) for doc_id, doc in docs.items()}
+
+    async def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "collection": self.client.collection_name}
+
+
+class MySQLVectorStore:
+    """MySQL（Cloud SQL VECTOR型）のアダプタ（読み取り専用、knowledge_base は migrate_to_mysql.py で登録）"""
+
+    name = "mysql"
+
+    def __init__(self, client=None):
+        """
+        初期化
+
+        Args:
+            client: MySQLVectorClient（Noneの場合はシングルトン）
+        """
+        if client is None:
+            from app.services.mysql_client import get_mysql_client
+            client = get_mysql_client()
+        self.client = client
+
+    async def search(self, query_vector, limit=10, filters=None) -> List[Dict[str, Any]]:
+        return await self.client.vector_search(
+            query_vector=list(query_vector), limit=limit, filters=active_filters(filters)
+        )
+
+    async def get_many(self, ids) -> Dict[str, Dict[str, Any]]:
+        return await self.client.get_documents_by_ids(list(ids))
+
+    async def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **await self.client.health_check()}
+
+
+def create_vector_store(backend: Optional[str] = None) -> VectorStore:
+    """
+    設定に応じたVectorStoreを生成
+
+    Args:
+        backend: バックエンド名（Noneの場合は設定値。未設定時は既存のフラグから決定）
+
+    Returns:
+        VectorStore
+
+    Raises:
+        ValueError: 未知のバックエンド名の場合
+    """
+    backend = backend or settings.vector_store_backend
+    if not backend:
+        if settings.use_rag_engine_v3:
+            backend = "mysql"
+        elif settings.use_firestore_vector_search:
+            backend = "firestore"
+        else:
+            backend = "spreadsheet"
+
+    if backend == "local":
+        from app.services.local_vector_store import LocalVectorStore
+        return LocalVectorStore(
+            settings.local_vector_store_dir,
+            dimension=settings.vertex_ai_embeddings_dimension,
+        )
+    if backend == "mysql":
+        return MySQLVectorStore()
+    if backend == "firestore":
+        return FirestoreVectorStore()
+    if backend == "spreadsheet":
+        return SpreadsheetVectorStore()
+
+    raise ValueError(f"Unknown vector store backend: {backend}")
+
+
+# モジュールレベルのシングルトン
+_vector_store: Optional[VectorStore] = None
+
+
+def get_vector_store() -> VectorStore:
+    """
+    VectorStoreを取得（シングルトン）
+
+    Returns:
+        VectorStore
+    """
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = create_vector_store()
+        logger.info(f"Vector store initialized - Backend: {_vector_store.name}")
+    return _vector_store
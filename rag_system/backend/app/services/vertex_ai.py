@@ -14,6 +14,7 @@ from vertexai.language_models import TextEmbeddingInput, TextEmbeddingModel
 
 from app.config import get_settings
 from app.services.cache_service import get_cache_service
+from app.services.embedding_disk_cache import get_embedding_disk_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -102,6 +103,8 @@ class VertexAIClient:
         """
         クエリ用のEmbeddingを生成（キャッシュ対応）
 
+        インメモリキャッシュ（L1）→ ディスクキャッシュ（L2、設定時のみ）の順に参照します。
+
         Args:
             query: クエリテキスト
             output_dimensionality: 出力次元数
@@ -109,9 +112,12 @@ class VertexAIClient:
         Returns:
             Embeddingベクトル
         """
-        # キャッシュキーを生成（クエリテキストのハッシュ）
+        # キャッシュキーを生成（モデル・クエリテキスト・次元数のハッシュ）
         cache = get_cache_service()
-        cache_key = hashlib.sha256(f"{query}_{output_dimensionality}".encode()).hexdigest()
+        disk_cache = get_embedding_disk_cache()
+        cache_key = hashlib.sha256(
+            f"{settings.vertex_ai_embeddings_model}_{query}_{output_dimensionality}".encode()
+        ).hexdigest()
 
         if settings.cache_enabled:
             cached_embedding = cache.get("embeddings", cache_key)
@@ -119,21 +125,40 @@ class VertexAIClient:
                 logger.info(f"✅ Using cached query embedding for: {query[:50]}...")
                 return cached_embedding
 
-        # ★★★ Vertex AI API呼び出し: 1回のみ実行 ★★★
-        logger.info(f"📡 Generating query embedding for: {query[:50]}...")
-        vectors = self.generate_embeddings(
-            texts=[query],
-            task_type="RETRIEVAL_QUERY",
-            output_dimensionality=output_dimensionality
-        )
-        embedding = vectors[0]
+            if disk_cache is not None:
+                cached_embedding = disk_cache.get(cache_key)
+                if cached_embedding is not None:
+                    logger.info(f"✅ Using disk-cached query embedding for: {query[:50]}...")
+                    cache.set("embeddings", cache_key, cached_embedding, settings.cache_embeddings_ttl)
+                    return cached_embedding
+
+        def generate() -> List[float]:
+            # 先行リクエストの完了直後に参加した場合はキャッシュ済みの値を使用
+            if settings.cache_enabled:
+                cached_embedding = cache.get("embeddings", cache_key)
+                if cached_embedding is not None:
+                    return cached_embedding
+
+            # ★★★ Vertex AI API呼び出し: 1回のみ実行 ★★★
+            logger.info(f"📡 Generating query embedding for: {query[:50]}...")
+            vectors = self.generate_embeddings(
+                texts=[query],
+                task_type="RETRIEVAL_QUERY",
+                output_dimensionality=output_dimensionality
+            )
+            embedding = vectors[0]
 
-        # キャッシュに保存
-        if settings.cache_enabled:
-            cache.set("embeddings", cache_key, embedding, settings.cache_embeddings_ttl)
-            logger.info(f"💾 Cached query embedding (TTL: {settings.cache_embeddings_ttl}s)")
+            # キャッシュに保存
+            if settings.cache_enabled:
+                cache.set("embeddings", cache_key, embedding, settings.cache_embeddings_ttl)
+                if disk_cache is not None:
+                    disk_cache.set(cache_key, embedding)
+                logger.info(f"💾 Cached query embedding (TTL: {settings.cache_embeddings_ttl}s)")
+
+            return embedding
 
-        return embedding
+        # 同一クエリの同時リクエストは1回のAPI呼び出しを共有
+        return cache.single_flight(f"embeddings:{cache_key}", generate)
 
     def generate_document_embeddings(
         self,
@@ -0,0 +1,132 @@
+"""
+Aho–Corasick 複数パターン照合ユーティリティ
+
+辞書（パターン -> 値）からオートマトンを1回だけ構築し、
+テキスト長に比例する1回の走査で全パターンの出現を検出します。
+最左最長一致（leftmost-longest）で重なりの無いマッチを選択できるため、
+長い用語に含まれる短い用語（例: 「糖尿病性腎症」中の「糖尿病」）を二重に検出しません。
+"""
+
+from collections import deque
+from typing import Any, Dict, List, Mapping, Tuple
+
+
+class AhoCorasick:
+    """Aho–Corasick オートマトン（構築後は読み取り専用）"""
+
+    def __init__(self, patterns: Mapping[str, Any]):
+        """
+        初期化（オートマトン構築）
+
+        Args:
+            patterns: パターン -> 値（空文字列のパターンは無視）
+        """
+        # ノードごとの遷移・失敗リンク・出力（終端パターンの長さと値）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._length: List[int] = [0]
+        self._value: List[Any] = [None]
+        # 失敗リンクを辿った先で最も近い終端ノード（出力リンク）
+        self._output: List[int] = [0]
+
+        for pattern, value in patterns.items():
+            if pattern:
+                self._insert(pattern, value)
+
+        self._build_links()
+
+    def __len__(self) -> int:
+        """登録パターン数"""
+        return sum(1 for length in self._length if length > 0)
+
+    def _insert(self, pattern: str, value: Any):
+        """パターンをトライに追加"""
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._length.append(0)
+                self._value.append(None)
+                self._output.append(0)
+            node = next_node
+
+        self._length[node] = len(pattern)
+        self._value[node] = value
+
+    def _build_links(self):
+        """幅優先で失敗リンクと出力リンクを構築"""
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+
+                self._fail[child] = fail
+                self._output[child] = fail if self._length[fail] else self._output[fail]
+                queue.append(child)
+
+    def find_all(self, text: str) -> List[Tuple[int, int, Any]]:
+        """
+        全てのマッチ（重なりを含む）を検出
+
+        Args:
+            text: 入力テキスト
+
+        Returns:
+            (開始位置, 終了位置, 値) のリスト（終了位置の昇順）
+        """
+        goto = self._goto
+        fail = self._fail
+        length = self._length
+        output = self._output
+        value = self._value
+
+        matches = []
+        node = 0
+        for end, char in enumerate(text, start=1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            hit = node if length[node] else output[node]
+            while hit:
+                matches.append((end - length[hit], end, value[hit]))
+                hit = output[hit]
+
+        return matches
+
+    def find_leftmost_longest(self, text: str) -> List[Tuple[int, int, Any]]:
+        """
+        最左最長一致で重なりの無いマッチを検出
+
+        Args:
+            text: 入力テキスト
+
+        Returns:
+            (開始位置, 終了位置, 値) のリスト（出現順）
+        """
+        # 開始位置ごとに最長のマッチを保持
+        longest: Dict[int, Tuple[int, Any]] = {}
+        for start, end, value in self.find_all(text):
+            current = longest.get(start)
+            if current is None or end > current[0]:
+                longest[start] = (end, value)
+
+        selected = []
+        position = 0
+        for start in sorted(longest):
+            if start < position:
+                continue
+            end, value = longest[start]
+            selected.append((start, end, value))
+            position = end
+
+        return selected
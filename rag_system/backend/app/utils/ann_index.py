@@ -0,0 +1,548 @@
+"""
+近似最近傍（ANN）インデックスユーティリティ
+
+NumPyのみで実装したIVF（Inverted File）インデックスを提供します。
+
+- 球面k-meansで学習したセントロイドごとに転置リスト（ベクトルブロック）を保持
+- 検索時はクエリに近い `nprobe` 個のリストのみをスコアリング（recall/latencyの調整ノブ）
+- ドキュメント単位の追加・削除に対応（再学習不要）
+- `.npz` ファイルへの保存・読み込みに対応
+
+`FlatIndex` はリストが1つだけのIVFで、全件を厳密にスコアリングします。
+"""
+
+import copy
+import json
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from typing import Container, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.utils.embedding_matrix import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """行ごとにL2正規化（ゼロベクトルはそのまま）"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class _InvertedList:
+    """転置リスト（連続したベクトルブロック + ID）"""
+
+    __slots__ = ('ids', 'vectors', 'size')
+
+    def __init__(self, dimension: int, capacity: int = 16):
+        self.ids: List[str] = []
+        self.vectors = np.empty((capacity, dimension), dtype=np.float32)
+        self.size = 0
+
+    def _reserve(self, capacity: int):
+        if capacity <= self.vectors.shape[0]:
+            return
+        new_capacity = max(capacity, self.vectors.shape[0] * 2)
+        grown = np.empty((new_capacity, self.vectors.shape[1]), dtype=np.float32)
+        grown[:self.size] = self.vectors[:self.size]
+        self.vectors = grown
+
+    def extend(self, ids: Sequence[str], vectors: np.ndarray) -> int:
+        """末尾に追加し、追加開始位置を返す"""
+        start = self.size
+        self._reserve(start + len(ids))
+        self.vectors[start:start + len(ids)] = vectors
+        self.ids.extend(ids)
+        self.size += len(ids)
+        return start
+
+    def pop(self, pos: int) -> Optional[str]:
+        """
+        指定位置を削除（末尾要素で埋める）
+
+        Returns:
+            位置が移動したID（移動が無い場合はNone）
+        """
+        last = self.size - 1
+        moved = None
+        if pos != last:
+            self.vectors[pos] = self.vectors[last]
+            self.ids[pos] = self.ids[last]
+            moved = self.ids[pos]
+        self.ids.pop()
+        self.size -= 1
+        return moved
+
+    def view(self) -> np.ndarray:
+        return self.vectors[:self.size]
+
+    def copy(self) -> '_InvertedList':
+        """複製（ベクトルブロック・IDリストを共有しない）"""
+        clone = _InvertedList.__new__(_InvertedList)
+        clone.ids = list(self.ids)
+        clone.vectors = self.vectors[:max(self.size, 1)].copy()
+        clone.size = self.size
+        return clone
+
+
+class IVFIndex:
+    """IVF（Inverted File）近似最近傍インデックス（コサイン類似度）"""
+
+    # allowed_ids 用の行番号対応表をメモ化する辞書の最大数
+    _MAX_ROW_MAPPINGS = 8
+
+    def __init__(self, dimension: int, nlist: int = 0, nprobe: int = 16):
+        """
+        初期化
+
+        Args:
+            dimension: ベクトル次元数
+            nlist: 転置リスト数（0の場合は学習時に sqrt(N) から自動決定）
+            nprobe: 検索時に走査するリスト数（大きいほど高recall・高レイテンシ）
+        """
+        self.dimension = dimension
+        self.nlist = nlist
+        self.nprobe = nprobe
+
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[_InvertedList] = []
+        self._location: Dict[str, Tuple[int, int]] = {}  # id -> (リスト番号, 位置)
+        # 外部の ID -> 行番号 辞書に対するリストごとの行番号の対応表（allowed_ids のベクトル化判定用、辞書ごとにメモ化）
+        self._row_mappings: Dict[int, Tuple[Dict[str, int], List[Optional[np.ndarray]]]] = {}
+
+        # 構築元スナップショットのバージョン名
+        self.source_version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._location)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._location
+
+    @property
+    def is_trained(self) -> bool:
+        """セントロイド学習済みか"""
+        return self.centroids is not None
+
+    def ids(self) -> Iterable[str]:
+        """登録済みIDを列挙"""
+        return self._location.keys()
+
+    def vectors_for(self, ids: Sequence[str]) -> np.ndarray:
+        """
+        登録済みIDの（正規化済み）ベクトルを取得
+
+        Args:
+            ids: 登録済みIDのリスト
+
+        Returns:
+            ベクトル行列 (N x D)
+
+        Raises:
+            KeyError: 未登録のIDを含む場合
+        """
+        locations = np.array([self._location[str(doc_id)] for doc_id in ids], dtype=np.int64).reshape(-1, 2)
+        vectors = np.empty((len(locations), self.dimension), dtype=np.float32)
+        for list_no in np.unique(locations[:, 0]):
+            selected = locations[:, 0] == list_no
+            vectors[selected] = self._lists[int(list_no)].vectors[locations[selected, 1]]
+        return vectors
+
+    def copy(self) -> 'IVFIndex':
+        """
+        複製（転置リストを共有しないため、複製側の追加・削除は元のインデックスの検索に影響しない）
+
+        Returns:
+            同じ型のインデックス
+        """
+        clone = copy.copy(self)
+        clone._lists = [inverted_list.copy() for inverted_list in self._lists]
+        clone._location = dict(self._location)
+        clone._row_mappings = {}
+        return clone
+
+    @classmethod
+    def build(
+        cls,
+        ids: Sequence[str],
+        vectors: np.ndarray,
+        nlist: int = 0,
+        nprobe: int = 16,
+        iterations: int = 10,
+        seed: int = 0
+    ) -> 'IVFIndex':
+        """
+        ベクトル集合からインデックスを学習・構築
+
+        Args:
+            ids: ID列
+            vectors: ベクトル行列 (N x D)
+            nlist: 転置リスト数（0の場合は自動）
+            nprobe: 検索時に走査するリスト数
+            iterations: k-means反復回数
+            seed: 乱数シード
+
+        Returns:
+            IVFIndex
+        """
+        start_time = time.time()
+
+        index = cls(vectors.shape[1], nlist=nlist, nprobe=nprobe)
+        index.train(vectors, iterations=iterations, seed=seed)
+        index.add(ids, vectors)
+
+        logger.info(
+            f"Built {cls.__name__} - Vectors: {len(index)}, Lists: {index.nlist}, "
+            f"Time: {time.time() - start_time:.2f}s"
+        )
+
+        return index
+
+    def train(self, vectors: np.ndarray, iterations: int = 10, seed: int = 0):
+        """
+        球面k-meansでセントロイドを学習
+
+        Args:
+            vectors: 学習用ベクトル (N x D)
+            iterations: 反復回数
+            seed: 乱数シード
+        """
+        n = len(vectors)
+        if self.nlist <= 0:
+            self.nlist = max(1, int(math.sqrt(n)))
+        self.nlist = max(1, min(self.nlist, n)) if n > 0 else 1
+        self._row_mappings = {}
+
+        if self.nlist == 1 or n == 0:
+            self.centroids = np.zeros((1, self.dimension), dtype=np.float32)
+            self._lists = [_InvertedList(self.dimension)]
+            return
+
+        rng = np.random.default_rng(seed)
+
+        # 学習サンプル（リストあたり最大64件）
+        sample_size = min(n, self.nlist * 64)
+        sample = _normalize_rows(vectors[np.sort(rng.choice(n, sample_size, replace=False))])
+
+        centroids = sample[rng.choice(sample_size, self.nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = self._assign(sample, centroids)
+            counts = np.bincount(assignment, minlength=self.nlist)
+
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+
+            # 空クラスタはランダムなサンプル点で再初期化
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+
+            centroids = _normalize_rows(sums)
+
+        self.centroids = centroids
+        self._lists = [_InvertedList(self.dimension) for _ in range(self.nlist)]
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+        """各ベクトルを最も近いセントロイドに割り当て（チャンク処理）"""
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            block = vectors[start:start + chunk_size]
+            assignment[start:start + chunk_size] = np.argmax(block @ centroids.T, axis=1)
+        return assignment
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray, chunk_size: int = 65536):
+        """
+        ベクトルを追加（既存IDは置き換え）
+
+        Args:
+            ids: ID列
+            vectors: ベクトル行列 (N x D)
+            chunk_size: 一度に割り当てるベクトル数
+        """
+        if not self.is_trained:
+            raise RuntimeError("Index is not trained")
+
+        if len(ids) == 0:
+            return
+
+        ids = [str(doc_id) for doc_id in ids]
+        self.remove([doc_id for doc_id in ids if doc_id in self._location])
+        self._row_mappings = {}
+
+        # 大きな行列（mmap含む）を一括コピーしないようチャンク単位で処理
+        for chunk_start in range(0, len(ids), chunk_size):
+            chunk_ids = ids[chunk_start:chunk_start + chunk_size]
+            chunk = _normalize_rows(vectors[chunk_start:chunk_start + chunk_size])
+            assignment = self._assign(chunk, self.centroids)
+
+            order = np.argsort(assignment, kind='stable')
+            boundaries = np.flatnonzero(np.diff(assignment[order])) + 1
+            for group in np.split(order, boundaries):
+                list_no = int(assignment[group[0]])
+                group_ids = [chunk_ids[i] for i in group]
+                start = self._lists[list_no].extend(group_ids, chunk[group])
+                for offset, doc_id in enumerate(group_ids):
+                    self._location[doc_id] = (list_no, start + offset)
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """
+        ベクトルを削除
+
+        Args:
+            ids: 削除するID
+
+        Returns:
+            削除件数
+        """
+        self._row_mappings = {}
+        removed = 0
+        for doc_id in ids:
+            location = self._location.pop(str(doc_id), None)
+            if location is None:
+                continue
+
+            list_no, pos = location
+            moved = self._lists[list_no].pop(pos)
+            if moved is not None:
+                self._location[moved] = (list_no, pos)
+            removed += 1
+
+        return removed
+
+    def _rows_in(self, list_no: int, row_of: Dict[str, int]) -> np.ndarray:
+        """転置リストの各位置のIDが外部の ID -> 行番号 辞書で何行目か（無い場合は -1、辞書ごとにメモ化）"""
+        cached = self._row_mappings.get(id(row_of))
+        if cached is None or cached[0] is not row_of:
+            if len(self._row_mappings) >= self._MAX_ROW_MAPPINGS:
+                self._row_mappings.pop(next(iter(self._row_mappings)), None)
+            cached = (row_of, [None] * len(self._lists))
+            self._row_mappings[id(row_of)] = cached
+
+        rows = cached[1][list_no]
+        if rows is None:
+            inverted_list = self._lists[list_no]
+            rows = np.fromiter(
+                (row_of.get(doc_id, -1) for doc_id in inverted_list.ids),
+                dtype=np.int64,
+                count=inverted_list.size
+            )
+            cached[1][list_no] = rows
+        return rows
+
+    def _allowed_mask(self, list_no: int, allowed_ids: Container[str]) -> np.ndarray:
+        """
+        転置リスト内の検索対象位置のブールマスクを作成
+
+        スナップショットの ID -> 行番号 辞書、またはその行マスク（RowMaskFilter）の場合は
+        メモ化した対応表でベクトル化して判定し、それ以外は `in` 判定を位置ごとに行います。
+        """
+        row_of = allowed_ids if isinstance(allowed_ids, dict) else getattr(allowed_ids, "row_of", None)
+        if isinstance(row_of, dict):
+            rows = self._rows_in(list_no, row_of)
+            allowed = rows >= 0
+            mask = getattr(allowed_ids, "mask", None)
+            if mask is not None:
+                allowed[allowed] = mask[rows[allowed]]
+            return allowed
+
+        inverted_list = self._lists[list_no]
+        return np.fromiter(
+            (doc_id in allowed_ids for doc_id in inverted_list.ids),
+            dtype=bool,
+            count=inverted_list.size
+        )
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        top_k: int,
+        nprobe: Optional[int] = None,
+        allowed_ids: Optional[Container[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        近似Top-K検索
+
+        Args:
+            query_vector: クエリベクトル
+            top_k: 取得件数
+            nprobe: 走査するリスト数（Noneの場合はインデックスの既定値）
+            allowed_ids: 検索対象IDの集合（`in` 判定可能なもの、Noneの場合は全件）。
+                ID -> 行番号 辞書または RowMaskFilter はベクトル化して判定
+
+        Returns:
+            (ID, コサイン類似度) のリスト（類似度降順）
+        """
+        if not self.is_trained or len(self) == 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape[0] != self.dimension:
+            raise ValueError(
+                f"Vector dimensions don't match: {query.shape[0]} vs {self.dimension}"
+            )
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            raise ValueError("Zero vector detected")
+        query = query / norm
+
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        probe = top_k_indices(self.centroids @ query, nprobe)
+
+        # 候補は (リスト番号, 位置) で保持し、IDはTop-Kのみ解決
+        list_parts = []
+        position_parts = []
+        score_parts = []
+        for list_no in probe:
+            list_no = int(list_no)
+            inverted_list = self._lists[list_no]
+            if inverted_list.size == 0:
+                continue
+
+            scores = inverted_list.view() @ query
+            if allowed_ids is not None:
+                positions = np.flatnonzero(self._allowed_mask(list_no, allowed_ids))
+                scores = scores[positions]
+            else:
+                positions = np.arange(inverted_list.size)
+
+            list_parts.append(np.full(len(positions), list_no, dtype=np.int64))
+            position_parts.append(positions)
+            score_parts.append(scores)
+
+        if not score_parts:
+            return []
+
+        scores = np.concatenate(score_parts)
+        if len(scores) == 0:
+            return []
+
+        list_nos = np.concatenate(list_parts)
+        positions = np.concatenate(position_parts)
+        top = top_k_indices(scores, top_k)
+
+        return [
+            (self._lists[list_nos[i]].ids[positions[i]], float(scores[i]))
+            for i in top
+        ]
+
+    def save(self, path: Union[str, Path]):
+        """
+        インデックスをファイルに保存（アトミックに差し替え）
+
+        Args:
+            path: 保存先パス（.npz）
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        sizes = np.asarray([lst.size for lst in self._lists], dtype=np.int64)
+        if len(self):
+            vectors = np.concatenate([lst.view() for lst in self._lists])
+        else:
+            vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        ids = [doc_id for lst in self._lists for doc_id in lst.ids]
+
+        meta = {
+            "type": type(self).__name__,
+            "dimension": self.dimension,
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "source_version": self.source_version
+        }
+
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                sizes=sizes,
+                vectors=vectors,
+                ids=np.asarray(ids, dtype=str),
+                meta=np.asarray(json.dumps(meta))
+            )
+        os.replace(tmp_path, path)
+
+        logger.info(f"Saved {meta['type']} - Vectors: {len(self)}, Path: {path}")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'IVFIndex':
+        """
+        ファイルからインデックスを読み込み
+
+        Args:
+            path: 保存先パス（.npz）
+
+        Returns:
+            IVFIndex（保存時のクラス）
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            index_class = FlatIndex if meta["type"] == FlatIndex.__name__ else IVFIndex
+
+            index = index_class.__new__(index_class)
+            IVFIndex.__init__(index, meta["dimension"], nlist=meta["nlist"], nprobe=meta["nprobe"])
+            index.source_version = meta.get("source_version")
+            index.centroids = data["centroids"]
+
+            ids = data["ids"].tolist()
+            vectors = data["vectors"]
+            offset = 0
+            for list_no, size in enumerate(data["sizes"].tolist()):
+                inverted_list = _InvertedList(index.dimension, capacity=max(size, 16))
+                inverted_list.extend(ids[offset:offset + size], vectors[offset:offset + size])
+                index._lists.append(inverted_list)
+                for pos, doc_id in enumerate(inverted_list.ids):
+                    index._location[doc_id] = (list_no, pos)
+                offset += size
+
+        logger.info(f"Loaded {meta['type']} - Vectors: {len(index)}, Path: {path}")
+
+        return index
+
+
+class FlatIndex(IVFIndex):
+    """全件を厳密にスコアリングするインデックス（リスト数1のIVF）"""
+
+    def __init__(self, dimension: int, nlist: int = 1, nprobe: int = 1):
+        super().__init__(dimension, nlist=1, nprobe=1)
+        self.centroids = np.zeros((1, dimension), dtype=np.float32)
+        self._lists = [_InvertedList(dimension)]
+
+    def train(self, vectors: np.ndarray, iterations: int = 10, seed: int = 0):
+        """学習不要"""
+        return
+
+
+def build_dense_index(
+    index_type: str,
+    ids: Sequence[str],
+    vectors: np.ndarray,
+    nlist: int = 0,
+    nprobe: int = 16
+) -> IVFIndex:
+    """
+    設定に応じたDenseインデックスを構築
+
+    Args:
+        index_type: インデックス種別（"flat" または "ivf"）
+        ids: ID列
+        vectors: ベクトル行列 (N x D)
+        nlist: 転置リスト数（IVFのみ）
+        nprobe: 検索時に走査するリスト数（IVFのみ）
+
+    Returns:
+        構築済みインデックス
+    """
+    if index_type == "ivf":
+        return IVFIndex.build(ids, vectors, nlist=nlist, nprobe=nprobe)
+    if index_type == "flat":
+        return FlatIndex.build(ids, vectors)
+    raise ValueError(f"Unknown dense index type: {index_type}")
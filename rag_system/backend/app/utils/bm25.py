@@ -1,14 +1,24 @@
 """
 BM25スコアリングユーティリティ
+
+転置インデックス（ポスティングリスト）を用いたBM25実装を提供します。
+インデックスはKnowledgeBaseスナップショットごとに1回だけ構築し、
+検索時はクエリトークンのポスティングリストのみを走査します。
 """
 
 import math
-from typing import List, Dict
+import re
+from typing import List, Dict, Any, Optional, Tuple
 from collections import Counter
 
+import numpy as np
+
+
+_TOKEN_PATTERN = re.compile(r'[ぁ-んァ-ヶー一-龠々a-zA-Z0-9]+')
+
 
 class BM25:
-    """BM25スコアリングクラス"""
+    """BM25スコアリングクラス（転置インデックス）"""
 
     def __init__(
         self,
@@ -35,9 +45,15 @@ class BM25:
         self.idf = {}  # IDF値
         self.doc_lengths = []  # 各ドキュメントの長さ
 
+        # 転置インデックス: token -> (行番号配列, TF配列)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        # 長さ正規化項 k1 * (1 - b + b * dl / avgdl) を事前計算
+        self._length_norm = np.zeros(0, dtype=np.float32)
+
     def fit(self, corpus: List[List[str]]):
         """
-        コーパスでBM25をフィット
+        コーパスでBM25をフィット（転置インデックスを構築）
 
         Args:
             corpus: トークン化されたドキュメントのリスト
@@ -48,12 +64,24 @@ class BM25:
         self.doc_lengths = [len(doc) for doc in corpus]
         self.avgdl = sum(self.doc_lengths) / self.corpus_size if self.corpus_size > 0 else 0
 
+        # ポスティングリストを構築
+        rows_by_token: Dict[str, List[int]] = {}
+        tfs_by_token: Dict[str, List[int]] = {}
+        for row, doc in enumerate(corpus):
+            for token, tf in Counter(doc).items():
+                rows_by_token.setdefault(token, []).append(row)
+                tfs_by_token.setdefault(token, []).append(tf)
+
+        self.postings = {
+            token: (
+                np.asarray(rows, dtype=np.int32),
+                np.asarray(tfs_by_token[token], dtype=np.float32)
+            )
+            for token, rows in rows_by_token.items()
+        }
+
         # ドキュメント頻度を計算
-        self.doc_freqs = {}
-        for doc in corpus:
-            unique_tokens = set(doc)
-            for token in unique_tokens:
-                self.doc_freqs[token] = self.doc_freqs.get(token, 0) + 1
+        self.doc_freqs = {token: len(rows) for token, rows in rows_by_token.items()}
 
         # IDF値を計算
         self.idf = {}
@@ -65,6 +93,51 @@ class BM25:
             # フロア値を適用
             self.idf[token] = max(idf_value, self.epsilon)
 
+        # 長さ正規化項を事前計算
+        doc_lengths = np.asarray(self.doc_lengths, dtype=np.float32)
+        if self.avgdl > 0:
+            self._length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / self.avgdl)
+        else:
+            self._length_norm = np.full(self.corpus_size, self.k1, dtype=np.float32)
+
+    def search(
+        self,
+        query: List[str],
+        top_k: Optional[int] = None,
+        row_mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        クエリにマッチしたドキュメントのみをスコアリング
+
+        計算量はクエリトークンのポスティングリスト長の合計に比例します。
+
+        Args:
+            query: トークン化されたクエリ
+            top_k: 返す件数（Noneの場合は全マッチ）
+            row_mask: 検索対象の行を示すブールマスク（Noneの場合は全行）
+
+        Returns:
+            (行番号, BM25スコア) のリスト（スコア降順）
+        """
+        rows, scores = self._accumulate(query)
+
+        if row_mask is not None and len(rows) > 0:
+            keep = row_mask[rows]
+            rows, scores = rows[keep], scores[keep]
+
+        if len(rows) == 0:
+            return []
+
+        # Top-K選択（argpartitionで部分ソート）
+        if top_k is not None and top_k < len(rows):
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            rows, scores = rows[top], scores[top]
+
+        # スコア降順（同点は行番号昇順）
+        order = np.lexsort((rows, -scores))
+
+        return [(int(rows[i]), float(scores[i])) for i in order]
+
     def get_scores(self, query: List[str]) -> List[float]:
         """
         クエリに対する全ドキュメントのBM25スコアを計算
@@ -75,41 +148,103 @@ class BM25:
         Returns:
             各ドキュメントのBM25スコアリスト
         """
-        scores = []
-
-        for doc_id in range(self.corpus_size):
-            score = self._score(query, doc_id)
-            scores.append(score)
+        scores = np.zeros(self.corpus_size, dtype=np.float32)
+        rows, matched = self._accumulate(query)
+        scores[rows] = matched
 
-        return scores
+        return scores.tolist()
 
-    def _score(self, query: List[str], doc_id: int) -> float:
+    def _accumulate(self, query: List[str]) -> Tuple[np.ndarray, np.ndarray]:
         """
-        単一ドキュメントのBM25スコアを計算
+        クエリトークンのポスティングリストからスコアを集計
 
         Args:
             query: トークン化されたクエリ
-            doc_id: ドキュメントID
 
         Returns:
-            BM25スコア
+            (マッチした行番号配列, スコア配列)
         """
-        score = 0.0
-        doc_len = self.doc_lengths[doc_id]
+        row_parts = []
+        score_parts = []
 
-        # クエリ内の各トークンについて
-        query_freqs = Counter(query)
-        for token, query_freq in query_freqs.items():
-            if token not in self.idf:
+        # クエリ内の各トークンについて（重複トークンは1回のみ評価）
+        for token in dict.fromkeys(query):
+            posting = self.postings.get(token)
+            if posting is None:
                 continue
 
-            # ドキュメント内のトークン頻度（仮想的に0とする）
-            # 実際の実装ではコーパスを保持する必要がある
-            # ここでは簡易版として、IDFのみを使用
+            rows, tfs = posting
             idf = self.idf[token]
-            score += idf
 
-        return score
+            # BM25: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+            row_parts.append(rows)
+            score_parts.append(
+                idf * tfs * (self.k1 + 1) / (tfs + self._length_norm[rows])
+            )
+
+        if not row_parts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+
+        if len(row_parts) == 1:
+            return row_parts[0], score_parts[0]
+
+        # 同一行のスコアを合算
+        all_rows = np.concatenate(row_parts)
+        unique_rows, inverse = np.unique(all_rows, return_inverse=True)
+        summed = np.bincount(inverse, weights=np.concatenate(score_parts))
+
+        return unique_rows, summed.astype(np.float32)
+
+
+class BM25Index:
+    """
+    ドキュメント集合に対するBM25インデックス
+
+    ドキュメントIDと行番号の対応を保持し、トークン化とフィットを
+    構築時に1回だけ実行します。
+    """
+
+    def __init__(
+        self,
+        documents: List[Dict[str, Any]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        text_field: str = 'content'
+    ):
+        """
+        初期化（インデックス構築）
+
+        Args:
+            documents: ドキュメントのリスト（各ドキュメントは'id'と本文キーを持つ辞書）
+            k1: BM25 k1パラメータ
+            b: BM25 bパラメータ
+            text_field: インデックス対象のフィールド名
+        """
+        self.doc_ids = [str(doc.get('id', '')) for doc in documents]
+        self.bm25 = BM25(k1=k1, b=b)
+        self.bm25.fit([simple_tokenize(doc.get(text_field, '') or '') for doc in documents])
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def search(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        row_mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        クエリテキストで検索
+
+        Args:
+            query: クエリテキスト
+            top_k: 返す件数（Noneの場合は全マッチ）
+            row_mask: 検索対象の行を示すブールマスク
+
+        Returns:
+            (行番号, BM25スコア) のリスト（スコア降順）
+        """
+        return self.bm25.search(simple_tokenize(query), top_k=top_k, row_mask=row_mask)
 
 
 def simple_tokenize(text: str) -> List[str]:
@@ -122,10 +257,8 @@ def simple_tokenize(text: str) -> List[str]:
     Returns:
         トークンのリスト
     """
-    import re
-
     # 日本語（ひらがな、カタカナ、漢字）+ 英数字を抽出
-    tokens = re.findall(r'[ぁ-んァ-ヶー一-龠々a-zA-Z0-9]+', text)
+    tokens = _TOKEN_PATTERN.findall(text)
 
     # 小文字に統一
     tokens = [token.lower() for token in tokens]
@@ -142,6 +275,9 @@ def score_documents_bm25(
     """
     BM25を使用してドキュメントをスコアリング
 
+    単発のスコアリング用です。繰り返し検索する場合は
+    BM25Indexを構築して再利用してください。
+
     Args:
         query: クエリテキスト
         documents: ドキュメントのリスト（各ドキュメントは'content'キーを持つ辞書）
@@ -0,0 +1,138 @@
+"""
+検索候補の配列表現ユーティリティ
+
+各ステージ（BM25 / Dense / RRF）の候補を、ドキュメント辞書のコピーではなく
+スナップショットの行番号とスコア配列で保持します。
+ドキュメント辞書はリランキングに渡す上位候補のみ最後に生成（遅延マテリアライズ）します。
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class StageHits:
+    """1ステージの検索結果（行番号・スコア配列、スコア降順）"""
+
+    __slots__ = ("rows", "scores")
+
+    def __init__(self, rows: np.ndarray, scores: np.ndarray):
+        """
+        初期化
+
+        Args:
+            rows: スナップショットの行番号配列
+            scores: スコア配列
+        """
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.scores = np.asarray(scores, dtype=np.float64)
+
+    @classmethod
+    def empty(cls) -> "StageHits":
+        """空の結果"""
+        return cls(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64))
+
+    @classmethod
+    def from_pairs(cls, pairs: Sequence[Tuple[int, float]]) -> "StageHits":
+        """
+        (行番号, スコア) のリストから作成
+
+        Args:
+            pairs: (行番号, スコア) のリスト（スコア降順）
+
+        Returns:
+            StageHits
+        """
+        if not pairs:
+            return cls.empty()
+        rows, scores = zip(*pairs)
+        return cls(np.array(rows, dtype=np.int64), np.array(scores, dtype=np.float64))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class CandidateSet:
+    """RRF統合済み候補（行番号と各ステージのスコア配列、統合スコア降順）"""
+
+    __slots__ = (
+        "records",
+        "external",
+        "rows",
+        "rrf_scores",
+        "bm25_scores",
+        "vector_scores",
+        "bm25_contributions",
+        "dense_contributions",
+        "total",
+    )
+
+    def __init__(
+        self,
+        records: Sequence[Dict[str, Any]],
+        rows: np.ndarray,
+        rrf_scores: np.ndarray,
+        bm25_scores: np.ndarray,
+        vector_scores: np.ndarray,
+        bm25_contributions: np.ndarray,
+        dense_contributions: np.ndarray,
+        external: Optional[List[Dict[str, Any]]] = None,
+        total: Optional[int] = None
+    ):
+        """
+        初期化
+
+        Args:
+            records: スナップショットのレコード
+            rows: 行番号配列（len(records) 以上はスナップショット外のドキュメント）
+            rrf_scores: 統合スコア
+            bm25_scores: BM25スコア（該当なしはNaN）
+            vector_scores: ベクトル類似度（該当なしはNaN）
+            bm25_contributions: BM25側のRRF寄与
+            dense_contributions: Dense側のRRF寄与
+            external: スナップショット外のドキュメント（Firestore Vector Search結果等）
+            total: 上位K件に絞り込む前の候補数（Noneの場合は保持件数）
+        """
+        self.records = records
+        self.external = external or []
+        self.rows = rows
+        self.rrf_scores = rrf_scores
+        self.bm25_scores = bm25_scores
+        self.vector_scores = vector_scores
+        self.bm25_contributions = bm25_contributions
+        self.dense_contributions = dense_contributions
+        self.total = len(rows) if total is None else total
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def document(self, row: int) -> Dict[str, Any]:
+        """行番号に対応するドキュメント（コピーしない）"""
+        base = len(self.records)
+        return self.records[row] if row < base else self.external[row - base]
+
+    def materialize(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        上位候補のみドキュメント辞書（スコア付きのコピー）を生成
+
+        Args:
+            limit: 生成する件数（Noneの場合は全件）
+
+        Returns:
+            スコア付きドキュメントのリスト（統合スコア降順）
+        """
+        count = len(self) if limit is None else min(limit, len(self))
+
+        documents = []
+        for i in range(count):
+            doc = {**self.document(int(self.rows[i]))}
+            if not np.isnan(self.bm25_scores[i]):
+                doc['bm25_score'] = float(self.bm25_scores[i])
+            if not np.isnan(self.vector_scores[i]):
+                doc['vector_score'] = float(self.vector_scores[i])
+            doc['rrf_score'] = float(self.rrf_scores[i])
+            doc['bm25_contribution'] = float(self.bm25_contributions[i])
+            doc['dense_contribution'] = float(self.dense_contributions[i])
+            documents.append(doc)
+
+        return documents
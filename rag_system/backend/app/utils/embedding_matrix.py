@@ -0,0 +1,295 @@
+"""
+Embedding行列ユーティリティ
+
+正規化済みfloat32行列とID配列でEmbeddingsスナップショットを保持し、
+Dense Retrievalを1回の行列ベクトル積で実行します。
+
+gemini-embedding-001 はMatryoshka表現学習されているため、先頭次元（256/512等）を
+再正規化したプレフィックス行列で粗検索し、上位候補のみを全次元で再スコアリングする
+2段階検索にも対応します。
+"""
+
+import logging
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_vector(vector: Sequence[float]) -> np.ndarray:
+    """
+    ベクトルをfloat32に変換してL2正規化
+
+    Args:
+        vector: ベクトル
+
+    Returns:
+        正規化済みベクトル
+
+    Raises:
+        ValueError: ゼロベクトルの場合
+    """
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    if norm == 0.0:
+        raise ValueError("Zero vector detected")
+    return array / norm
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    スコア上位K件のインデックスを降順で取得（argpartitionによる部分ソート）
+
+    Args:
+        scores: スコア配列
+        top_k: 取得件数
+
+    Returns:
+        インデックス配列（スコア降順）
+    """
+    if top_k <= 0 or len(scores) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if top_k < len(scores):
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(len(scores))
+
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+class EmbeddingMatrix:
+    """正規化済みEmbedding行列"""
+
+    def __init__(self, ids: Sequence[str], matrix: np.ndarray):
+        """
+        初期化
+
+        Args:
+            ids: 各行に対応するID（KnowledgeBase ID）
+            matrix: L2正規化済みのfloat32行列 (N x D)
+        """
+        if len(ids) != matrix.shape[0]:
+            raise ValueError(
+                f"ID count doesn't match matrix rows: {len(ids)} vs {matrix.shape[0]}"
+            )
+
+        self.ids = np.asarray(ids, dtype=object)
+        self.matrix = matrix
+        self.row_of: Dict[str, int] = {str(doc_id): row for row, doc_id in enumerate(ids)}
+
+        # スナップショットから読み込んだ場合のバージョン名
+        self.version: Optional[str] = None
+
+        # 次元数 -> 再正規化済みプレフィックス行列（粗検索用、遅延構築）
+        self._prefix_matrices: Dict[int, np.ndarray] = {}
+
+    @classmethod
+    def from_records(
+        cls,
+        records: List[Dict[str, Any]],
+        dimension: Optional[int] = None,
+        id_field: str = 'kb_id',
+        vector_field: str = 'embedding'
+    ) -> 'EmbeddingMatrix':
+        """
+        Embeddingsレコードから行列を構築
+
+        空ベクトル・次元不一致・ゼロベクトルのレコードはスキップします。
+
+        Args:
+            records: Embeddingsレコードのリスト
+            dimension: 期待する次元数（Noneの場合は最初の有効レコードに合わせる）
+            id_field: IDフィールド名
+            vector_field: ベクトルフィールド名
+
+        Returns:
+            EmbeddingMatrix
+        """
+        ids = []
+        vectors = []
+        skipped = 0
+
+        for record in records:
+            vector = record.get(vector_field)
+            if not vector:
+                skipped += 1
+                continue
+
+            if dimension is None:
+                dimension = len(vector)
+            elif len(vector) != dimension:
+                skipped += 1
+                continue
+
+            try:
+                vectors.append(normalize_vector(vector))
+            except ValueError:
+                skipped += 1
+                continue
+
+            ids.append(str(record.get(id_field, '')))
+
+        if vectors:
+            matrix = np.vstack(vectors)
+        else:
+            matrix = np.zeros((0, dimension or 0), dtype=np.float32)
+
+        if skipped:
+            logger.warning(f"Skipped {skipped} invalid embeddings while building matrix")
+
+        logger.info(f"Built embedding matrix - Shape: {matrix.shape}")
+
+        return cls(ids, matrix)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dimension(self) -> int:
+        """ベクトル次元数"""
+        return self.matrix.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """行列のバイト数"""
+        return self.matrix.nbytes
+
+    def rows_for(self, ids: Sequence[str]) -> np.ndarray:
+        """
+        IDリストに対応する行番号を取得（Embeddingが無いIDは除外）
+
+        Args:
+            ids: IDのリスト
+
+        Returns:
+            行番号配列
+        """
+        row_of = self.row_of
+        return np.fromiter(
+            (row_of[doc_id] for doc_id in ids if doc_id in row_of),
+            dtype=np.int64
+        )
+
+    def prefix_matrix(self, dimension: int, chunk_size: int = 16384) -> np.ndarray:
+        """
+        先頭 dimension 次元を再正規化したプレフィックス行列を取得（初回のみ構築）
+
+        Args:
+            dimension: プレフィックス次元数
+            chunk_size: 一度に処理する行数（mmap行列の一括読み込みを避ける）
+
+        Returns:
+            L2正規化済みのfloat32行列 (N x dimension)
+        """
+        prefix = self._prefix_matrices.get(dimension)
+        if prefix is not None:
+            return prefix
+
+        prefix = np.empty((len(self), dimension), dtype=np.float32)
+        for start in range(0, len(self), chunk_size):
+            block = np.asarray(self.matrix[start:start + chunk_size, :dimension], dtype=np.float32)
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            prefix[start:start + chunk_size] = block / norms
+
+        self._prefix_matrices[dimension] = prefix
+
+        logger.info(
+            f"Built prefix matrix - Shape: {prefix.shape}, "
+            f"Size: {prefix.nbytes / 1024 / 1024:.1f}MB"
+        )
+
+        return prefix
+
+    def _scores_for(
+        self,
+        matrix: np.ndarray,
+        query: np.ndarray,
+        rows: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """対象行のスコアを計算（行番号配列, スコア配列）"""
+        if rows is None:
+            return np.arange(len(self)), matrix @ query
+        if len(rows) * 4 > len(self):
+            # 対象行が多い場合は全行を一括計算してから抽出（部分行列のコピーを避ける）
+            return rows, (matrix @ query)[rows]
+        return rows, matrix[rows] @ query
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        top_k: int,
+        rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        コサイン類似度でTop-K検索
+
+        Args:
+            query_vector: クエリベクトル
+            top_k: 取得件数
+            rows: 検索対象の行番号（Noneの場合は全行）
+
+        Returns:
+            (行番号, コサイン類似度) のリスト（類似度降順）
+        """
+        if len(self) == 0 or (rows is not None and len(rows) == 0):
+            return []
+
+        query = normalize_vector(query_vector)
+        if query.shape[0] != self.dimension:
+            raise ValueError(
+                f"Vector dimensions don't match: {query.shape[0]} vs {self.dimension}"
+            )
+
+        rows, scores = self._scores_for(self.matrix, query, rows)
+        top = top_k_indices(scores, top_k)
+
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def coarse_search(
+        self,
+        query_vector: Sequence[float],
+        top_k: int,
+        coarse_dimension: int,
+        candidates: int,
+        rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        2段階Top-K検索（プレフィックス次元で粗検索 → 全次元で再スコアリング）
+
+        Args:
+            query_vector: クエリベクトル（全次元）
+            top_k: 取得件数
+            coarse_dimension: 粗検索に使うプレフィックス次元数
+            candidates: 全次元で再スコアリングする候補数
+            rows: 検索対象の行番号（Noneの場合は全行）
+
+        Returns:
+            (行番号, コサイン類似度) のリスト（類似度降順、スコアは全次元）
+        """
+        if coarse_dimension <= 0 or coarse_dimension >= self.dimension:
+            return self.search(query_vector, top_k=top_k, rows=rows)
+
+        if len(self) == 0 or (rows is not None and len(rows) == 0):
+            return []
+
+        query = normalize_vector(query_vector)
+        if query.shape[0] != self.dimension:
+            raise ValueError(
+                f"Vector dimensions don't match: {query.shape[0]} vs {self.dimension}"
+            )
+
+        # Stage 1: プレフィックス行列で粗検索
+        coarse_query = normalize_vector(query[:coarse_dimension])
+        rows, coarse_scores = self._scores_for(
+            self.prefix_matrix(coarse_dimension), coarse_query, rows
+        )
+        shortlist = np.sort(rows[top_k_indices(coarse_scores, max(candidates, top_k))])
+
+        # Stage 2: 候補のみ全次元で再スコアリング（昇順アクセスでmmapのページ読み込みを局所化）
+        scores = np.asarray(self.matrix[shortlist], dtype=np.float32) @ query
+        top = top_k_indices(scores, top_k)
+
+        return [(int(shortlist[i]), float(scores[i])) for i in top]
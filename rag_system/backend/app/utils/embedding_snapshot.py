@@ -0,0 +1,174 @@
+"""
+Embeddingスナップショット（バイナリ形式）ユーティリティ
+
+正規化済みEmbedding行列をfloat32の`.npy`ファイルとIDサイドカー（JSON）として
+ディレクトリに書き出し、バックエンドは`mmap`で読み込みます。
+同一ホスト上の複数ワーカーはOSのページキャッシュを共有します。
+
+ディレクトリ構成:
+    <snapshot_dir>/
+        CURRENT                 # 現在のバージョン名（アトミックに差し替え）
+        <version>/
+            embeddings.npy      # float32 (N x D)、L2正規化済み
+            ids.json            # {"ids": [...], "dimension": D, "count": N, ...}
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from app.utils.embedding_matrix import EmbeddingMatrix
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+MATRIX_FILE = "embeddings.npy"
+IDS_FILE = "ids.json"
+
+
+def current_snapshot_version(snapshot_dir: Union[str, Path]) -> Optional[str]:
+    """
+    現在のスナップショットバージョンを取得
+
+    Args:
+        snapshot_dir: スナップショットディレクトリ
+
+    Returns:
+        バージョン名（スナップショットが無い場合はNone）
+    """
+    try:
+        version = (Path(snapshot_dir) / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+
+    return version or None
+
+
+def snapshot_matrix_path(snapshot_dir: Union[str, Path], version: str) -> Path:
+    """
+    スナップショットの行列ファイル（`.npy`）のパスを取得
+
+    Args:
+        snapshot_dir: スナップショットディレクトリ
+        version: バージョン名
+
+    Returns:
+        行列ファイルのパス
+    """
+    return Path(snapshot_dir) / version / MATRIX_FILE
+
+
+def save_embedding_snapshot(
+    matrix: EmbeddingMatrix,
+    snapshot_dir: Union[str, Path],
+    keep_versions: int = 2
+) -> str:
+    """
+    Embedding行列をスナップショットとして書き出し
+
+    新しいバージョンディレクトリに書き込んだ後、CURRENTファイルを
+    アトミックに差し替えるため、読み込み中のワーカーが不整合な
+    行列とIDの組を読むことはありません。
+
+    Args:
+        matrix: Embedding行列
+        snapshot_dir: スナップショットディレクトリ
+        keep_versions: 保持するバージョン数（古いものから削除）
+
+    Returns:
+        書き出したバージョン名
+    """
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    version_dir = snapshot_dir / version
+    version_dir.mkdir()
+
+    # 行列（float32、C連続）
+    np.save(version_dir / MATRIX_FILE, np.ascontiguousarray(matrix.matrix, dtype=np.float32))
+
+    # IDサイドカー
+    sidecar = {
+        "ids": [str(doc_id) for doc_id in matrix.ids],
+        "dimension": matrix.dimension,
+        "count": len(matrix),
+        "created_at": datetime.now().isoformat()
+    }
+    (version_dir / IDS_FILE).write_text(json.dumps(sidecar, ensure_ascii=False), encoding="utf-8")
+
+    # CURRENTをアトミックに差し替え
+    tmp_current = snapshot_dir / f"{CURRENT_FILE}.{os.getpid()}.tmp"
+    tmp_current.write_text(version, encoding="utf-8")
+    os.replace(tmp_current, snapshot_dir / CURRENT_FILE)
+
+    logger.info(
+        f"Saved embedding snapshot - Version: {version}, "
+        f"Shape: {matrix.matrix.shape}, Dir: {snapshot_dir}"
+    )
+
+    # 古いバージョンを削除（mmap中のファイルはunlink後も読み込み可能）
+    versions = sorted(
+        p for p in snapshot_dir.iterdir()
+        if p.is_dir() and (p / MATRIX_FILE).exists()
+    )
+    for old_dir in versions[:-keep_versions] if keep_versions > 0 else []:
+        shutil.rmtree(old_dir, ignore_errors=True)
+        logger.info(f"Removed old embedding snapshot: {old_dir.name}")
+
+    return version
+
+
+def load_embedding_snapshot(
+    snapshot_dir: Union[str, Path],
+    version: Optional[str] = None,
+    mmap: bool = True
+) -> Optional[EmbeddingMatrix]:
+    """
+    スナップショットからEmbedding行列を読み込み
+
+    Args:
+        snapshot_dir: スナップショットディレクトリ
+        version: バージョン名（Noneの場合はCURRENT）
+        mmap: Trueの場合は読み取り専用でメモリマップ
+
+    Returns:
+        EmbeddingMatrix（スナップショットが無い場合はNone）
+
+    Raises:
+        ValueError: 行列とIDサイドカーの件数が一致しない場合
+    """
+    start_time = time.time()
+    snapshot_dir = Path(snapshot_dir)
+
+    if version is None:
+        version = current_snapshot_version(snapshot_dir)
+        if version is None:
+            return None
+
+    version_dir = snapshot_dir / version
+    sidecar = json.loads((version_dir / IDS_FILE).read_text(encoding="utf-8"))
+    matrix = np.load(snapshot_matrix_path(snapshot_dir, version), mmap_mode="r" if mmap else None)
+
+    if matrix.shape[0] != len(sidecar["ids"]):
+        raise ValueError(
+            f"Snapshot {version} is inconsistent: "
+            f"{matrix.shape[0]} rows vs {len(sidecar['ids'])} ids"
+        )
+
+    embedding_matrix = EmbeddingMatrix(sidecar["ids"], matrix)
+    embedding_matrix.version = version
+
+    logger.info(
+        f"Loaded embedding snapshot - Version: {version}, Shape: {matrix.shape}, "
+        f"mmap: {mmap}, Time: {(time.time() - start_time) * 1000:.2f}ms"
+    )
+
+    return embedding_matrix
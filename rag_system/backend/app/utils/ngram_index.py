@@ -0,0 +1,176 @@
+"""
+文字n-gramインデックスユーティリティ
+
+用語辞書の各表記を文字（uni-gram）に分解した転置インデックスを構築し、
+表記揺れ・誤字を含むテキストに近い用語を検索します。
+
+類似度はテキスト中の最も近い部分文字列との編集距離から `1 - 距離 / (用語の文字数 + 1)` で計算します
+（2文字の用語の1文字誤り「褥創→褥瘡」も 0.67 となるよう分母に1を加えています）。
+bi-gram/tri-gramの包含率では短い用語の1文字誤り（糖尿秒→糖尿病 で 0.33）を拾えないためです。
+
+編集距離の計算は候補のみに行います。テキストに含まれない文字の数は編集距離の下限となるため、
+ポスティングリストの連結と `np.bincount` により全用語の類似度の上限をベクトル化して求め、
+下限を超え得る用語のうち上限の高い順に再スコアリングします。
+"""
+
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.utils.embedding_matrix import top_k_indices
+
+# 編集距離で再スコアリングする候補数の下限（top_k が大きい場合は top_k の倍数）
+RESCORE_CANDIDATES = 64
+
+# カタカナ -> ひらがな 変換表（ァ〜ヶ）
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+
+
+def normalize_term(text: str) -> str:
+    """
+    n-gram化の前にテキストを正規化（NFKC・小文字化・カタカナのひらがな化・空白除去）
+
+    Args:
+        text: テキスト
+
+    Returns:
+        正規化済みテキスト
+    """
+    normalized = unicodedata.normalize("NFKC", text).lower().translate(_KATAKANA_TO_HIRAGANA)
+    return "".join(normalized.split())
+
+
+def char_ngrams(text: str, sizes: Sequence[int] = (2, 3)) -> Set[str]:
+    """
+    文字n-gramの集合を取得（最小サイズより短いテキストはそれ自体を1つのn-gramとする）
+
+    Args:
+        text: 正規化済みテキスト
+        sizes: n-gramのサイズ
+
+    Returns:
+        n-gramの集合
+    """
+    if not text:
+        return set()
+    if len(text) < min(sizes):
+        return {text}
+    return {
+        text[i:i + n]
+        for n in sizes
+        for i in range(len(text) - n + 1)
+    }
+
+
+def substring_edit_distance(term: str, text: str) -> int:
+    """
+    用語とテキスト中の任意の部分文字列との最小編集距離（挿入・削除・置換）
+
+    Args:
+        term: 正規化済みの用語
+        text: 正規化済みテキスト
+
+    Returns:
+        編集距離
+    """
+    # column[i]: 用語の先頭i文字と、現在位置で終わる部分文字列との最小距離（開始位置は任意）
+    column = list(range(len(term) + 1))
+    best = column[-1]
+    for char in text:
+        diagonal = column[0]
+        column[0] = 0
+        for i, term_char in enumerate(term, start=1):
+            distance = min(
+                column[i] + 1,
+                column[i - 1] + 1,
+                diagonal + (term_char != char)
+            )
+            diagonal, column[i] = column[i], distance
+        best = min(best, column[-1])
+    return best
+
+
+class NgramIndex:
+    """文字n-gram転置インデックス（構築後は読み取り専用）"""
+
+    def __init__(self, terms: Sequence[Tuple[str, Any]]):
+        """
+        初期化（インデックス構築）
+
+        Args:
+            terms: (表記, 値) のリスト
+        """
+        self.surfaces: List[str] = []
+        self.values: List[Any] = []
+        self.normalized: List[str] = []
+
+        postings: Dict[str, List[int]] = defaultdict(list)
+        char_counts = []
+
+        for surface, value in terms:
+            normalized = normalize_term(surface)
+            chars = char_ngrams(normalized, (1,))
+            if not chars:
+                continue
+
+            row = len(self.surfaces)
+            self.surfaces.append(surface)
+            self.values.append(value)
+            self.normalized.append(normalized)
+            char_counts.append(len(chars))
+            for char in chars:
+                postings[char].append(row)
+
+        self.postings: Dict[str, np.ndarray] = {
+            char: np.asarray(rows, dtype=np.int32) for char, rows in postings.items()
+        }
+        # 異なり文字数・文字数（類似度の上限の計算用）
+        self.char_counts = np.asarray(char_counts, dtype=np.float32)
+        self.lengths = np.asarray([len(term) for term in self.normalized], dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.surfaces)
+
+    def search(
+        self,
+        text: str,
+        top_k: int = 5,
+        min_similarity: float = 0.5
+    ) -> List[Tuple[int, float]]:
+        """
+        テキストに近い表記を検索
+
+        Args:
+            text: クエリテキスト
+            top_k: 取得件数
+            min_similarity: 類似度の下限（0〜1、`1 - 編集距離 / (用語の文字数 + 1)`）
+
+        Returns:
+            (行番号, 類似度) のリスト（類似度降順）
+        """
+        text = normalize_term(text)
+        matched = [self.postings[char] for char in set(text) if char in self.postings]
+        if not matched or len(self) == 0:
+            return []
+
+        # テキストに含まれない文字の異なり数 <= 編集距離 から類似度の上限を計算
+        present = np.bincount(np.concatenate(matched), minlength=len(self))
+        upper_bounds = 1.0 - (self.char_counts - present) / (self.lengths + 1)
+        candidates = np.flatnonzero((upper_bounds >= min_similarity) & (present > 0))
+        if len(candidates) == 0:
+            return []
+
+        limit = max(RESCORE_CANDIDATES, top_k * 4)
+        candidates = candidates[top_k_indices(upper_bounds[candidates], limit)]
+
+        scored = []
+        for row in candidates:
+            term = self.normalized[row]
+            similarity = 1.0 - substring_edit_distance(term, text) / (len(term) + 1)
+            if similarity >= min_similarity and similarity > 0:
+                scored.append((int(row), similarity))
+
+        scored.sort(key=lambda hit: (-hit[1], hit[0]))
+        return scored[:top_k]
@@ -0,0 +1,293 @@
+"""
+ベクトル量子化ユーティリティ
+
+Embeddingをint8にスカラー量子化して1次検索を行い、候補（ショートリスト）のみを
+フル精度（float32）ベクトルで再スコアリングします。
+フル精度ベクトルのパス（スナップショットの`.npy`）を指定した場合はmmapで遅延読み込みするため、
+常駐メモリはほぼint8コード（float32の1/4）のみになります。
+メモリ上の行列から構築した場合は、その行列を再スコアリングに共有参照します（コピーはしないが削減もしない）。
+"""
+
+import logging
+import time
+from pathlib import Path
+from typing import Any, Container, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.utils.embedding_matrix import EmbeddingMatrix, normalize_vector, top_k_indices
+
+logger = logging.getLogger(__name__)
+
+
+class Int8VectorStore:
+    """int8スカラー量子化ベクトルストア（フル精度再スコアリング付き）"""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        codes: np.ndarray,
+        scale: np.ndarray,
+        full_precision: Optional[np.ndarray] = None,
+        full_precision_path: Optional[Union[str, Path]] = None,
+        rescore_factor: int = 4
+    ):
+        """
+        初期化
+
+        Args:
+            ids: 各行に対応するID
+            codes: int8コード (N x D)
+            scale: 次元ごとのスケール (D)
+            full_precision: フル精度ベクトル（mmap可）
+            full_precision_path: フル精度ベクトルの`.npy`パス（初回再スコアリング時にmmap）
+            rescore_factor: ショートリスト件数の倍率（top_k x rescore_factor を再スコアリング）
+        """
+        self.ids = np.asarray(ids, dtype=object)
+        self.codes = codes
+        self.scale = scale.astype(np.float32)
+        self.rescore_factor = rescore_factor
+        self.row_of: Dict[str, int] = {str(doc_id): row for row, doc_id in enumerate(ids)}
+
+        self._full_precision = full_precision
+        self._full_precision_path = full_precision_path
+
+        # 構築元スナップショットのバージョン名
+        self.source_version: Optional[str] = None
+
+        # 外部の ID -> 行番号 辞書に対する行番号の対応表（allowed_ids のベクトル化判定用、辞書ごとにメモ化）
+        self._row_mapping: Optional[Tuple[Dict[str, int], np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.row_of
+
+    @property
+    def dimension(self) -> int:
+        """ベクトル次元数"""
+        return self.codes.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """常駐するコードのバイト数"""
+        return self.codes.nbytes + self.scale.nbytes
+
+    @property
+    def full_precision(self) -> np.ndarray:
+        """フル精度ベクトル（初回アクセス時にmmapで読み込み）"""
+        if self._full_precision is None:
+            if self._full_precision_path is None:
+                raise RuntimeError("Full precision vectors are not available")
+            self._full_precision = np.load(self._full_precision_path, mmap_mode="r")
+            logger.info(f"Mapped full precision vectors: {self._full_precision_path}")
+        return self._full_precision
+
+    @classmethod
+    def from_matrix(
+        cls,
+        matrix: EmbeddingMatrix,
+        full_precision_path: Optional[Union[str, Path]] = None,
+        rescore_factor: int = 4,
+        chunk_size: int = 16384
+    ) -> 'Int8VectorStore':
+        """
+        正規化済みEmbedding行列を量子化
+
+        Args:
+            matrix: Embedding行列（mmap可）
+            full_precision_path: 指定した場合は行列を保持せず、このパスから遅延読み込み
+            rescore_factor: ショートリスト件数の倍率
+            chunk_size: 一度に処理する行数
+
+        Returns:
+            Int8VectorStore
+        """
+        start_time = time.time()
+        vectors = matrix.matrix
+
+        # 次元ごとの最大絶対値からスケールを決定（対称量子化）
+        max_abs = np.zeros(matrix.dimension, dtype=np.float32)
+        for start in range(0, len(vectors), chunk_size):
+            np.maximum(max_abs, np.abs(vectors[start:start + chunk_size]).max(axis=0), out=max_abs)
+        scale = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+
+        codes = np.empty(vectors.shape, dtype=np.int8)
+        for start in range(0, len(vectors), chunk_size):
+            block = vectors[start:start + chunk_size] / scale
+            codes[start:start + chunk_size] = np.clip(np.rint(block), -127, 127)
+
+        store = cls(
+            matrix.ids.tolist(),
+            codes,
+            scale,
+            full_precision=None if full_precision_path else vectors,
+            full_precision_path=full_precision_path,
+            rescore_factor=rescore_factor
+        )
+        store.source_version = matrix.version
+
+        # フル精度ベクトルはパス指定時のみ遅延mmap、それ以外は元の行列を共有（常駐メモリは削減しない）
+        if full_precision_path:
+            full_precision_info = f"mmap {full_precision_path}"
+        else:
+            full_precision_info = f"shared {vectors.nbytes / 1024 / 1024:.1f}MB"
+
+        logger.info(
+            f"Built Int8VectorStore - Vectors: {len(store)}, "
+            f"Codes: {store.nbytes / 1024 / 1024:.1f}MB, "
+            f"Full precision: {full_precision_info}, "
+            f"Time: {time.time() - start_time:.2f}s"
+        )
+
+        return store
+
+    def _rows_in(self, row_of: Dict[str, int]) -> np.ndarray:
+        """各行のIDが外部の ID -> 行番号 辞書で何行目か（無い場合は -1、辞書ごとにメモ化）"""
+        cached = self._row_mapping
+        if cached is not None and cached[0] is row_of:
+            return cached[1]
+
+        rows = np.fromiter(
+            (row_of.get(doc_id, -1) for doc_id in self.ids),
+            dtype=np.int64,
+            count=len(self)
+        )
+        self._row_mapping = (row_of, rows)
+        return rows
+
+    def _allowed_mask(self, allowed_ids: Container[str]) -> np.ndarray:
+        """
+        検索対象行のブールマスクを作成
+
+        スナップショットの ID -> 行番号 辞書、またはその行マスク（RowMaskFilter）の場合は
+        メモ化した対応表でベクトル化して判定し、それ以外は `in` 判定を行ごとに行います。
+        """
+        row_of = allowed_ids if isinstance(allowed_ids, dict) else getattr(allowed_ids, "row_of", None)
+        if isinstance(row_of, dict):
+            rows = self._rows_in(row_of)
+            allowed = rows >= 0
+            mask = getattr(allowed_ids, "mask", None)
+            if mask is not None:
+                allowed[allowed] = mask[rows[allowed]]
+            return allowed
+
+        return np.fromiter(
+            (doc_id in allowed_ids for doc_id in self.ids),
+            dtype=bool,
+            count=len(self)
+        )
+
+    def _approximate_scores(self, query: np.ndarray, chunk_size: int = 16384) -> np.ndarray:
+        """int8コードによる近似内積（チャンク単位でfloat32に展開）"""
+        scaled_query = query * self.scale
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), chunk_size):
+            block = self.codes[start:start + chunk_size].astype(np.float32)
+            scores[start:start + chunk_size] = block @ scaled_query
+        return scores
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        top_k: int,
+        nprobe: Optional[int] = None,
+        allowed_ids: Optional[Container[str]] = None,
+        rescore: bool = True
+    ) -> List[Tuple[str, float]]:
+        """
+        近似Top-K検索（int8で候補抽出 → フル精度で再スコアリング）
+
+        Args:
+            query_vector: クエリベクトル
+            top_k: 取得件数
+            nprobe: 未使用（Denseインデックス共通インターフェース）
+            allowed_ids: 検索対象IDの集合（ショートリスト抽出前に適用）
+            rescore: Falseの場合はint8スコアのみで返す
+
+        Returns:
+            (ID, コサイン類似度) のリスト（類似度降順）
+        """
+        if len(self) == 0:
+            return []
+
+        query = normalize_vector(query_vector)
+        if query.shape[0] != self.dimension:
+            raise ValueError(
+                f"Vector dimensions don't match: {query.shape[0]} vs {self.dimension}"
+            )
+
+        approximate = self._approximate_scores(query)
+        shortlist_size = top_k * max(self.rescore_factor, 1)
+
+        if allowed_ids is not None:
+            # 対象外の行を除いてからショートリストを抽出（抽出後に絞り込むと候補が枯渇する）
+            allowed = self._allowed_mask(allowed_ids)
+            approximate[~allowed] = -np.inf
+            shortlist_size = min(shortlist_size, int(np.count_nonzero(allowed)))
+
+        shortlist = top_k_indices(approximate, shortlist_size)
+
+        if len(shortlist) == 0:
+            return []
+
+        if rescore:
+            # mmapからショートリストの行のみを読み込み（昇順アクセスでページ読み込みを局所化）
+            rows = np.sort(shortlist)
+            scores = np.asarray(self.full_precision[rows], dtype=np.float32) @ query
+        else:
+            rows = shortlist
+            scores = approximate[rows]
+
+        top = top_k_indices(scores, top_k)
+
+        return [(self.ids[rows[i]], float(scores[i])) for i in top]
+
+
+def recall_report(
+    store: Int8VectorStore,
+    matrix: EmbeddingMatrix,
+    queries: np.ndarray,
+    top_k: int = 10
+) -> Dict[str, Any]:
+    """
+    厳密検索に対するrecallレポートを作成
+
+    Args:
+        store: 量子化ベクトルストア
+        matrix: 厳密検索用のEmbedding行列
+        queries: クエリベクトル (Q x D)
+        top_k: 評価するK
+
+    Returns:
+        recall@K（再スコアリング有無）、レイテンシ、メモリ使用量
+    """
+    recalls = {"int8": [], "int8_rescored": []}
+    latency_ms = {"exact": 0.0, "int8": 0.0, "int8_rescored": 0.0}
+
+    for query in queries:
+        start = time.perf_counter()
+        expected = {matrix.ids[row] for row, _ in matrix.search(query, top_k=top_k)}
+        latency_ms["exact"] += (time.perf_counter() - start) * 1000
+
+        for name, rescore in (("int8", False), ("int8_rescored", True)):
+            start = time.perf_counter()
+            found = {doc_id for doc_id, _ in store.search(query, top_k=top_k, rescore=rescore)}
+            latency_ms[name] += (time.perf_counter() - start) * 1000
+            recalls[name].append(len(expected & found) / max(len(expected), 1))
+
+    count = max(len(queries), 1)
+
+    return {
+        "queries": len(queries),
+        "top_k": top_k,
+        "rescore_factor": store.rescore_factor,
+        "recall": {name: float(np.mean(values)) if values else 0.0 for name, values in recalls.items()},
+        "min_recall": {name: float(np.min(values)) if values else 0.0 for name, values in recalls.items()},
+        "avg_latency_ms": {name: total / count for name, total in latency_ms.items()},
+        "memory_mb": {
+            "float32": matrix.nbytes / 1024 / 1024,
+            "int8": store.nbytes / 1024 / 1024
+        }
+    }
@@ -0,0 +1,152 @@
+"""
+Reciprocal Rank Fusion (RRF) ユーティリティ
+
+任意個のランキング（BM25・Dense・タイトルのみ・新着順など）を、
+リストごとの重みとRRF定数 k で統合します。
+候補は整数ID（スナップショットの行番号等）のまま扱い、スコアは `np.bincount` で集計し、
+上位K件はヒープで選択します（全候補のソートやドキュメント辞書の生成は行いません）。
+
+    score(d) = Σ_i weight_i / (k + rank_i(d))
+"""
+
+import heapq
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+class RankedList:
+    """統合対象のランキング（先頭ほど上位の整数ID配列）"""
+
+    __slots__ = ("ids", "weight", "scores", "name")
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        weight: float = 1.0,
+        scores: Optional[np.ndarray] = None,
+        name: str = ""
+    ):
+        """
+        初期化
+
+        Args:
+            ids: 整数ID配列（順位順）
+            weight: 統合時の重み
+            scores: 元のスコア配列（統合結果に引き継ぐ場合のみ）
+            name: ランキング名（ログ用）
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.weight = weight
+        self.scores = None if scores is None else np.asarray(scores, dtype=np.float64)
+        self.name = name
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class FusionResult:
+    """RRF統合結果（統合スコア降順）"""
+
+    __slots__ = ("ids", "scores", "contributions", "list_scores", "total")
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        scores: np.ndarray,
+        contributions: np.ndarray,
+        list_scores: np.ndarray,
+        total: int
+    ):
+        """
+        初期化
+
+        Args:
+            ids: 整数ID配列
+            scores: 統合スコア
+            contributions: リストごとのRRF寄与 1 / (k + rank)（重み適用前、shape: [リスト数, 件数]）
+            list_scores: リストごとの元のスコア（該当なし・未指定はNaN、shape: [リスト数, 件数]）
+            total: 統合前のユニークID数
+        """
+        self.ids = ids
+        self.scores = scores
+        self.contributions = contributions
+        self.list_scores = list_scores
+        self.total = total
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[RankedList],
+    k: int = 60,
+    top_k: Optional[int] = None
+) -> FusionResult:
+    """
+    複数のランキングを重み付きRRFで統合
+
+    同一リスト内で重複したIDは最上位の順位のみ使用します。
+    統合スコアが同点の場合は、リストの指定順・順位順で先に現れたIDを上位とします。
+
+    Args:
+        ranked_lists: 統合対象のランキング
+        k: RRF定数
+        top_k: 返す件数（Noneの場合は全件）
+
+    Returns:
+        FusionResult: 統合結果
+    """
+    list_count = len(ranked_lists)
+
+    # リストごとに重複を除去（最上位の順位を採用）し、1 / (k + rank) を計算
+    deduped = []
+    for ranked in ranked_lists:
+        _, first = np.unique(ranked.ids, return_index=True)
+        first.sort()
+        deduped.append((first, 1.0 / (k + first + 1)))
+
+    all_ids = np.concatenate(
+        [ranked.ids[first] for ranked, (first, _) in zip(ranked_lists, deduped)]
+    ) if list_count else np.zeros(0, dtype=np.int64)
+    unique_ids, first_seen, inverse = np.unique(all_ids, return_index=True, return_inverse=True)
+
+    # 重み付き寄与を一括集計
+    weights = np.concatenate(
+        [ranked.weight * rrf for ranked, (_, rrf) in zip(ranked_lists, deduped)]
+    ) if list_count else np.zeros(0)
+    fused = np.bincount(inverse, weights=weights, minlength=len(unique_ids))
+
+    # 上位K件をヒープで選択（同点は先に現れたIDを優先）
+    if top_k is not None and top_k < len(unique_ids):
+        order = np.array(
+            heapq.nlargest(top_k, range(len(unique_ids)), key=lambda i: (fused[i], -first_seen[i])),
+            dtype=np.int64
+        )
+    else:
+        order = np.lexsort((first_seen, -fused))
+
+    # 選択したIDのみ、リストごとの寄与・元スコアを配置
+    position = np.full(len(unique_ids), -1, dtype=np.int64)
+    position[order] = np.arange(len(order))
+
+    contributions = np.zeros((list_count, len(order)))
+    list_scores = np.full((list_count, len(order)), np.nan)
+
+    offset = 0
+    for i, (ranked, (first, rrf)) in enumerate(zip(ranked_lists, deduped)):
+        slots = position[inverse[offset:offset + len(first)]]
+        offset += len(first)
+
+        selected = slots >= 0
+        contributions[i, slots[selected]] = rrf[selected]
+        if ranked.scores is not None:
+            list_scores[i, slots[selected]] = ranked.scores[first[selected]]
+
+    return FusionResult(
+        ids=unique_ids[order],
+        scores=fused[order],
+        contributions=contributions,
+        list_scores=list_scores,
+        total=len(unique_ids)
+    )
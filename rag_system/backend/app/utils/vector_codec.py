@@ -0,0 +1,88 @@
+"""
+ベクトルのバイナリ変換ユーティリティ
+
+MySQL VECTOR型の内部表現（リトルエンディアンのfloat32を連結したバイナリ）との相互変換を提供します。
+JSON文字列（2048次元で約40KB）を組み立てて送信し、MySQL側でパースするコストを避けるため、
+クエリベクトル・Embeddingはこの形式（2048次元で8KB）でバインドします。
+
+バインド形式（`mysql_vector_param_format`）:
+- binary: バイナリをそのままバインド（VECTOR型の内部表現）
+- json: JSON配列文字列をバインドし、MySQL側で `CAST(... AS VECTOR(n))` により変換
+"""
+
+import json
+from typing import Any, List, Sequence
+
+import numpy as np
+
+# MySQL VECTOR型の要素型（リトルエンディアン float32）
+VECTOR_DTYPE = np.dtype("<f4")
+
+
+def pack_vector(vector: Sequence[float], dimension: int = 0) -> bytes:
+    """
+    ベクトルをリトルエンディアンfloat32のバイナリに変換
+
+    Args:
+        vector: ベクトル
+        dimension: 期待する次元数（0の場合は検証しない）
+
+    Returns:
+        バイナリ（次元数 x 4バイト）
+
+    Raises:
+        ValueError: 次元数が一致しない場合
+    """
+    array = np.asarray(vector, dtype=VECTOR_DTYPE)
+    if array.ndim != 1 or (dimension and array.shape[0] != dimension):
+        raise ValueError(
+            f"Vector dimension mismatch: expected {dimension}, got {array.shape}"
+        )
+    return array.tobytes()
+
+
+def unpack_vector(data: bytes) -> List[float]:
+    """
+    リトルエンディアンfloat32のバイナリをベクトルに変換
+
+    Args:
+        data: バイナリ
+
+    Returns:
+        ベクトル
+    """
+    return np.frombuffer(data, dtype=VECTOR_DTYPE).tolist()
+
+
+def encode_vector_param(vector: Sequence[float], vector_format: str, dimension: int = 0) -> Any:
+    """
+    ベクトルをバインドパラメータに変換
+
+    Args:
+        vector: ベクトル
+        vector_format: バインド形式（binary / json）
+        dimension: 期待する次元数（binaryのみ検証、0の場合は検証しない）
+
+    Returns:
+        binary: bytes / json: JSON文字列
+    """
+    if vector_format == "binary":
+        return pack_vector(vector, dimension)
+    return json.dumps([float(value) for value in vector])
+
+
+def vector_param_sql(placeholder: str, vector_format: str, dimension: int) -> str:
+    """
+    ベクトルパラメータのSQL式
+
+    Args:
+        placeholder: プレースホルダ（`:name`、`%s` 等）
+        vector_format: バインド形式（binary / json）
+        dimension: VECTOR型の次元数
+
+    Returns:
+        SQL式（binaryはプレースホルダのまま、jsonはVECTOR型へのCAST）
+    """
+    if vector_format == "binary":
+        return placeholder
+    return f"CAST({placeholder} AS VECTOR({dimension}))"
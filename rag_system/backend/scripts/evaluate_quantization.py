@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+int8量子化recall評価スクリプト
+
+Embeddingスナップショットをint8に量子化し、厳密検索に対するrecall@K・
+レイテンシ・メモリ使用量をレポートします。クエリにはスナップショット内の
+ベクトルをランダムサンプリングして使用します。
+
+Usage:
+    python backend/scripts/evaluate_quantization.py --snapshot-dir /mnt/snapshots/embeddings
+    python backend/scripts/evaluate_quantization.py --queries 200 --top-k 20 --rescore-factor 8
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import get_settings
+from app.utils.embedding_snapshot import load_embedding_snapshot
+from app.utils.quantization import Int8VectorStore, recall_report
+
+# ロガー設定
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 設定
+settings = get_settings()
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="int8量子化 recall評価")
+    parser.add_argument(
+        "--snapshot-dir",
+        type=str,
+        default=settings.embedding_snapshot_dir,
+        help="スナップショットディレクトリ（デフォルト: EMBEDDING_SNAPSHOT_DIR）"
+    )
+    parser.add_argument("--queries", type=int, default=100, help="評価クエリ数（デフォルト: 100）")
+    parser.add_argument("--top-k", type=int, default=10, help="評価するK（デフォルト: 10）")
+    parser.add_argument(
+        "--rescore-factor",
+        type=int,
+        default=settings.dense_int8_rescore_factor,
+        help="再スコアリング倍率（デフォルト: DENSE_INT8_RESCORE_FACTOR）"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="クエリサンプリングのシード")
+    args = parser.parse_args()
+
+    if not args.snapshot_dir:
+        parser.error("--snapshot-dir または EMBEDDING_SNAPSHOT_DIR を指定してください")
+
+    matrix = load_embedding_snapshot(args.snapshot_dir)
+    if matrix is None:
+        logger.error(f"スナップショットが見つかりません: {args.snapshot_dir}")
+        sys.exit(1)
+
+    store = Int8VectorStore.from_matrix(matrix, rescore_factor=args.rescore_factor)
+
+    rng = np.random.default_rng(args.seed)
+    rows = rng.choice(len(matrix), size=min(args.queries, len(matrix)), replace=False)
+    queries = np.asarray(matrix.matrix[np.sort(rows)], dtype=np.float32)
+
+    report = recall_report(store, matrix, queries, top_k=args.top_k)
+    report["snapshot_version"] = matrix.version
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
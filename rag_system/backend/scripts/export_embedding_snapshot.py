@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Embeddingスナップショット書き出しスクリプト
+
+Embeddingsシートを読み込み、正規化済みfloat32行列（.npy）とIDサイドカーを
+スナップショットディレクトリに書き出します。バックエンドは
+EMBEDDING_SNAPSHOT_DIR を設定すると、このスナップショットをmmapで読み込みます。
+
+--index-path を指定すると、同じ行列からANNインデックス（DENSE_INDEX_PATH）も構築します。
+
+Usage:
+    python backend/scripts/export_embedding_snapshot.py --output /mnt/snapshots/embeddings
+    python backend/scripts/export_embedding_snapshot.py --output /mnt/snapshots/embeddings \
+        --index-path /mnt/snapshots/dense_index.npz --index-type ivf
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import get_settings
+from app.services.spreadsheet import get_spreadsheet_client
+from app.utils.ann_index import build_dense_index
+from app.utils.embedding_matrix import EmbeddingMatrix
+from app.utils.embedding_snapshot import save_embedding_snapshot
+
+# ロガー設定
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 設定
+settings = get_settings()
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="Embeddingsシート → バイナリスナップショット書き出し")
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=settings.embedding_snapshot_dir,
+        help="スナップショットディレクトリ（デフォルト: EMBEDDING_SNAPSHOT_DIR）"
+    )
+    parser.add_argument("--keep-versions", type=int, default=2, help="保持するバージョン数（デフォルト: 2）")
+    parser.add_argument(
+        "--index-path",
+        type=str,
+        default="",
+        help="ANNインデックスの保存先（.npz、指定時のみ構築）"
+    )
+    parser.add_argument(
+        "--index-type",
+        type=str,
+        choices=["flat", "ivf"],
+        default="ivf",
+        help="ANNインデックス種別（デフォルト: ivf）"
+    )
+    args = parser.parse_args()
+
+    if not args.output:
+        parser.error("--output または EMBEDDING_SNAPSHOT_DIR を指定してください")
+
+    start_time = time.time()
+
+    client = get_spreadsheet_client()
+    records = client.read_embeddings()
+
+    matrix = EmbeddingMatrix.from_records(
+        records,
+        dimension=settings.vertex_ai_embeddings_dimension
+    )
+
+    version = save_embedding_snapshot(matrix, args.output, keep_versions=args.keep_versions)
+
+    if args.index_path:
+        index = build_dense_index(
+            args.index_type,
+            matrix.ids.tolist(),
+            matrix.matrix,
+            nlist=settings.dense_ivf_nlist,
+            nprobe=settings.dense_ivf_nprobe
+        )
+        index.source_version = version
+        index.save(args.index_path)
+
+    logger.info("=" * 60)
+    logger.info("✅ Embeddingスナップショット書き出し完了")
+    logger.info(f"Version: {version}")
+    logger.info(f"Rows: {len(matrix)}, Dimension: {matrix.dimension}")
+    logger.info(f"Size: {matrix.nbytes / 1024 / 1024:.1f}MB")
+    logger.info(f"Time: {time.time() - start_time:.2f}s")
+    logger.info("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -45,6 +45,14 @@ except ImportError as e:
     print("pip install aiomysql google-auth google-api-python-client google-cloud-firestore tqdm")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import get_settings
+from app.utils.vector_codec import encode_vector_param, vector_param_sql
+
+# embeddings.embedding VECTOR(2048)
+VECTOR_DIMENSION = 2048
+
 # ログ設定
 logging.basicConfig(
     level=logging.INFO,
@@ -347,54 +355,61 @@ class V3MySQLMigrator:
         """embeddings テーブルに移行（VECTOR型使用）"""
         logger.info("=== embeddings 移行開始 ===")
 
+        # VECTOR型挿入（バインド形式は mysql_vector_param_format に従う）
+        # binary: MySQL 9.0+ Vector Typeの内部表現（リトルエンディアンfloat32のバイナリ）をそのまま挿入
+        # created_at / updated_at はカラムのデフォルト値を使用
+        # （VALUES がプレースホルダのみの場合、executemany が複数行INSERTに展開する）
+        vector_format = get_settings().mysql_vector_param_format
+        sql = f"""
+            INSERT INTO embeddings (
+                kb_id, embedding, embedding_model
+            ) VALUES (
+                %s, {vector_param_sql("%s", vector_format, VECTOR_DIMENSION)}, %s
+            )
+            ON DUPLICATE KEY UPDATE
+                embedding = VALUES(embedding),
+                updated_at = NOW()
+        """
+
         async with self.pool.acquire() as conn:
             async with conn.cursor() as cur:
                 kb_ids = list(embeddings_dict.keys())
 
                 for i in range(0, len(kb_ids), batch_size):
                     batch_ids = kb_ids[i:i + batch_size]
+                    self.stats['embeddings']['total'] += len(batch_ids)
 
-                    for kb_id in batch_ids:
-                        self.stats['embeddings']['total'] += 1
-
-                        embedding = embeddings_dict[kb_id]
-
-                        if self.dry_run:
-                            self.stats['embeddings']['success'] += 1
-                            continue
-
-                        # VECTOR型挿入
-                        # MySQL 9.0+ Vector Typeでは JSON配列をそのまま挿入
-                        sql = """
-                            INSERT INTO embeddings (
-                                kb_id, embedding, embedding_model, created_at, updated_at
-                            ) VALUES (
-                                %s, %s, %s, NOW(), NOW()
-                            )
-                            ON DUPLICATE KEY UPDATE
-                                embedding = VALUES(embedding),
-                                updated_at = NOW()
-                        """
+                    if self.dry_run:
+                        self.stats['embeddings']['success'] += len(batch_ids)
+                        continue
 
+                    rows = []
+                    for kb_id in batch_ids:
                         try:
-                            # VECTORカラムにJSON配列形式で挿入
-                            embedding_json = json.dumps(embedding)
-
-                            await cur.execute(sql, (
-                                kb_id,
-                                embedding_json,  # VECTOR型はJSON配列を受け付ける
-                                'gemini-embedding-001'
-                            ))
+                            vector_param = encode_vector_param(
+                                embeddings_dict[kb_id], vector_format, VECTOR_DIMENSION
+                            )
+                        except (ValueError, TypeError) as e:
+                            # 次元数不一致・不正な値の行のみスキップし、移行は継続
+                            logger.error(f"❌ embeddings変換エラー: {kb_id} - {e}")
+                            self.stats['embeddings']['failed'] += 1
+                            continue
 
-                            self.stats['embeddings']['success'] += 1
+                        rows.append((kb_id, vector_param, 'gemini-embedding-001'))
 
-                        except Exception as e:
-                            logger.error(f"❌ embeddings挿入エラー: {kb_id} - {e}")
-                            self.stats['embeddings']['failed'] += 1
+                    if not rows:
+                        continue
 
-                    # バッチコミット
-                    if not self.dry_run:
+                    try:
+                        # バッチ単位で複数行INSERT（executemany、json形式はCAST式のため1行ずつ送信）
+                        await cur.executemany(sql, rows)
                         await conn.commit()
+                        self.stats['embeddings']['success'] += len(rows)
+
+                    except Exception as e:
+                        await conn.rollback()
+                        logger.error(f"❌ embeddings挿入エラー: batch {i // batch_size} - {e}")
+                        self.stats['embeddings']['failed'] += len(rows)
 
                     logger.info(
                         f"Progress: {self.stats['embeddings']['success']}/"
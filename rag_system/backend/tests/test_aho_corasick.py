@@ -0,0 +1,78 @@
+"""
+Aho–Corasick 照合の単体テスト
+
+テスト対象: app.utils.aho_corasick, app.services.medical_terms
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.medical_terms import MedicalTermsService
+from app.utils.aho_corasick import AhoCorasick
+
+
+class TestAhoCorasick:
+    """AhoCorasick クラスのテスト"""
+
+    def test_find_all_overlapping(self):
+        """重なりを含む全てのマッチを検出することを確認"""
+        matcher = AhoCorasick({"he": 1, "she": 2, "his": 3, "hers": 4})
+
+        matches = matcher.find_all("ushers")
+
+        assert sorted(matches) == [(1, 4, 2), (2, 4, 1), (2, 6, 4)]
+
+    def test_leftmost_longest(self):
+        """長い用語に含まれる短い用語は選択されないことを確認"""
+        matcher = AhoCorasick({"糖尿病": "糖尿病", "糖尿病性腎症": "糖尿病性腎症", "腎症": "腎症", "発熱": "発熱"})
+
+        matches = matcher.find_leftmost_longest("糖尿病性腎症で発熱あり、糖尿病")
+
+        assert [value for _, _, value in matches] == ["糖尿病性腎症", "発熱", "糖尿病"]
+
+    def test_matches_naive_substring(self):
+        """全マッチが素朴な部分文字列検索と一致することを確認"""
+        patterns = {"ab": 0, "bab": 1, "b": 2, "abc": 3, "ca": 4}
+        text = "abcababcabb"
+        matcher = AhoCorasick(patterns)
+
+        expected = sorted(
+            (i, i + len(p), v)
+            for p, v in patterns.items()
+            for i in range(len(text))
+            if text.startswith(p, i)
+        )
+
+        assert sorted(matcher.find_all(text)) == expected
+
+    def test_empty_patterns(self):
+        """空の辞書・空文字列パターンではマッチしないことを確認"""
+        assert AhoCorasick({}).find_leftmost_longest("発熱") == []
+        assert len(AhoCorasick({"": 1, "熱": 2})) == 1
+
+
+class TestExtractMedicalTerms:
+    """MedicalTermsService.extract_medical_terms のテスト"""
+
+    @pytest.fixture
+    def service(self):
+        """医療用語辞書をモックしたサービス"""
+        client = MagicMock()
+        client.read_medical_terms.return_value = [
+            {"canonical": "発熱", "synonyms": ["熱発", "熱"]},
+            {"canonical": "糖尿病", "synonyms": ["DM"]},
+            {"canonical": "糖尿病性腎症", "synonyms": '["DN"]'},
+        ]
+        with patch("app.services.medical_terms.get_spreadsheet_client", return_value=client):
+            yield MedicalTermsService()
+
+    def test_extract_canonical(self, service):
+        """シノニムがcanonicalに変換され、出現順・重複なしで返ることを確認"""
+        terms = service.extract_medical_terms("DMの利用者、熱発あり。糖尿病性腎症の既往、DN")
+
+        assert terms == ["糖尿病", "発熱", "糖尿病性腎症"]
+
+    def test_no_match(self, service):
+        """辞書に無いテキストでは空リストを返すことを確認"""
+        assert service.extract_medical_terms("歩行訓練") == []
@@ -0,0 +1,158 @@
+"""
+ANNインデックスの単体テスト
+
+テスト対象: app.utils.ann_index
+"""
+
+import numpy as np
+import pytest
+
+from app.utils.ann_index import FlatIndex, IVFIndex, build_dense_index
+from app.utils.embedding_matrix import EmbeddingMatrix
+
+
+@pytest.fixture
+def dataset():
+    """クラスタ構造を持つサンプルベクトル（32次元 x 2000件）"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 32))
+    vectors = centers[rng.integers(0, 20, size=2000)] + 0.3 * rng.normal(size=(2000, 32))
+    ids = [f"kb-{i:05d}" for i in range(2000)]
+    return ids, vectors.astype(np.float32)
+
+
+def exact_top_k(ids, vectors, query, k):
+    """参照実装（全件厳密検索）"""
+    matrix = EmbeddingMatrix(ids, vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+    return [matrix.ids[row] for row, _ in matrix.search(query, top_k=k)]
+
+
+class TestIVFIndex:
+    """IVFIndex クラスのテスト"""
+
+    def test_full_probe_is_exact(self, dataset):
+        """nprobe = nlist の場合は厳密検索と一致することを確認"""
+        ids, vectors = dataset
+        index = IVFIndex.build(ids, vectors, nlist=16, nprobe=4)
+
+        query = vectors[10]
+        hits = index.search(query, top_k=10, nprobe=16)
+
+        assert [doc_id for doc_id, _ in hits] == exact_top_k(ids, vectors, query, 10)
+
+    def test_recall_with_partial_probe(self, dataset):
+        """部分走査でも十分なrecallが得られることを確認"""
+        ids, vectors = dataset
+        index = IVFIndex.build(ids, vectors, nlist=32, nprobe=8)
+
+        recalls = []
+        for q in range(0, 2000, 100):
+            expected = set(exact_top_k(ids, vectors, vectors[q], 10))
+            found = {doc_id for doc_id, _ in index.search(vectors[q], top_k=10)}
+            recalls.append(len(expected & found) / 10)
+
+        assert np.mean(recalls) >= 0.9
+
+    def test_add_and_remove(self, dataset):
+        """追加・削除が検索結果に反映されることを確認"""
+        ids, vectors = dataset
+        index = IVFIndex.build(ids[:1000], vectors[:1000], nlist=16)
+
+        index.add(ids[1000:1010], vectors[1000:1010])
+        assert len(index) == 1010
+        assert index.search(vectors[1005], top_k=1, nprobe=16)[0][0] == ids[1005]
+
+        assert index.remove([ids[1005], "unknown"]) == 1
+        assert ids[1005] not in index
+        assert all(doc_id != ids[1005] for doc_id, _ in index.search(vectors[1005], top_k=20, nprobe=16))
+
+        # 削除で位置が移動したIDも引き続き検索できる
+        for i in range(1000, 1010):
+            if i != 1005:
+                assert index.search(vectors[i], top_k=1, nprobe=16)[0][0] == ids[i]
+
+    def test_allowed_ids(self, dataset):
+        """allowed_ids で検索対象を絞り込めることを確認"""
+        ids, vectors = dataset
+        index = IVFIndex.build(ids, vectors, nlist=16)
+
+        allowed = set(ids[:50])
+        hits = index.search(vectors[0], top_k=10, nprobe=16, allowed_ids=allowed)
+
+        assert hits
+        assert all(doc_id in allowed for doc_id, _ in hits)
+
+    def test_allowed_ids_row_mapping(self, dataset):
+        """ID -> 行番号 辞書・行マスクでの絞り込みが集合と一致し、追加・削除後も正しいことを確認"""
+        from app.services.knowledge_snapshot import RowMaskFilter
+
+        ids, vectors = dataset
+        index = IVFIndex.build(ids[:1000], vectors[:1000], nlist=16)
+        row_of = {doc_id: row for row, doc_id in enumerate(ids)}
+        mask = np.zeros(len(ids), dtype=bool)
+        mask[::3] = True
+        masked = RowMaskFilter(row_of, mask)
+        masked_ids = {doc_id for doc_id, keep in zip(ids, mask) if keep}
+
+        query = vectors[3]
+        for allowed, expected in ((row_of, set(ids)), (masked, masked_ids)):
+            hits = index.search(query, top_k=20, nprobe=16, allowed_ids=allowed)
+            assert hits == index.search(query, top_k=20, nprobe=16, allowed_ids=expected)
+
+        # メモ化した対応表は追加・削除で破棄される
+        index.remove(ids[:500])
+        index.add(ids[1000:1100], vectors[1000:1100])
+        hits = index.search(vectors[1050], top_k=20, nprobe=16, allowed_ids=masked)
+        assert hits == index.search(vectors[1050], top_k=20, nprobe=16, allowed_ids=masked_ids)
+        assert all(doc_id in masked_ids and doc_id in index for doc_id, _ in hits)
+
+    def test_copy_is_independent(self, dataset):
+        """複製への追加・削除が元のインデックスに影響しないことを確認"""
+        ids, vectors = dataset
+        index = IVFIndex.build(ids[:1000], vectors[:1000], nlist=16)
+        before = index.search(vectors[3], top_k=10, nprobe=16)
+
+        clone = index.copy()
+        clone.remove(ids[:500])
+        clone.add(ids[1000:1100], vectors[1000:1100])
+
+        assert len(index) == 1000 and len(clone) == 600
+        assert index.search(vectors[3], top_k=10, nprobe=16) == before
+        assert clone.search(vectors[1050], top_k=1, nprobe=16)[0][0] == ids[1050]
+
+    def test_save_and_load(self, dataset, tmp_path):
+        """保存・読み込み後も同じ検索結果になることを確認"""
+        ids, vectors = dataset
+        index = IVFIndex.build(ids, vectors, nlist=16, nprobe=4)
+        index.source_version = "v1"
+        index.remove(ids[:10])
+
+        path = tmp_path / "dense_index.npz"
+        index.save(path)
+        loaded = IVFIndex.load(path)
+
+        assert isinstance(loaded, IVFIndex)
+        assert len(loaded) == len(index)
+        assert loaded.source_version == "v1"
+        assert loaded.search(vectors[42], top_k=5) == index.search(vectors[42], top_k=5)
+
+
+class TestFlatIndex:
+    """FlatIndex クラスのテスト"""
+
+    def test_exact_and_persistent(self, dataset, tmp_path):
+        """厳密検索であり、保存・読み込みでFlatIndexに戻ることを確認"""
+        ids, vectors = dataset
+        index = build_dense_index("flat", ids, vectors)
+
+        hits = index.search(vectors[3], top_k=10)
+        assert [doc_id for doc_id, _ in hits] == exact_top_k(ids, vectors, vectors[3], 10)
+
+        index.save(tmp_path / "flat.npz")
+        assert isinstance(IVFIndex.load(tmp_path / "flat.npz"), FlatIndex)
+
+    def test_unknown_type(self, dataset):
+        """未知のインデックス種別はValueErrorを送出することを確認"""
+        ids, vectors = dataset
+        with pytest.raises(ValueError):
+            build_dense_index("hnsw", ids, vectors)
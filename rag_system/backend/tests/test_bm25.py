@@ -0,0 +1,126 @@
+"""
+BM25 ユーティリティの単体テスト
+
+テスト対象: app.utils.bm25
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from app.utils.bm25 import BM25, BM25Index, score_documents_bm25, simple_tokenize
+
+
+@pytest.fixture
+def corpus():
+    """トークン化済みサンプルコーパス"""
+    return [
+        ["発熱", "あり", "解熱剤", "投与"],
+        ["血圧", "安定", "食事", "良好"],
+        ["発熱", "発熱", "継続", "経過観察"],
+        ["入浴", "介助", "実施"],
+    ]
+
+
+@pytest.fixture
+def documents():
+    """サンプルKnowledgeBaseレコード"""
+    return [
+        {"id": "kb-001", "content": "発熱 あり 解熱剤 投与"},
+        {"id": "kb-002", "content": "血圧 安定 食事 良好"},
+        {"id": "kb-003", "content": "発熱 発熱 継続 経過観察"},
+        {"id": "kb-004", "content": "入浴 介助 実施"},
+    ]
+
+
+def naive_bm25(query, corpus, k1=1.5, b=0.75, epsilon=0.25):
+    """参照実装（全ドキュメント走査）"""
+    n = len(corpus)
+    avgdl = sum(len(d) for d in corpus) / n
+    scores = []
+    for doc in corpus:
+        score = 0.0
+        for token in dict.fromkeys(query):
+            df = sum(1 for d in corpus if token in d)
+            if df == 0:
+                continue
+            idf = max(math.log((n - df + 0.5) / (df + 0.5) + 1), epsilon)
+            tf = doc.count(token)
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avgdl))
+        scores.append(score)
+    return scores
+
+
+class TestBM25:
+    """BM25 クラスのテスト"""
+
+    def test_scores_match_reference(self, corpus):
+        """TFと文書長正規化を含むスコアが参照実装と一致することを確認"""
+        bm25 = BM25()
+        bm25.fit(corpus)
+
+        query = ["発熱", "血圧", "未登録"]
+        assert bm25.get_scores(query) == pytest.approx(naive_bm25(query, corpus), rel=1e-5)
+
+    def test_term_frequency_applied(self, corpus):
+        """TFが高いドキュメントほどスコアが高いことを確認"""
+        bm25 = BM25()
+        bm25.fit(corpus)
+
+        scores = bm25.get_scores(["発熱"])
+        assert scores[2] > scores[0] > 0
+        assert scores[1] == 0
+
+    def test_search_returns_only_matches(self, corpus):
+        """search はマッチしたドキュメントのみを降順で返すことを確認"""
+        bm25 = BM25()
+        bm25.fit(corpus)
+
+        hits = bm25.search(["発熱", "食事"])
+        rows = [row for row, _ in hits]
+        assert set(rows) == {0, 1, 2}
+        assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+
+    def test_search_top_k_and_mask(self, corpus):
+        """top_k と row_mask が適用されることを確認"""
+        bm25 = BM25()
+        bm25.fit(corpus)
+
+        assert [row for row, _ in bm25.search(["発熱"], top_k=1)] == [2]
+
+        mask = np.array([True, True, False, True])
+        assert [row for row, _ in bm25.search(["発熱"], row_mask=mask)] == [0]
+
+    def test_empty_corpus(self):
+        """空コーパスでもエラーにならないことを確認"""
+        bm25 = BM25()
+        bm25.fit([])
+
+        assert bm25.search(["発熱"]) == []
+        assert bm25.get_scores(["発熱"]) == []
+
+
+class TestBM25Index:
+    """BM25Index クラスのテスト"""
+
+    def test_search_text_query(self, documents):
+        """テキストクエリで検索できることを確認"""
+        index = BM25Index(documents)
+
+        hits = index.search("発熱 経過観察")
+        assert index.doc_ids[hits[0][0]] == "kb-003"
+        assert len(index) == 4
+
+    def test_consistent_with_score_documents_bm25(self, documents):
+        """score_documents_bm25 と同じスコアになることを確認"""
+        index = BM25Index(documents)
+        scored = {d["id"]: d["bm25_score"] for d in score_documents_bm25("発熱 食事", documents)}
+
+        for row, score in index.search("発熱 食事"):
+            assert scored[index.doc_ids[row]] == pytest.approx(score, rel=1e-5)
+
+
+def test_simple_tokenize():
+    """日本語と英数字がトークン化されることを確認"""
+    assert simple_tokenize("体温37.2度、BP 120/80") == ["体温37", "2度", "bp", "120", "80"]
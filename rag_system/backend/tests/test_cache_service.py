@@ -0,0 +1,144 @@
+"""
+キャッシュサービスの単体テスト
+
+テスト対象: app.services.cache_service
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.cache_service import CacheService, SingleFlight
+
+
+@pytest.fixture
+def cache():
+    """独立したCacheService"""
+    return CacheService(max_size=100)
+
+
+class TestGetOrLoad:
+    """get_or_load / get_or_load_async のテスト"""
+
+    def test_concurrent_threads_share_one_load(self, cache):
+        """同時にキャッシュミスした複数スレッドが1回のロードを共有することを確認"""
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.1)
+            return ["record"]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                lambda _: cache.get_or_load("vector_db", "kb", loader, ttl=60), range(8)
+            ))
+
+        assert len(calls) == 1
+        assert all(result == ["record"] for result in results)
+        assert cache.get("vector_db", "kb") == ["record"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_tasks_share_one_load(self, cache):
+        """同時にキャッシュミスした複数タスクが1回のロードを共有することを確認"""
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return [0.1, 0.2]
+
+        results = await asyncio.gather(*(
+            cache.get_or_load_async("embeddings", "q", loader, ttl=60) for _ in range(10)
+        ))
+
+        assert len(calls) == 1
+        assert all(result == [0.1, 0.2] for result in results)
+
+    def test_error_is_shared_and_not_cached(self, cache):
+        """ロード失敗は待機中の全員に伝播し、キャッシュされないことを確認"""
+        started = threading.Event()
+
+        def failing_loader():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError("Sheets API error")
+
+        errors = []
+
+        def call():
+            try:
+                cache.get_or_load("vector_db", "kb", failing_loader)
+            except RuntimeError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        assert len(errors) == 2
+        assert cache.get_or_load("vector_db", "kb", lambda: "ok") == "ok"
+
+
+class TestSingleFlight:
+    """SingleFlight クラスのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_async_task_joins_thread_load(self):
+        """Executorスレッドで実行中のロードにasyncioタスクが参加できることを確認"""
+        single_flight = SingleFlight()
+        started = threading.Event()
+        calls = []
+
+        def load():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return "loaded"
+
+        async def load_async():
+            calls.append(1)
+            return "loaded-async"
+
+        thread_result = asyncio.get_running_loop().run_in_executor(None, single_flight.do, "key", load)
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+
+        task_result = await single_flight.do_async("key", load_async)
+
+        assert await thread_result == "loaded"
+        assert task_result == "loaded"
+        assert len(calls) == 1
+        assert single_flight.shared_count == 1
+
+    @pytest.mark.asyncio
+    async def test_leader_cancellation_does_not_reach_followers(self):
+        """リーダーがキャンセルされても、待機中のタスクはロード結果を受け取ることを確認"""
+        single_flight = SingleFlight()
+        started = asyncio.Event()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            started.set()
+            await asyncio.sleep(0.05)
+            return "loaded"
+
+        leader = asyncio.ensure_future(single_flight.do_async("key", load))
+        await started.wait()
+        follower = asyncio.ensure_future(single_flight.do_async("key", load))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+
+        assert await follower == "loaded"
+        assert leader.cancelled()
+        assert len(calls) == 1
+        assert await single_flight.do_async("key", load) == "loaded"
+        assert len(calls) == 2
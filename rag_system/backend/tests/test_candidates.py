@@ -0,0 +1,88 @@
+"""
+検索候補の配列表現の単体テスト
+
+テスト対象: app.utils.candidates, HybridSearchEngine._rrf_fusion
+"""
+
+import numpy as np
+import pytest
+
+from app.services.knowledge_snapshot import KnowledgeBaseSnapshot
+from app.services.rag_engine import HybridSearchEngine
+from app.utils.candidates import StageHits
+
+
+@pytest.fixture
+def snapshot():
+    """サンプルKnowledgeBaseスナップショット"""
+    return KnowledgeBaseSnapshot([
+        {"id": f"kb-{i}", "domain": "nursing", "title": f"記録{i}", "content": f"内容{i}"}
+        for i in range(5)
+    ])
+
+
+@pytest.fixture
+def engine():
+    """依存サービスを初期化しないエンジン（RRF統合のみ使用）"""
+    return HybridSearchEngine.__new__(HybridSearchEngine)
+
+
+class TestRRFFusion:
+    """HybridSearchEngine._rrf_fusion のテスト"""
+
+    def test_fusion_order_and_scores(self, engine, snapshot):
+        """両方に含まれる行が上位になり、各ステージのスコアが保持されることを確認"""
+        bm25 = StageHits.from_pairs([(2, 5.0), (0, 3.0)])
+        dense = StageHits.from_pairs([(4, 0.9), (2, 0.8)])
+
+        candidates = engine._rrf_fusion(snapshot, bm25, dense)
+        docs = candidates.materialize()
+
+        # 重み（BM25: 0.3, Dense: 0.7）により Dense 1位 > BM25 2位
+        assert [doc["id"] for doc in docs] == ["kb-2", "kb-4", "kb-0"]
+        assert docs[0]["bm25_score"] == 5.0
+        assert docs[0]["vector_score"] == pytest.approx(0.8)
+        assert "bm25_score" not in docs[1]
+        assert "vector_score" not in docs[2]
+        assert docs[2]["bm25_contribution"] == pytest.approx(1 / 62)
+        assert docs[2]["dense_contribution"] == 0.0
+
+    def test_materialize_limit_does_not_mutate(self, engine, snapshot):
+        """上位候補のみ生成され、スナップショットのレコードは変更されないことを確認"""
+        bm25 = StageHits.from_pairs([(row, float(5 - row)) for row in range(5)])
+
+        candidates = engine._rrf_fusion(snapshot, bm25, StageHits.empty())
+        docs = candidates.materialize(2)
+
+        assert len(candidates) == 5
+        assert [doc["id"] for doc in docs] == ["kb-0", "kb-1"]
+        assert "rrf_score" not in snapshot.records[0]
+
+    def test_external_documents(self, engine, snapshot):
+        """スナップショット外のドキュメントも候補として生成されることを確認"""
+        external = [{"id": "fs-1", "title": "Firestoreのみ"}]
+        dense = StageHits.from_pairs([(len(snapshot), 0.9), (1, 0.7)])
+
+        candidates = engine._rrf_fusion(snapshot, StageHits.empty(), dense, external=external)
+
+        assert [doc["id"] for doc in candidates.materialize()] == ["fs-1", "kb-1"]
+
+    def test_empty(self, engine, snapshot):
+        """両方空の場合は空の候補になることを確認"""
+        candidates = engine._rrf_fusion(snapshot, StageHits.empty(), StageHits.empty())
+
+        assert len(candidates) == 0
+        assert candidates.materialize(10) == []
+
+
+def test_snapshot_rows_inverse(snapshot):
+    """Embedding行列の行 -> スナップショット行の対応表が逆写像になることを確認"""
+    from app.utils.embedding_matrix import EmbeddingMatrix
+
+    matrix = EmbeddingMatrix.from_records(
+        [{"kb_id": doc_id, "embedding": [1.0, float(i)]} for i, doc_id in enumerate(["kb-3", "kb-0", "other"])],
+        dimension=2
+    )
+
+    assert snapshot.snapshot_rows(matrix).tolist() == [3, 0, -1]
+    assert snapshot.embedding_rows(matrix)[np.array([3, 0])].tolist() == [0, 1]
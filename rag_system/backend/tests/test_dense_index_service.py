@@ -0,0 +1,59 @@
+"""
+Denseインデックスサービスの単体テスト
+
+テスト対象: app.services.dense_index_service.DenseIndexService
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.services.dense_index_service import DenseIndexService
+from app.utils.embedding_matrix import EmbeddingMatrix
+
+
+def make_matrix(vectors):
+    """正規化済みEmbedding行列"""
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return EmbeddingMatrix([f"kb-{i:04d}" for i in range(len(vectors))], vectors.astype(np.float32))
+
+
+@pytest.fixture
+def service():
+    """IVFインデックス（ディスク保存なし）のサービス"""
+    with patch("app.services.dense_index_service.settings") as mock_settings:
+        mock_settings.dense_index_type = "ivf"
+        mock_settings.dense_index_path = ""
+        mock_settings.dense_ivf_nlist = 8
+        mock_settings.dense_ivf_nprobe = 8
+        yield DenseIndexService()
+
+
+class TestDenseIndexService:
+    """DenseIndexService クラスのテスト"""
+
+    def test_sync_replaces_updated_vectors(self, service):
+        """同一IDのベクトル更新（再Embedding）が検索結果に反映され、公開済みのインデックスは変わらないことを確認"""
+        vectors = np.random.default_rng(0).normal(size=(500, 16))
+        first = service.get_index(make_matrix(vectors))
+
+        updated = vectors.copy()
+        updated[42] = -vectors[42] + 0.1
+        index = service.get_index(make_matrix(updated))
+
+        hits = index.search(updated[42], top_k=1, nprobe=8)
+        assert hits[0][0] == "kb-0042"
+        assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+        assert len(index) == 500
+
+        # 旧インデックスは旧ベクトルのまま
+        assert first.search(vectors[42], top_k=1, nprobe=8)[0] == ("kb-0042", pytest.approx(1.0, abs=1e-5))
+        assert all(doc_id != "kb-0042" for doc_id, _ in first.search(updated[42], top_k=5, nprobe=8))
+
+    def test_sync_unchanged_vectors(self, service):
+        """ベクトルが変わらなければ更新対象にならないことを確認"""
+        matrix = make_matrix(np.random.default_rng(1).normal(size=(200, 16)))
+        index = service.get_index(matrix)
+
+        assert DenseIndexService._changed_ids(index, make_matrix(matrix.matrix.copy())) == []
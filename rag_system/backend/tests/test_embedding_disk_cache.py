@@ -0,0 +1,62 @@
+"""
+クエリEmbedding ディスクキャッシュの単体テスト
+
+テスト対象: app.services.embedding_disk_cache
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.embedding_disk_cache import EmbeddingDiskCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """SQLiteファイルパス"""
+    return str(tmp_path / "cache" / "embeddings.sqlite3")
+
+
+class TestEmbeddingDiskCache:
+    """EmbeddingDiskCache クラスのテスト"""
+
+    def test_round_trip_survives_restart(self, cache_path):
+        """保存したEmbeddingが別インスタンス（再起動後）からも取得できることを確認"""
+        embedding = np.random.default_rng(0).normal(size=2048).astype(np.float32).tolist()
+
+        EmbeddingDiskCache(cache_path).set("key-1", embedding)
+        restored = EmbeddingDiskCache(cache_path).get("key-1")
+
+        assert restored == pytest.approx(embedding)
+        assert EmbeddingDiskCache(cache_path).get("missing") is None
+
+    def test_prune_least_recently_used(self, cache_path):
+        """上限超過時に最終アクセスが古いエントリから削除されることを確認"""
+        cache = EmbeddingDiskCache(cache_path, max_entries=2)
+        cache.set("old", [1.0, 0.0])
+        cache.set("recent", [0.0, 1.0])
+        cache._connection().execute("UPDATE query_embeddings SET last_access = 0 WHERE key = 'old'")
+        cache.set("new", [1.0, 1.0])
+
+        assert cache.prune() == 1
+        assert len(cache) == 2
+        assert cache.get("old") is None
+        assert cache.get("recent") == [0.0, 1.0]
+
+    def test_concurrent_writers(self, cache_path):
+        """複数スレッド・複数インスタンスからの同時書き込みで欠損しないことを確認"""
+        caches = [EmbeddingDiskCache(cache_path) for _ in range(2)]
+
+        def write(worker: int):
+            for i in range(50):
+                caches[worker % 2].set(f"{worker}-{i}", [float(worker), float(i)])
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(caches[0]) == 200
+        assert caches[1].get("3-49") == [3.0, 49.0]
@@ -0,0 +1,145 @@
+"""
+Embedding行列ユーティリティの単体テスト
+
+テスト対象: app.utils.embedding_matrix
+"""
+
+import numpy as np
+import pytest
+
+from app.utils.cosine import calculate_cosine_similarity
+from app.utils.embedding_matrix import EmbeddingMatrix, top_k_indices
+from app.utils.embedding_snapshot import (
+    current_snapshot_version,
+    load_embedding_snapshot,
+    save_embedding_snapshot,
+)
+
+
+@pytest.fixture
+def records():
+    """サンプルEmbeddingsレコード（8次元）"""
+    rng = np.random.default_rng(42)
+    return [
+        {"kb_id": f"kb-{i:03d}", "embedding": rng.normal(size=8).tolist()}
+        for i in range(50)
+    ]
+
+
+class TestEmbeddingMatrix:
+    """EmbeddingMatrix クラスのテスト"""
+
+    def test_from_records_normalizes(self, records):
+        """行がL2正規化されたfloat32行列になることを確認"""
+        matrix = EmbeddingMatrix.from_records(records, dimension=8)
+
+        assert matrix.matrix.dtype == np.float32
+        assert matrix.matrix.shape == (50, 8)
+        assert np.allclose(np.linalg.norm(matrix.matrix, axis=1), 1.0, atol=1e-5)
+
+    def test_from_records_skips_invalid(self, records):
+        """空・次元不一致・ゼロベクトルがスキップされることを確認"""
+        invalid = records + [
+            {"kb_id": "empty", "embedding": []},
+            {"kb_id": "short", "embedding": [1.0, 2.0]},
+            {"kb_id": "zero", "embedding": [0.0] * 8},
+        ]
+        matrix = EmbeddingMatrix.from_records(invalid, dimension=8)
+
+        assert len(matrix) == 50
+        assert "zero" not in matrix.row_of
+
+    def test_search_matches_cosine(self, records):
+        """検索結果がPython版コサイン類似度の上位と一致することを確認"""
+        matrix = EmbeddingMatrix.from_records(records, dimension=8)
+        query = records[7]["embedding"]
+
+        expected = sorted(
+            ((r["kb_id"], calculate_cosine_similarity(query, r["embedding"])) for r in records),
+            key=lambda x: x[1],
+            reverse=True,
+        )[:5]
+        hits = matrix.search(query, top_k=5)
+
+        assert [matrix.ids[row] for row, _ in hits] == [doc_id for doc_id, _ in expected]
+        assert [s for _, s in hits] == pytest.approx([s for _, s in expected], abs=1e-5)
+
+    def test_search_restricted_rows(self, records):
+        """rows 指定時は対象行のみから検索することを確認"""
+        matrix = EmbeddingMatrix.from_records(records, dimension=8)
+        rows = matrix.rows_for(["kb-001", "kb-002", "unknown"])
+
+        hits = matrix.search(records[1]["embedding"], top_k=10, rows=rows)
+
+        assert len(rows) == 2
+        assert [matrix.ids[row] for row, _ in hits][0] == "kb-001"
+        assert {matrix.ids[row] for row, _ in hits} == {"kb-001", "kb-002"}
+
+    def test_search_dimension_mismatch(self, records):
+        """クエリ次元が異なる場合はValueErrorを送出することを確認"""
+        matrix = EmbeddingMatrix.from_records(records, dimension=8)
+
+        with pytest.raises(ValueError):
+            matrix.search([1.0, 0.0], top_k=5)
+
+    def test_coarse_search_rescores_full_dimension(self, records):
+        """粗検索の候補が全件の場合は厳密検索と一致し、スコアが全次元であることを確認"""
+        matrix = EmbeddingMatrix.from_records(records, dimension=8)
+        query = records[3]["embedding"]
+
+        hits = matrix.coarse_search(query, top_k=5, coarse_dimension=4, candidates=50)
+
+        assert hits == pytest.approx(matrix.search(query, top_k=5))
+        assert np.allclose(np.linalg.norm(matrix.prefix_matrix(4), axis=1), 1.0)
+
+    def test_coarse_search_restricted_rows(self, records):
+        """粗検索でも対象行の絞り込みが適用されることを確認"""
+        matrix = EmbeddingMatrix.from_records(records, dimension=8)
+        rows = np.array([1, 5, 9, 20])
+
+        hits = matrix.coarse_search(records[0]["embedding"], top_k=2, coarse_dimension=4, candidates=3, rows=rows)
+
+        assert len(hits) == 2
+        assert {row for row, _ in hits} <= set(rows.tolist())
+
+
+class TestEmbeddingSnapshot:
+    """バイナリスナップショットのテスト"""
+
+    def test_round_trip_mmap(self, records, tmp_path):
+        """書き出したスナップショットをmmapで読み込めることを確認"""
+        matrix = EmbeddingMatrix.from_records(records, dimension=8)
+        version = save_embedding_snapshot(matrix, tmp_path)
+
+        loaded = load_embedding_snapshot(tmp_path)
+
+        assert loaded.version == version
+        assert isinstance(loaded.matrix, np.memmap)
+        assert list(loaded.ids) == list(matrix.ids)
+        assert np.array_equal(np.asarray(loaded.matrix), matrix.matrix)
+        assert loaded.search(records[3]["embedding"], top_k=3) == matrix.search(
+            records[3]["embedding"], top_k=3
+        )
+
+    def test_current_switches_and_prunes(self, records, tmp_path):
+        """新バージョンでCURRENTが切り替わり、古いバージョンが削除されることを確認"""
+        matrix = EmbeddingMatrix.from_records(records, dimension=8)
+        versions = [save_embedding_snapshot(matrix, tmp_path, keep_versions=2) for _ in range(3)]
+
+        assert current_snapshot_version(tmp_path) == versions[-1]
+        assert not (tmp_path / versions[0]).exists()
+        assert (tmp_path / versions[1]).exists()
+
+    def test_missing_snapshot(self, tmp_path):
+        """スナップショットが無い場合はNoneを返すことを確認"""
+        assert current_snapshot_version(tmp_path) is None
+        assert load_embedding_snapshot(tmp_path) is None
+
+
+def test_top_k_indices():
+    """argpartitionによるTop-Kが降順で返ることを確認"""
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 4, 0]
+    assert top_k_indices(scores, 0).tolist() == []
@@ -0,0 +1,188 @@
+"""
+Firestore Vector Search サービスの単体テスト
+
+テスト対象: app.services.firestore_vector_service.FirestoreVectorClient
+"""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.services.firestore_vector_service import FirestoreVectorClient
+
+
+class FakeSnapshot:
+    """DocumentSnapshot の代替"""
+
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeQuery:
+    """呼び出したクエリ操作を記録する Query / VectorQuery の代替"""
+
+    def __init__(self, db):
+        self.db = db
+        self.operations = []
+        db.queries.append(self)
+
+    def document(self, doc_id):
+        return SimpleNamespace(id=doc_id)
+
+    def where(self, *args):
+        self.operations.append(("where", args))
+        return self
+
+    def select(self, field_paths):
+        self.operations.append(("select", list(field_paths)))
+        return self
+
+    def limit(self, count):
+        self.operations.append(("limit", count))
+        return self
+
+    def find_nearest(self, **kwargs):
+        self.operations.append(("find_nearest", kwargs))
+        return self
+
+    async def stream(self):
+        fields = dict(self.operations).get("select")
+        for rank, (doc_id, data) in enumerate(self.db.documents.items()):
+            data = {key: value for key, value in data.items() if key in fields}
+            if "vector_distance" in fields:
+                data["vector_distance"] = 0.1 * (rank + 1)
+            yield FakeSnapshot(doc_id, data)
+
+
+class FakeFirestore:
+    """get_all・クエリの呼び出しを記録する AsyncClient の代替"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.get_all_calls = []
+        self.queries = []
+
+    def collection(self, name):
+        return FakeQuery(self)
+
+    async def get_all(self, refs, field_paths=None):
+        self.get_all_calls.append(([ref.id for ref in refs], field_paths))
+        for ref in refs:
+            data = self.documents.get(ref.id)
+            if data is not None and field_paths is not None:
+                data = {key: value for key, value in data.items() if key in field_paths}
+            yield FakeSnapshot(ref.id, data)
+
+
+@pytest.fixture
+def documents():
+    """8次元ベクトル付きドキュメント（30件）"""
+    rng = np.random.default_rng(0)
+    return {
+        f"kb-{i:03d}": {
+            "id": f"kb-{i:03d}",
+            "title": f"記録{i}",
+            "domain": "nursing" if i % 2 == 0 else "care",
+            "embedding": rng.normal(size=8).tolist(),
+        }
+        for i in range(30)
+    }
+
+
+@pytest.fixture
+def firestore_client(documents):
+    """FakeFirestore を注入した FirestoreVectorClient"""
+    with patch("app.services.firestore_vector_service.firestore.AsyncClient") as mock_client:
+        mock_client.return_value = FakeFirestore(documents)
+        return FirestoreVectorClient()
+
+
+class TestHybridSearch:
+    """hybrid_search のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_batched_reads_and_ranking(self, firestore_client, documents):
+        """候補ベクトルはフィールドマスク付きでまとめて取得し、類似度順に上位のみ全フィールドを取得することを確認"""
+        candidates = list(documents) + ["missing"]
+        query = np.asarray(documents["kb-007"]["embedding"]) + 0.05
+
+        with patch("app.services.firestore_vector_service.settings") as mock_settings:
+            mock_settings.firestore_batch_get_size = 10
+            mock_settings.firestore_batch_get_concurrency = 2
+            results = await firestore_client.hybrid_search(query.tolist(), candidates, limit=3)
+
+        calls = firestore_client.db.get_all_calls
+        # 候補31件 → ベクトル取得4回 + 上位3件の本文取得1回
+        assert len(calls) == 5
+        assert all(field_paths == ["embedding"] for _, field_paths in calls[:4])
+        assert "embedding" not in calls[4][1] and "title" in calls[4][1]
+
+        vectors = np.array([documents[doc_id]["embedding"] for doc_id in documents])
+        expected = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+        expected_ids = [list(documents)[i] for i in np.argsort(-expected)[:3]]
+
+        assert [r["_firestore_id"] for r in results] == expected_ids
+        assert results[0]["_similarity"] == pytest.approx(float(np.max(expected)), rel=1e-5)
+        assert "embedding" not in results[0]
+        assert results[0]["title"] == documents[expected_ids[0]]["title"]
+
+    @pytest.mark.asyncio
+    async def test_filters_applied_to_candidates(self, firestore_client, documents):
+        """フィルタ対象フィールドもマスクに含めて取得し、一致しない候補を除外することを確認"""
+        results = await firestore_client.hybrid_search(
+            documents["kb-001"]["embedding"], list(documents), limit=5, filters={"domain": "nursing", "user_id": None}
+        )
+
+        assert firestore_client.db.get_all_calls[0][1] == ["embedding", "domain"]
+        assert len(results) == 5
+        assert all(r["domain"] == "nursing" for r in results)
+
+
+class TestGetByIds:
+    """get_by_ids のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_single_batch_without_vectors(self, firestore_client, documents):
+        """1回の get_all で取得し、存在しないIDとベクトルフィールドを除外することを確認"""
+        docs = await firestore_client.get_by_ids(["kb-001", "missing", "kb-001"])
+
+        assert firestore_client.db.get_all_calls == [(["kb-001", "missing"], firestore_client.result_fields)]
+        assert list(docs) == ["kb-001"]
+        assert "embedding" not in docs["kb-001"]
+
+
+class TestProjection:
+    """射影（select）と distance_result_field のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_vector_search_projection_and_distance(self, firestore_client):
+        """Embeddingを取得せず、距離から類似度を付与し、フィルタを find_nearest の前に適用することを確認"""
+        results = await firestore_client.vector_search(
+            [0.1] * 8, limit=2, filters={"domain": "nursing", "user_id": None}, fields=["title", "embedding"]
+        )
+
+        operations = firestore_client.db.queries[-1].operations
+        assert [name for name, _ in operations] == ["where", "select", "find_nearest"]
+        assert operations[0][1] == ("domain", "==", "nursing")
+        assert operations[1][1] == ["title", "vector_distance"]
+        assert operations[2][1]["distance_result_field"] == "vector_distance"
+
+        assert set(results[0]) == {"title", "_distance", "_similarity", "_firestore_id"}
+        assert results[0]["_similarity"] == pytest.approx(0.9)
+
+    @pytest.mark.asyncio
+    async def test_query_with_filters_default_fields(self, firestore_client):
+        """フィールド未指定時は設定の結果フィールドのみ取得することを確認"""
+        results = await firestore_client.query_with_filters({"domain": "care"}, limit=5)
+
+        operations = dict(firestore_client.db.queries[-1].operations)
+        assert operations["select"] == firestore_client.result_fields
+        assert "embedding" not in operations["select"]
+        assert "embedding" not in results[0]
@@ -0,0 +1,71 @@
+"""
+KnowledgeBaseスナップショットの単体テスト
+
+テスト対象: app.services.knowledge_snapshot
+"""
+
+import numpy as np
+import pytest
+
+from app.services.knowledge_snapshot import KnowledgeBaseSnapshot
+from app.utils.embedding_matrix import EmbeddingMatrix
+
+
+@pytest.fixture
+def snapshot():
+    """サンプルKnowledgeBaseスナップショット"""
+    records = [
+        {"id": "kb-1", "domain": "nursing", "user_id": "C001", "source_id": "rec-1",
+         "title": "訪問看護記録", "content": "発熱あり"},
+        {"id": "kb-2", "domain": "nursing", "user_id": "", "source_id": "rec-2",
+         "title": "申し送り", "content": "利用者C001の血圧測定"},
+        {"id": "kb-3", "domain": "rehab", "user_id": "C002", "source_id": "rec-3",
+         "title": "リハビリ記録", "content": "歩行訓練"},
+        {"id": "kb-4", "domain": "nursing", "user_id": "C002", "source_id": "C001",
+         "title": "記録", "content": "服薬確認"},
+    ]
+    return KnowledgeBaseSnapshot(records)
+
+
+class TestFilterMask:
+    """filter_mask / client_mask のテスト"""
+
+    def test_no_filter(self, snapshot):
+        """フィルタ指定なしの場合はNoneを返すことを確認"""
+        assert snapshot.filter_mask() is None
+
+    def test_domain_filter(self, snapshot):
+        """ドメインのポスティングからマスクを作成することを確認"""
+        assert snapshot.filter_mask(domain="nursing").tolist() == [True, True, False, True]
+        assert not snapshot.filter_mask(domain="unknown").any()
+
+    def test_client_filter(self, snapshot):
+        """user_id・source_id の完全一致のみが対象になり、本文の部分一致は対象外であることを確認"""
+        mask = snapshot.filter_mask(client_id="C001")
+
+        assert mask.tolist() == [True, False, False, True]
+        assert snapshot.client_mask("C001") is mask
+
+    def test_combined_filter(self, snapshot):
+        """ドメインと利用者IDの両方が適用されることを確認"""
+        mask = snapshot.filter_mask(domain="rehab", client_id="C002")
+
+        assert mask.tolist() == [False, False, True, False]
+
+    def test_id_filter(self, snapshot):
+        """マスクをID集合として判定できることを確認"""
+        id_filter = snapshot.id_filter(snapshot.filter_mask(domain="rehab"))
+
+        assert "kb-3" in id_filter
+        assert "kb-1" not in id_filter
+        assert "unknown" not in id_filter
+
+
+def test_embedding_rows(snapshot):
+    """スナップショット行からEmbedding行列の行番号に対応付けられることを確認"""
+    matrix = EmbeddingMatrix(["kb-3", "kb-1"], np.eye(2, dtype=np.float32))
+
+    rows = snapshot.embedding_rows(matrix)
+
+    assert rows.tolist() == [1, -1, 0, -1]
+    assert snapshot.embedding_rows(matrix) is rows
@@ -0,0 +1,154 @@
+"""
+ローカル VectorStore（SQLite + NumPy mmap）の単体テスト
+
+テスト対象: app.services.local_vector_store.LocalVectorStore
+"""
+
+import numpy as np
+import pytest
+
+from app.services.local_vector_store import LocalVectorStore
+from app.services.vector_store import (
+    FirestoreVectorStore,
+    MySQLVectorStore,
+    SpreadsheetVectorStore,
+    VectorStore,
+    WritableVectorStore,
+    active_filters,
+)
+
+
+def make_documents(count):
+    """テスト用ドキュメント"""
+    return [
+        {
+            "id": f"kb-{i:03d}",
+            "title": f"記録{i}",
+            "content": f"本文{i}",
+            "domain": "nursing" if i % 2 == 0 else "care",
+            "user_id": f"user-{i % 3}",
+            "structured_data": {"index": i},
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def embeddings():
+    """8次元のランダムEmbedding（20件）"""
+    return np.random.default_rng(0).normal(size=(20, 8)).astype(np.float32)
+
+
+@pytest.fixture
+def store(tmp_path):
+    """空のローカルストア"""
+    store = LocalVectorStore(tmp_path / "store", dimension=8)
+    yield store
+    store.close()
+
+
+def brute_force(embeddings, query, allowed):
+    """素朴なコサイン類似度順位（比較用）"""
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return [f"kb-{i:03d}" for i in np.argsort(-scores) if i in allowed]
+
+
+class TestLocalVectorStore:
+    """LocalVectorStore クラスのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_search_with_filters(self, store, embeddings):
+        """フィルタ付き検索が素朴な全件計算の順位と一致することを確認"""
+        documents = make_documents(20)
+        assert await store.upsert_batch(documents, embeddings.tolist()) == 20
+        query = embeddings[3] + 0.1
+
+        results = await store.search(query.tolist(), limit=5)
+        assert [r["id"] for r in results] == brute_force(embeddings, query, range(20))[:5]
+        assert results[0]["structured_data"] == {"index": 3}
+        assert results[0]["similarity"] == pytest.approx(1 - results[0]["distance"])
+
+        allowed = {i for i, doc in enumerate(documents) if doc["domain"] == "nursing" and doc["user_id"] == "user-0"}
+        filtered = await store.search(
+            query.tolist(), limit=10, filters={"domain": "nursing", "user_id": "user-0", "source_type": "x"}
+        )
+        assert [r["id"] for r in filtered] == brute_force(embeddings, query, allowed)
+
+    @pytest.mark.asyncio
+    async def test_update_delete_and_compact(self, store, embeddings):
+        """更新は追記、更新前の行・削除した行は検索対象外となり compact で行が詰められることを確認"""
+        await store.upsert_batch(make_documents(3), embeddings[:3].tolist())
+
+        updated = {**make_documents(1)[0], "title": "更新後", "domain": "care"}
+        await store.upsert_batch([updated], [embeddings[10].tolist()])
+        stats = await store.stats()
+        assert (stats["vector_rows"], stats["deleted_rows"]) == (4, 1)
+
+        results = await store.search(embeddings[10].tolist(), limit=1)
+        assert results[0]["id"] == "kb-000"
+        assert results[0]["title"] == "更新後"
+        # 更新前のベクトル・フィルタ値では一致しない
+        assert [r["id"] for r in await store.search(embeddings[0].tolist(), limit=5)].count("kb-000") == 1
+        nursing = await store.search(embeddings[10].tolist(), limit=5, filters={"domain": "nursing"})
+        assert [r["id"] for r in nursing] == ["kb-002"]
+
+        assert await store.delete(["kb-001", "missing"]) == 1
+        assert "kb-001" not in [r["id"] for r in await store.search(embeddings[1].tolist(), limit=3)]
+        assert (await store.stats())["deleted_rows"] == 2
+
+        assert store.compact() == 2
+        stats = await store.stats()
+        assert (stats["documents"], stats["vector_rows"], stats["deleted_rows"]) == (2, 2, 0)
+        results = await store.search(embeddings[2].tolist(), limit=1)
+        assert results[0]["id"] == "kb-002"
+
+    @pytest.mark.asyncio
+    async def test_persists_across_instances(self, tmp_path, embeddings):
+        """別インスタンス（再起動後）からも保存済みの次元数・ドキュメントを利用できることを確認"""
+        first = LocalVectorStore(tmp_path / "store", dimension=8)
+        await first.upsert_batch(make_documents(4), embeddings[:4].tolist())
+        first.close()
+
+        reopened = LocalVectorStore(tmp_path / "store", dimension=2048)
+        assert reopened.dimension == 8
+        assert isinstance(reopened, VectorStore)
+        assert isinstance(reopened, WritableVectorStore)
+
+        docs = await reopened.get_many(["kb-002", "missing"])
+        assert list(docs) == ["kb-002"]
+        assert (await reopened.search(embeddings[2].tolist(), limit=1))[0]["id"] == "kb-002"
+        reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_numpy_batch(self, store, embeddings):
+        """Embeddingを2次元のNumPy配列で渡せることを確認"""
+        assert await store.upsert_batch(make_documents(20), embeddings) == 20
+        results = await store.search(embeddings[7], limit=1, filters={"user_id": "user-1"})
+        assert results[0]["id"] == "kb-007"
+
+    @pytest.mark.asyncio
+    async def test_rejects_invalid_vectors(self, store, embeddings):
+        """次元数・件数が一致しないEmbeddingを拒否することを確認"""
+        with pytest.raises(ValueError):
+            await store.upsert_batch(make_documents(1), [[0.1] * 4])
+        with pytest.raises(ValueError):
+            await store.upsert_batch(make_documents(2), embeddings[:1].tolist())
+
+        assert (await store.stats())["documents"] == 0
+        assert await store.search(embeddings[0].tolist(), limit=5) == []
+
+    def test_active_filters(self):
+        """空値・未対応のフィルタ項目が除外されることを確認"""
+        assert active_filters(None) == {}
+        assert active_filters({"domain": "nursing", "user_id": None, "source_type": "x"}) == {"domain": "nursing"}
+
+    def test_read_only_adapters(self):
+        """同期スクリプトで更新するバックエンドは読み取り専用のインターフェースのみを満たすことを確認"""
+        for adapter in (
+            SpreadsheetVectorStore(snapshot_service=object(), spreadsheet_client=object()),
+            FirestoreVectorStore(client=object()),
+            MySQLVectorStore(client=object()),
+        ):
+            assert isinstance(adapter, VectorStore)
+            assert not isinstance(adapter, WritableVectorStore)
@@ -10,7 +10,13 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.services.mysql_client import MySQLVectorClient, get_mysql_client
+from app.services.mysql_client import (
+    MySQLVectorClient,
+    encode_vector,
+    fuse_hybrid_rows,
+    get_mysql_client,
+    parse_json_fields,
+)
 
 
 @pytest.fixture
@@ -479,3 +485,120 @@ class TestEdgeCases:
 
             # 検証
             assert len(results) == 0
+
+
+class TestParseJsonFields:
+    """parse_json_fields（JSONカラムの遅延パース）のテスト"""
+
+    def test_parse_json_fields(self):
+        """未パースのJSONカラムのみパースされることを確認"""
+        docs = [
+            {"id": "kb-001", "structured_data": '{"temperature": 37.2}', "metadata": ""},
+            {"id": "kb-002", "structured_data": {"temperature": 36.8}, "metadata": None},
+        ]
+
+        parsed = parse_json_fields(docs)
+
+        assert parsed is docs
+        assert docs[0]["structured_data"] == {"temperature": 37.2}
+        assert docs[0]["metadata"] is None
+        assert docs[1]["structured_data"] == {"temperature": 36.8}
+
+
+class TestBinaryVectorParameter:
+    """ベクトルのバイナリパラメータのテスト"""
+
+    def test_encode_vector_binary(self, sample_query_vector):
+        """クエリベクトルがfloat32バイナリ（8KB）でバインドされることを確認"""
+        with patch("app.services.mysql_client.settings") as mock_settings:
+            mock_settings.mysql_vector_param_format = "binary"
+            param = encode_vector(sample_query_vector)
+
+        assert isinstance(param, bytes)
+        assert len(param) == 2048 * 4
+
+    @pytest.mark.asyncio
+    async def test_upsert_embeddings_batches(self, mysql_client, mock_db_session):
+        """Embedding一括登録がバッチごとにexecutemanyで実行されることを確認"""
+        embeddings = [(f"kb-{i:03d}", [0.1] * 2048) for i in range(5)]
+
+        with patch(
+            "app.services.mysql_client.db_manager.get_session"
+        ) as mock_get_session:
+            mock_get_session.return_value.__aenter__.return_value = mock_db_session
+
+            written = await mysql_client.upsert_embeddings(embeddings, batch_size=2)
+
+        assert written == 5
+        assert mock_db_session.execute.call_count == 3
+        params = mock_db_session.execute.call_args_list[0].args[1]
+        assert [p["kb_id"] for p in params] == ["kb-000", "kb-001"]
+
+
+class TestHybridSearch:
+    """FULLTEXT + Vector Search ハイブリッド検索のテスト"""
+
+    def test_fuse_hybrid_rows(self):
+        """両方の候補に現れたドキュメントが上位になり、各側のスコアが引き継がれることを確認"""
+        # UNION ALLの結果順は保証されないため、順不同で与える
+        rows = [
+            ("kb-003", "田中様 記録", "本文3", "fulltext", 2.0),
+            ("kb-001", "記録1", "本文1", "vector", 0.1),
+            ("kb-002", "記録2", "本文2", "vector", 0.2),
+            ("kb-002", "記録2", "本文2", "fulltext", 5.0),
+        ]
+
+        results = fuse_hybrid_rows(rows, limit=10, vector_weight=1.0, fulltext_weight=1.0, rrf_k=0)
+
+        assert [r["id"] for r in results] == ["kb-002", "kb-001", "kb-003"]
+        assert results[0]["rrf_score"] == pytest.approx(1 / 2 + 1.0)
+        assert results[0]["similarity"] == pytest.approx(0.8)
+        assert results[0]["fulltext_score"] == 5.0
+        assert "fulltext_score" not in results[1]
+        assert "distance" not in results[2]
+        assert len(fuse_hybrid_rows(rows, limit=2)) == 2
+
+    @pytest.mark.asyncio
+    async def test_fulltext_only_hits_survive_fusion(self, mysql_client, mock_db_session, sample_query_vector):
+        """ベクトル側が上限件数を返しても、FULLTEXTのみの下位の候補が統合後に残ることを確認"""
+        vector_rows = [(f"kb-v{i:03d}", "記録", "本文", "vector", 0.01 * i) for i in range(100)]
+        fulltext_rows = [(f"kb-f{i:03d}", "田中様", "本文", "fulltext", 20.0 - i) for i in range(20)]
+        mock_db_session.execute.return_value.fetchall = MagicMock(return_value=vector_rows + fulltext_rows)
+
+        with patch(
+            "app.services.mysql_client.db_manager.get_session"
+        ) as mock_get_session:
+            mock_get_session.return_value.__aenter__.return_value = mock_db_session
+
+            results = await mysql_client.hybrid_search(
+                query_text="田中様", query_vector=sample_query_vector, limit=100, fulltext_limit=20
+            )
+
+        ids = {r["id"] for r in results}
+        assert len(results) == 120
+        assert {f"kb-f{i:03d}" for i in range(20)} <= ids
+
+    @pytest.mark.asyncio
+    async def test_hybrid_search_single_query(self, mysql_client, mock_db_session, sample_query_vector):
+        """FULLTEXT・ベクトル両方の候補を1回のクエリで取得することを確認"""
+        mock_db_session.execute.return_value.fetchall = MagicMock(return_value=[
+            ("kb-001", "記録1", "本文1", "vector", 0.1),
+            ("kb-001", "記録1", "本文1", "fulltext", 3.0),
+        ])
+
+        with patch(
+            "app.services.mysql_client.db_manager.get_session"
+        ) as mock_get_session:
+            mock_get_session.return_value.__aenter__.return_value = mock_db_session
+
+            results = await mysql_client.hybrid_search(
+                query_text="田中様", query_vector=sample_query_vector, filters={"user_id": "user-001"}
+            )
+
+        assert mock_db_session.execute.call_count == 1
+        sql, params = mock_db_session.execute.call_args.args
+        assert "MATCH(kb.title, kb.content, kb.tags)" in str(sql)
+        assert "UNION ALL" in str(sql)
+        assert params["query_text"] == "田中様"
+        assert params["user_id"] == "user-001"
+        assert [r["id"] for r in results] == ["kb-001"]
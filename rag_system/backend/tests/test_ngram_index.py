@@ -0,0 +1,99 @@
+"""
+文字n-gramインデックスの単体テスト
+
+テスト対象: app.utils.ngram_index, app.services.medical_terms
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.medical_terms import MedicalTermsService
+from app.utils.ngram_index import NgramIndex, char_ngrams, normalize_term, substring_edit_distance
+
+
+class TestNgramIndex:
+    """NgramIndex クラスのテスト"""
+
+    def test_normalize_kana(self):
+        """カタカナ・全角英数字が正規化されることを確認"""
+        assert normalize_term("インフルエンザ ＡＢＣ") == "いんふるえんざabc"
+        assert char_ngrams("熱") == {"熱"}
+
+    def test_search_typo(self):
+        """誤字を含むテキストに最も近い表記が上位になることを確認"""
+        index = NgramIndex([("インフルエンザ", "A"), ("インスリン", "B"), ("誤嚥性肺炎", "C")])
+
+        hits = index.search("いんふるえんさの症状", top_k=2, min_similarity=0.5)
+
+        assert index.values[hits[0][0]] == "A"
+        assert 0.5 <= hits[0][1] < 1.0
+
+    @pytest.mark.parametrize("text, expected", [
+        ("糖尿秒の管理", "糖尿病"),
+        ("高血厚", "高血圧"),
+        ("インシュリン注射", "インスリン"),
+        ("褥創の処置", "褥瘡"),
+    ])
+    def test_short_term_typo(self, text, expected):
+        """2〜3文字の用語の1文字誤り・カタカナ表記揺れが既定の類似度下限（0.6）を超えることを確認"""
+        index = NgramIndex([
+            ("糖尿病", "糖尿病"), ("高血圧", "高血圧"), ("インスリン", "インスリン"),
+            ("褥瘡", "褥瘡"), ("誤嚥性肺炎", "誤嚥性肺炎"),
+        ])
+
+        hits = index.search(text, top_k=1, min_similarity=0.6)
+
+        assert index.values[hits[0][0]] == expected
+        assert 0.6 <= hits[0][1] < 1.0
+
+    def test_substring_edit_distance(self):
+        """テキスト中の最も近い部分文字列との編集距離を確認"""
+        assert substring_edit_distance("糖尿病", "食後の糖尿病") == 0
+        assert substring_edit_distance("糖尿病", "糖尿秒") == 1
+        assert substring_edit_distance("いんすりん", "いんしゅりん") == 2
+        assert substring_edit_distance("褥瘡", "") == 2
+
+    def test_min_similarity(self):
+        """類似度の下限未満の表記は返さないことを確認"""
+        index = NgramIndex([("誤嚥性肺炎", "C")])
+
+        assert index.search("肺", min_similarity=0.5) == []
+        assert index.search("", min_similarity=0.0) == []
+
+
+class TestSuggestAlternativeTerms:
+    """MedicalTermsService.suggest_alternative_terms のテスト"""
+
+    @pytest.fixture
+    def service(self):
+        """医療用語辞書をモックしたサービス"""
+        client = MagicMock()
+        client.read_medical_terms.side_effect = lambda: [
+            {"canonical": "インフルエンザ", "synonyms": ["流行性感冒"], "frequency": 5},
+            {"canonical": "発熱", "synonyms": ["熱発"], "frequency": 10},
+        ]
+        with patch("app.services.medical_terms.get_spreadsheet_client", return_value=client):
+            yield MedicalTermsService()
+
+    def test_fuzzy_suggestion(self, service):
+        """完全一致が無い場合にn-gram類似用語を提案することを確認"""
+        suggestions = service.suggest_alternative_terms("いんふるえんさ 熱発")
+
+        assert [s["canonical"] for s in suggestions] == ["発熱", "インフルエンザ"]
+        assert suggestions[0]["similarity"] == 1.0
+        assert suggestions[1]["original"] == "インフルエンザ"
+
+    def test_index_built_once_per_dictionary(self, service):
+        """辞書が変わらない限りインデックスを再構築しないことを確認"""
+        service.suggest_alternative_terms("いんふるえんさ")
+        index = service._ngram_index
+        service.suggest_alternative_terms("いんふるえんさ")
+
+        assert service._ngram_index is index
+
+        service._terms_cache = None
+        service.load_terms()
+        service.suggest_alternative_terms("いんふるえんさ")
+
+        assert service._ngram_index is not index
@@ -0,0 +1,96 @@
+"""
+ベクトル量子化の単体テスト
+
+テスト対象: app.utils.quantization
+"""
+
+import numpy as np
+import pytest
+
+from app.utils.embedding_matrix import EmbeddingMatrix
+from app.utils.quantization import Int8VectorStore, recall_report
+
+
+@pytest.fixture
+def matrix():
+    """クラスタ構造を持つ正規化済みEmbedding行列（64次元 x 3000件）"""
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(30, 64))
+    vectors = centers[rng.integers(0, 30, size=3000)] + 0.5 * rng.normal(size=(3000, 64))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"kb-{i:05d}" for i in range(3000)]
+    return EmbeddingMatrix(ids, vectors.astype(np.float32))
+
+
+class TestInt8VectorStore:
+    """Int8VectorStore クラスのテスト"""
+
+    def test_memory_is_quarter_of_float32(self, matrix):
+        """コードのメモリ使用量がfloat32の約1/4であることを確認"""
+        store = Int8VectorStore.from_matrix(matrix)
+
+        assert store.codes.dtype == np.int8
+        assert store.nbytes < matrix.nbytes / 3.9
+
+    def test_rescored_scores_are_exact(self, matrix):
+        """再スコアリング後のスコアがフル精度のコサイン類似度と一致することを確認"""
+        store = Int8VectorStore.from_matrix(matrix)
+
+        hits = store.search(matrix.matrix[7], top_k=5)
+        exact = dict((matrix.ids[row], score) for row, score in matrix.search(matrix.matrix[7], top_k=50))
+
+        assert hits[0][0] == "kb-00007"
+        for doc_id, score in hits:
+            assert score == pytest.approx(exact[doc_id], abs=1e-5)
+
+    def test_recall_report(self, matrix):
+        """再スコアリングでrecallが向上し、十分な値になることを確認"""
+        store = Int8VectorStore.from_matrix(matrix, rescore_factor=4)
+
+        report = recall_report(store, matrix, matrix.matrix[::150], top_k=10)
+
+        assert report["queries"] == 20
+        assert report["recall"]["int8_rescored"] >= 0.95
+        assert report["recall"]["int8_rescored"] >= report["recall"]["int8"]
+        assert report["memory_mb"]["int8"] < report["memory_mb"]["float32"]
+
+    def test_lazy_full_precision_from_disk(self, matrix, tmp_path):
+        """フル精度ベクトルが初回再スコアリング時にmmapで読み込まれることを確認"""
+        path = tmp_path / "embeddings.npy"
+        np.save(path, matrix.matrix)
+
+        store = Int8VectorStore.from_matrix(matrix, full_precision_path=path)
+        assert store._full_precision is None
+
+        hits = store.search(matrix.matrix[100], top_k=3)
+
+        assert hits[0][0] == "kb-00100"
+        assert isinstance(store._full_precision, np.memmap)
+
+    def test_allowed_ids(self, matrix):
+        """allowed_ids で検索対象を絞り込めることを確認"""
+        store = Int8VectorStore.from_matrix(matrix, rescore_factor=50)
+
+        allowed = set(matrix.ids[:300].tolist())
+        hits = store.search(matrix.matrix[0], top_k=10, allowed_ids=allowed)
+
+        assert hits
+        assert all(doc_id in allowed for doc_id, _ in hits)
+
+    def test_filtered_search_matches_brute_force(self, matrix):
+        """フィルタ対象が少なくても、対象行内の厳密検索と同じ上位件数・結果になることを確認"""
+        from app.services.knowledge_snapshot import RowMaskFilter
+
+        store = Int8VectorStore.from_matrix(matrix, rescore_factor=4)
+        row_of = {doc_id: row for row, doc_id in enumerate(matrix.ids.tolist())}
+        mask = np.zeros(len(matrix), dtype=bool)
+        mask[::97] = True  # 約1%（ショートリスト外の行がほとんど）
+
+        query = matrix.matrix[5]
+        expected = [
+            matrix.ids[row] for row, _ in matrix.search(query, top_k=10, rows=np.flatnonzero(mask))
+        ]
+
+        for allowed in (RowMaskFilter(row_of, mask), set(matrix.ids[mask].tolist())):
+            hits = store.search(query, top_k=10, allowed_ids=allowed)
+            assert [doc_id for doc_id, _ in hits] == expected
@@ -7,9 +7,11 @@ RAG Engine V3 の単体テスト
 import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import numpy as np
 import pytest
 
 from app.services.rag_engine_v3 import RAGEngineV3
+from app.utils.ann_index import FlatIndex
 
 
 @pytest.fixture
@@ -61,8 +63,8 @@ def mock_mysql_client():
 def mock_reranker():
     """モック VertexAIRanker を返すフィクスチャ"""
     reranker = MagicMock()
-    # rerank メソッドは同期
-    reranker.rerank.return_value = [
+    # rerank_async メソッドは非同期
+    reranker.rerank_async = AsyncMock(return_value=[
         {
             "id": "kb-001",
             "title": "利用者状態変化記録",
@@ -77,7 +79,7 @@ def mock_reranker():
             "relevance_score": 0.92,
             "metadata": {"domain": "nursing"},
         },
-    ]
+    ])
     return reranker
 
 
@@ -89,12 +91,15 @@ def rag_engine_v3(
     with patch("app.services.rag_engine_v3.get_prompt_optimizer") as mock_get_optimizer, \
          patch("app.services.rag_engine_v3.get_vertex_ai_client") as mock_get_vertex, \
          patch("app.services.rag_engine_v3.get_mysql_client") as mock_get_mysql, \
-         patch("app.services.rag_engine_v3.VertexAIRanker") as mock_ranker_class:
+         patch("app.services.rag_engine_v3.VertexAIRanker") as mock_ranker_class, \
+         patch("app.services.rag_engine_v3.get_search_result_cache") as mock_get_cache:
 
         mock_get_optimizer.return_value = mock_prompt_optimizer
         mock_get_vertex.return_value = mock_vertex_ai_client
         mock_get_mysql.return_value = mock_mysql_client
         mock_ranker_class.return_value = mock_reranker
+        # 検索結果キャッシュは常にミス
+        mock_get_cache.return_value.get.return_value = None
 
         engine = RAGEngineV3()
         return engine
@@ -225,7 +230,7 @@ class TestSearch:
         assert result is not None
 
         # リランキングが top_k で呼ばれたことを確認
-        call_args = rag_engine_v3.reranker.rerank.call_args
+        call_args = rag_engine_v3.reranker.rerank_async.call_args
         assert call_args is not None
         assert call_args.kwargs.get("top_n") == top_k
 
@@ -244,7 +249,7 @@ class TestSearch:
         assert result["metrics"]["step4_results"] == 0
 
         # リランキングは呼ばれないことを確認
-        rag_engine_v3.reranker.rerank.assert_not_called()
+        rag_engine_v3.reranker.rerank_async.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_search_step1_error(self, rag_engine_v3):
@@ -295,7 +300,7 @@ class TestSearch:
     async def test_search_step4_error(self, rag_engine_v3):
         """Step 4 でエラーが発生した場合の動作を確認"""
         # リランキングでエラーを発生させる
-        rag_engine_v3.reranker.rerank.side_effect = Exception("Reranking failed")
+        rag_engine_v3.reranker.rerank_async.side_effect = Exception("Reranking failed")
 
         query = "テストクエリ"
 
@@ -305,6 +310,21 @@ class TestSearch:
         assert "Reranking failed" in str(exc_info.value)
 
 
+    @pytest.mark.asyncio
+    async def test_rerank_fallback_not_cached(self, rag_engine_v3, mock_reranker):
+        """リランキングのフォールバック結果はキャッシュせず、スコア付きの結果のみキャッシュすることを確認"""
+        # フィクスチャの結果には reranked フラグが無い（フォールバック時と同じ）
+        await rag_engine_v3.search(query="利用者の状態変化")
+        rag_engine_v3.result_cache.set.assert_not_called()
+
+        mock_reranker.rerank_async.return_value = [
+            {**doc, "rank_score": 0.9, "reranked": True}
+            for doc in mock_reranker.rerank_async.return_value
+        ]
+        await rag_engine_v3.search(query="利用者の状態変化")
+        rag_engine_v3.result_cache.set.assert_called_once()
+
+
 class TestSearchPipeline:
     """4ステップパイプラインの詳細テスト"""
 
@@ -358,7 +378,7 @@ class TestSearchPipeline:
         await rag_engine_v3.search(query=query)
 
         # リランキングが正しいパラメータで呼ばれたことを確認
-        call_args = rag_engine_v3.reranker.rerank.call_args
+        call_args = rag_engine_v3.reranker.rerank_async.call_args
         assert call_args is not None
         assert call_args.kwargs["query"] == "最適化されたクエリ: 利用者の状態変化について教えてください"
         assert len(call_args.kwargs["documents"]) == 2
@@ -509,6 +529,142 @@ class TestPerformance:
         assert metrics["step4_duration"] < 1.0  # リランキング
 
 
+class TestTwoPhaseSearch:
+    """2段階検索（ID・本文のみで候補取得 → 最終結果のみ全カラム取得）のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_two_phase_hydrates_final_results(self, rag_engine_v3):
+        """候補は vector_search_compact で取得し、最終結果のみ一括取得することを確認"""
+        rag_engine_v3.two_phase_search = True
+        rag_engine_v3.mysql_client.vector_search_compact = AsyncMock(return_value=[
+            {"id": "kb-001", "title": "利用者状態変化記録", "content": "利用者の状態が改善しました",
+             "distance": 0.1, "similarity": 0.9},
+            {"id": "kb-002", "title": "バイタルサイン記録", "content": "体温37.2度、血圧120/80",
+             "distance": 0.2, "similarity": 0.8},
+        ])
+        rag_engine_v3.mysql_client.get_documents_by_ids = AsyncMock(return_value={
+            "kb-001": {"id": "kb-001", "title": "利用者状態変化記録", "content": "利用者の状態が改善しました",
+                       "structured_data": {"status": "改善"}, "metadata": {"domain": "nursing"}},
+        })
+
+        result = await rag_engine_v3.search(query="利用者の状態変化")
+
+        rag_engine_v3.mysql_client.vector_search.assert_not_called()
+        rag_engine_v3.mysql_client.get_documents_by_ids.assert_awaited_once_with(["kb-001", "kb-002"])
+
+        # 2段階検索の間に削除されたドキュメント（kb-002）は除外
+        assert [r["id"] for r in result["results"]] == ["kb-001"]
+        assert result["results"][0]["structured_data"] == {"status": "改善"}
+        assert result["results"][0]["relevance_score"] == 0.98
+
+    @pytest.mark.asyncio
+    async def test_single_phase_parses_json_lazily(self, rag_engine_v3):
+        """1段階検索ではJSONカラムを未パースで取得し、最終結果のみパースすることを確認"""
+        rag_engine_v3.reranker.rerank_async = AsyncMock(return_value=[
+            {"id": "kb-001", "title": "記録", "content": "本文", "structured_data": '{"a": 1}', "metadata": None},
+        ])
+
+        result = await rag_engine_v3.search(query="利用者の状態変化")
+
+        assert rag_engine_v3.mysql_client.vector_search.call_args.kwargs["parse_json"] is False
+        assert result["results"][0]["structured_data"] == {"a": 1}
+
+
+class TestHybridSearch:
+    """FULLTEXT + Vector Search ハイブリッド検索のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_hybrid_uses_original_query_and_hydrates(self, rag_engine_v3):
+        """FULLTEXTには元のクエリを使い、最終結果のみ全カラムを取得することを確認"""
+        rag_engine_v3.hybrid_search = True
+        rag_engine_v3.mysql_client.hybrid_search = AsyncMock(return_value=[
+            {"id": "kb-001", "title": "利用者状態変化記録", "content": "利用者の状態が改善しました",
+             "fulltext_score": 3.0, "rrf_score": 0.02},
+        ])
+        rag_engine_v3.mysql_client.get_documents_by_ids = AsyncMock(return_value={
+            "kb-001": {"id": "kb-001", "title": "利用者状態変化記録", "content": "利用者の状態が改善しました",
+                       "structured_data": {"status": "改善"}, "metadata": {"domain": "nursing"}},
+        })
+
+        result = await rag_engine_v3.search(query="田中様の状態変化", client_id="user-001")
+
+        rag_engine_v3.mysql_client.vector_search.assert_not_called()
+        kwargs = rag_engine_v3.mysql_client.hybrid_search.call_args.kwargs
+        assert kwargs["query_text"] == "田中様の状態変化"
+        assert kwargs["filters"] == {"user_id": "user-001"}
+        assert [r["id"] for r in result["results"]] == ["kb-001"]
+        assert result["results"][0]["structured_data"] == {"status": "改善"}
+
+
+class TestLocalIndexBackend:
+    """インプロセスANNインデックス（local_index）のテスト"""
+
+    @pytest.fixture
+    def local_engine(self, rag_engine_v3):
+        """ドメイン nursing が2割（60件）の300件のFlatインデックスを使うエンジン"""
+        vectors = np.random.default_rng(0).normal(size=(300, 2048)).astype(np.float32)
+        ids = [f"kb-{i:03d}" for i in range(300)]
+        domains = {doc_id: "nursing" if i % 5 == 0 else "care" for i, doc_id in enumerate(ids)}
+
+        rag_engine_v3.dense_backend = "local_index"
+        rag_engine_v3.vector_search_limit = 50
+        rag_engine_v3.dense_index_service = MagicMock()
+        rag_engine_v3.dense_index_service.get_index.return_value = FlatIndex.build(ids, vectors)
+        rag_engine_v3.mysql_client.get_ids_by_domain = AsyncMock(
+            side_effect=lambda domain: [doc_id for doc_id, d in domains.items() if d == domain]
+        )
+        rag_engine_v3.mysql_client.get_documents_by_ids = AsyncMock(side_effect=lambda doc_ids, filters=None, parse_json=True: {
+            doc_id: {"id": doc_id, "domain": domains[doc_id], "title": "記録", "content": "本文"}
+            for doc_id in doc_ids
+            if not filters or domains[doc_id] == filters.get("domain", domains[doc_id])
+        })
+        return rag_engine_v3
+
+    @pytest.mark.asyncio
+    async def test_domain_filter_applied_before_top_k(self, local_engine):
+        """ドメインのID集合をTop-K選択前に適用し、上限件数の候補を得ることを確認"""
+        candidates = await local_engine._local_index_search([0.1] * 2048, {"domain": "nursing"})
+
+        assert len(candidates) == 50
+        assert all(c["domain"] == "nursing" for c in candidates)
+
+        await local_engine._local_index_search([0.2] * 2048, {"domain": "nursing"})
+        local_engine.mysql_client.get_ids_by_domain.assert_awaited_once_with("nursing")
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_filtered_candidates_short(self, local_engine):
+        """MySQL側の絞り込みで候補が不足した場合はNone（MySQL Vector Search）を返すことを確認"""
+        local_engine.mysql_client.get_documents_by_ids = AsyncMock(return_value={})
+
+        assert await local_engine._local_index_search([0.1] * 2048, {"domain": "nursing"}) is None
+
+
+class TestVectorStoreBackend:
+    """VectorStore経由のVector Searchのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_vector_store_search_and_cache_rehydration(self, rag_engine_v3):
+        """候補取得・キャッシュ再構築がMySQLではなくVectorStoreを使うことを確認"""
+        store = MagicMock()
+        store.search = AsyncMock(return_value=[
+            {"id": "kb-001", "title": "利用者状態変化記録", "content": "利用者の状態が改善しました",
+             "structured_data": {"status": "改善"}, "similarity": 0.9},
+        ])
+        store.get_many = AsyncMock(return_value={})
+        rag_engine_v3.vector_store = store
+
+        result = await rag_engine_v3.search(query="利用者の状態変化", domain="nursing")
+
+        rag_engine_v3.mysql_client.vector_search.assert_not_called()
+        store.search.assert_awaited_once()
+        assert store.search.call_args.kwargs["filters"] == {"domain": "nursing"}
+        assert result["results"][0]["id"] == "kb-001"
+
+        docs = await rag_engine_v3._documents_by_ids(["kb-001"])
+        store.get_many.assert_awaited_once_with(["kb-001"])
+        assert docs == {}
+
+
 class TestGetRAGEngineV3:
     """get_rag_engine_v3 シングルトン取得のテスト"""
 
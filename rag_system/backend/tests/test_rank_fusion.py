@@ -0,0 +1,81 @@
+"""
+Reciprocal Rank Fusion の単体テスト
+
+テスト対象: app.utils.rank_fusion
+"""
+
+import numpy as np
+import pytest
+
+from app.utils.rank_fusion import RankedList, reciprocal_rank_fusion
+
+
+def naive_rrf(lists, k=60):
+    """辞書とソートによる素朴なRRF（比較用）"""
+    scores = {}
+    for ids, weight in lists:
+        seen = set()
+        for rank, doc_id in enumerate(ids):
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank + 1)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+
+class TestReciprocalRankFusion:
+    """reciprocal_rank_fusion のテスト"""
+
+    def test_matches_naive(self):
+        """N個のリストの統合スコアが素朴な実装と一致することを確認"""
+        rng = np.random.default_rng(0)
+        lists = [(rng.permutation(200)[:50], weight) for weight in (0.3, 0.7, 0.5)]
+
+        fused = reciprocal_rank_fusion([RankedList(ids, weight) for ids, weight in lists], k=60)
+        expected = naive_rrf(lists)
+
+        assert fused.total == len(expected)
+        assert fused.scores.tolist() == pytest.approx([score for _, score in expected])
+        assert dict(zip(fused.ids.tolist(), fused.scores.tolist())) == pytest.approx(dict(expected))
+
+    def test_top_k_heap(self):
+        """top_k 指定時は上位K件のみ返し、全件統合の先頭と一致することを確認"""
+        rng = np.random.default_rng(1)
+        lists = [RankedList(rng.permutation(500)[:300], 1.0) for _ in range(2)]
+
+        full = reciprocal_rank_fusion(lists)
+        top = reciprocal_rank_fusion(lists, top_k=10)
+
+        assert len(top) == 10
+        assert top.total == full.total
+        assert top.ids.tolist() == full.ids[:10].tolist()
+        assert np.array_equal(top.contributions, full.contributions[:, :10])
+
+    def test_contributions_and_scores(self):
+        """リストごとのRRF寄与と元スコアが統合結果に引き継がれることを確認"""
+        fused = reciprocal_rank_fusion(
+            [
+                RankedList([7, 3], 1.0, scores=[9.0, 4.0], name="bm25"),
+                RankedList([3, 5], 2.0, name="dense"),
+            ],
+            k=0
+        )
+
+        assert fused.ids.tolist() == [3, 7, 5]
+        assert fused.scores.tolist() == pytest.approx([1 / 2 + 2.0, 1.0, 1.0])
+        assert fused.contributions[0].tolist() == pytest.approx([1 / 2, 1.0, 0.0])
+        assert fused.list_scores[0].tolist()[:2] == [4.0, 9.0]
+        assert np.isnan(fused.list_scores[0][2])
+        assert np.isnan(fused.list_scores[1]).all()
+
+    def test_tie_break_and_duplicates(self):
+        """同点は先に現れたIDを優先し、リスト内の重複は最上位のみ使用することを確認"""
+        fused = reciprocal_rank_fusion([RankedList([4, 2], 1.0), RankedList([2, 4], 1.0)])
+
+        assert fused.ids.tolist() == [4, 2]
+        assert fused.scores[0] == pytest.approx(fused.scores[1])
+
+        duplicated = reciprocal_rank_fusion([RankedList([4, 4, 2], 1.0)], k=0)
+
+        assert duplicated.scores.tolist() == pytest.approx([1.0, 1 / 3])
+        assert reciprocal_rank_fusion([]).total == 0
@@ -0,0 +1,160 @@
+"""
+Re-rankingサービスの単体テスト
+
+テスト対象: app.services.reranker
+"""
+
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.cache_service import CacheService
+from app.services.reranker import VertexAIRanker, is_fully_reranked
+
+
+@pytest.fixture
+def ranker():
+    """Ranking APIクライアントをモックした VertexAIRanker"""
+    with patch("app.services.reranker.default", return_value=(MagicMock(), "test-project")), \
+         patch("app.services.reranker.discoveryengine.RankServiceClient") as mock_client_class:
+        mock_client_class.return_value = MagicMock()
+        ranker = VertexAIRanker()
+        # テストごとに独立したメモ化キャッシュを使用
+        ranker.cache = CacheService(max_size=100)
+        yield ranker
+
+
+@pytest.fixture
+def documents():
+    """サンプル候補ドキュメント"""
+    return [
+        {"id": f"kb-{i:03d}", "title": f"記録{i}", "content": f"内容{i}"}
+        for i in range(5)
+    ]
+
+
+def ranked_response(*pairs):
+    """Ranking APIのレスポンスを模倣"""
+    return SimpleNamespace(
+        records=[SimpleNamespace(id=doc_id, score=score) for doc_id, score in pairs]
+    )
+
+
+class TestRerankAsync:
+    """rerank_async メソッドのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_maps_results_by_id(self, ranker, documents):
+        """レスポンスのIDで元ドキュメントに対応付けられることを確認"""
+        ranker.client.rank.return_value = ranked_response(("kb-003", 0.9), ("kb-000", 0.5), ("unknown", 0.1))
+
+        results = await ranker.rerank_async("発熱", documents, top_n=3)
+
+        assert [doc["id"] for doc in results] == ["kb-003", "kb-000"]
+        assert results[0]["rank_score"] == 0.9
+        assert results[0]["reranked"] is True
+        assert results[0]["content"] == "内容3"
+
+    @pytest.mark.asyncio
+    async def test_timeout_falls_back(self, ranker, documents):
+        """タイムアウト時は元の順序にフォールバックすることを確認"""
+        ranker.client.rank.side_effect = lambda *args, **kwargs: time.sleep(0.5)
+
+        with patch("app.services.reranker.settings.reranker_timeout", 0.05):
+            results = await ranker.rerank_async("発熱", documents, top_n=2)
+
+        assert results == documents[:2]
+
+    @pytest.mark.asyncio
+    async def test_too_many_documents(self, ranker):
+        """チャンク分割が無効で200件を超える場合はValueErrorを送出することを確認"""
+        documents = [{"id": str(i)} for i in range(201)]
+
+        with patch("app.services.reranker.settings.reranker_max_chunks", 1):
+            with pytest.raises(ValueError):
+                await ranker.rerank_async("発熱", documents)
+
+
+class TestRerankMemoization:
+    """リランキング結果メモ化のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_same_candidates_hit_memo(self, ranker, documents):
+        """同一クエリ・同一候補の場合はAPIを再実行しないことを確認"""
+        ranker.client.rank.return_value = ranked_response(("kb-001", 0.8), ("kb-004", 0.6))
+
+        first = await ranker.rerank_async("発熱", documents, top_n=2)
+        second = await ranker.rerank_async("発熱", documents, top_n=2)
+        third = ranker.rerank("発熱", documents, top_n=2)
+
+        assert ranker.client.rank.call_count == 1
+        assert first == second == third
+
+    @pytest.mark.asyncio
+    async def test_changed_content_misses_memo(self, ranker, documents):
+        """候補の本文・順序・クエリが変わった場合はAPIを再実行することを確認"""
+        ranker.client.rank.return_value = ranked_response(("kb-001", 0.8))
+
+        await ranker.rerank_async("発熱", documents, top_n=2)
+
+        updated = [dict(doc) for doc in documents]
+        updated[1]["content"] = "更新後の内容"
+        await ranker.rerank_async("発熱", updated, top_n=2)
+        await ranker.rerank_async("発熱", list(reversed(documents)), top_n=2)
+        await ranker.rerank_async("血圧", documents, top_n=2)
+
+        assert ranker.client.rank.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_failure_not_memoized(self, ranker, documents):
+        """API失敗時のフォールバック結果はメモ化しないことを確認"""
+        ranker.client.rank.side_effect = [Exception("unavailable"), ranked_response(("kb-002", 0.7))]
+
+        fallback = await ranker.rerank_async("発熱", documents, top_n=2)
+        results = await ranker.rerank_async("発熱", documents, top_n=2)
+
+        assert fallback == documents[:2]
+        assert [doc["id"] for doc in results] == ["kb-002"]
+        assert not is_fully_reranked(fallback)
+        assert is_fully_reranked(results)
+
+
+class TestChunkedRerank:
+    """200件超のチャンク分割リランキングのテスト"""
+
+    @pytest.fixture
+    def large_documents(self):
+        """450件の候補ドキュメント"""
+        return [{"id": f"kb-{i:03d}", "title": "", "content": ""} for i in range(450)]
+
+    @staticmethod
+    def score_by_id(request, timeout=None):
+        """IDの数値が大きいほど高スコアを返すモックAPI"""
+        return ranked_response(*sorted(
+            ((record.id, int(record.id[3:]) / 1000) for record in request.records),
+            key=lambda pair: pair[1],
+            reverse=True
+        )[:request.top_n])
+
+    @pytest.mark.asyncio
+    async def test_merges_chunks_by_score(self, ranker, large_documents):
+        """チャンクごとの結果がスコア順にマージされることを確認"""
+        ranker.client.rank.side_effect = self.score_by_id
+
+        results = await ranker.rerank_async("発熱", large_documents, top_n=5)
+
+        assert ranker.client.rank.call_count == 3
+        assert [doc["id"] for doc in results] == ["kb-449", "kb-448", "kb-447", "kb-446", "kb-445"]
+
+    @pytest.mark.asyncio
+    async def test_chunk_budget(self, ranker, large_documents):
+        """最大チャンク数を超えた候補は切り捨てられることを確認"""
+        ranker.client.rank.side_effect = self.score_by_id
+
+        with patch("app.services.reranker.settings.reranker_max_chunks", 2):
+            results = await ranker.rerank_async("発熱", large_documents, top_n=3)
+
+        assert ranker.client.rank.call_count == 2
+        assert [doc["id"] for doc in results] == ["kb-399", "kb-398", "kb-397"]
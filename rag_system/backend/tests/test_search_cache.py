@@ -0,0 +1,62 @@
+"""
+検索結果キャッシュの単体テスト
+
+テスト対象: app.services.search_cache
+"""
+
+import pytest
+
+from app.services.cache_service import CacheService
+from app.services.search_cache import SearchResultCache, normalize_query
+
+
+@pytest.fixture
+def result_cache():
+    """独立したCacheServiceを使う SearchResultCache"""
+    cache = SearchResultCache()
+    cache.cache = CacheService(max_size=100)
+    return cache
+
+
+class TestSearchResultCache:
+    """SearchResultCache クラスのテスト"""
+
+    def test_key_normalization(self):
+        """表記ゆれ（全角・大文字・空白）が同じキーになることを確認"""
+        assert normalize_query("  直近の　変化 ＡＤＬ ") == "直近の 変化 adl"
+
+        key = SearchResultCache.make_key("v2", "直近の変化", "nursing", "C001", 10)
+        assert key == SearchResultCache.make_key("v2", " 直近の変化", "nursing", "C001", 10)
+        assert key != SearchResultCache.make_key("v3", "直近の変化", "nursing", "C001", 10)
+        assert key != SearchResultCache.make_key("v2", "直近の変化", "nursing", "C002", 10)
+        assert key != SearchResultCache.make_key("v2", "直近の変化", "nursing", "C001", 20)
+
+    def test_stores_scores_and_rehydrates(self, result_cache):
+        """ID・スコアのみを保存し、現在の本文で再構築することを確認"""
+        results = [
+            {"id": "kb-1", "content": "旧本文", "rank_score": 0.9, "reranked": True},
+            {"id": "kb-2", "content": "本文2", "rank_score": 0.7, "reranked": True},
+        ]
+        result_cache.set("key", results, extra={"suggested_terms": ["発熱"]})
+
+        entry = result_cache.get("key")
+        assert entry["hits"][0] == {"id": "kb-1", "scores": {"rank_score": 0.9, "reranked": True}}
+        assert entry["extra"] == {"suggested_terms": ["発熱"]}
+
+        current = {"kb-1": {"id": "kb-1", "content": "新本文"}, "kb-2": {"id": "kb-2", "content": "本文2"}}
+        rehydrated = result_cache.rehydrate(entry, current)
+
+        assert [doc["content"] for doc in rehydrated] == ["新本文", "本文2"]
+        assert rehydrated[0]["rank_score"] == 0.9
+
+    def test_deleted_document_is_miss(self, result_cache):
+        """ドキュメントが削除済みの場合は再構築しないことを確認"""
+        result_cache.set("key", [{"id": "kb-1", "rank_score": 0.9}])
+
+        assert result_cache.rehydrate(result_cache.get("key"), {}) is None
+
+    def test_empty_results_not_cached(self, result_cache):
+        """空の結果はキャッシュしないことを確認"""
+        result_cache.set("key", [])
+
+        assert result_cache.get("key") is None
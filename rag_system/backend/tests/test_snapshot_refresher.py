@@ -0,0 +1,126 @@
+"""
+スナップショット バックグラウンド更新の単体テスト
+
+テスト対象: app.services.snapshot_refresher
+"""
+
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.cache_service import CacheService
+from app.services.knowledge_snapshot import KnowledgeSnapshotService
+from app.services.snapshot_refresher import SnapshotRefresher
+from app.utils.embedding_matrix import EmbeddingMatrix
+
+
+def make_records(version: int):
+    """サンプルKnowledgeBaseレコード"""
+    return [
+        {"id": f"kb-{i}", "domain": "nursing", "user_id": "", "source_id": "",
+         "title": f"記録{version}", "content": f"内容{i}"}
+        for i in range(3)
+    ]
+
+
+def make_matrix():
+    """サンプルEmbedding行列"""
+    rng = np.random.default_rng(0)
+    return EmbeddingMatrix.from_records(
+        [{"kb_id": f"kb-{i}", "embedding": rng.normal(size=4).tolist()} for i in range(3)],
+        dimension=4
+    )
+
+
+@pytest.fixture
+def cache():
+    """テスト専用のキャッシュ"""
+    return CacheService(max_size=100)
+
+
+@pytest.fixture
+def spreadsheet_client(cache):
+    """キャッシュ経由でKnowledgeBaseを返すSpreadsheetClientのモック"""
+    client = MagicMock()
+    client._fetch_knowledge_base.return_value = make_records(2)
+    client._build_embedding_matrix.return_value = make_matrix()
+    client.read_knowledge_base.side_effect = lambda: cache.get("vector_db", "knowledge_base_limit_None")
+    return client
+
+
+@pytest.fixture
+def refresher(cache, spreadsheet_client):
+    """モックを注入したSnapshotRefresher"""
+    with patch("app.services.knowledge_snapshot.get_spreadsheet_client", return_value=spreadsheet_client):
+        snapshot_service = KnowledgeSnapshotService()
+
+    dense_index_service = MagicMock()
+    dense_index_service.enabled = False
+
+    with patch("app.services.snapshot_refresher.get_cache_service", return_value=cache), \
+         patch("app.services.snapshot_refresher.get_spreadsheet_client", return_value=spreadsheet_client), \
+         patch("app.services.snapshot_refresher.get_knowledge_snapshot_service", return_value=snapshot_service), \
+         patch("app.services.snapshot_refresher.get_dense_index_service", return_value=dense_index_service):
+        yield SnapshotRefresher()
+
+
+class TestSnapshotRefresher:
+    """SnapshotRefresher クラスのテスト"""
+
+    def test_refresh_installs_snapshot(self, refresher, cache):
+        """更新後のスナップショットとキャッシュが揃って差し替わることを確認"""
+        stale_records = make_records(1)
+        cache.set("vector_db", "knowledge_base_limit_None", stale_records, 60)
+        stale_snapshot = refresher.snapshot_service.get_snapshot()
+
+        assert refresher.refresh() is True
+
+        snapshot = refresher.snapshot_service.get_snapshot()
+        assert snapshot is not stale_snapshot
+        assert snapshot.records[0]["title"] == "記録2"
+        assert cache.get("vector_db", "embedding_matrix") is not None
+        assert refresher.status()["records"] == 3
+        assert not refresher.is_stale()
+
+    def test_refresh_failure_keeps_previous(self, refresher, cache, spreadsheet_client):
+        """更新に失敗した場合は直前のスナップショットを提供し続けることを確認"""
+        refresher.refresh()
+        previous = refresher.snapshot_service.get_snapshot()
+
+        spreadsheet_client._fetch_knowledge_base.side_effect = RuntimeError("Sheets API error")
+
+        assert refresher.refresh() is False
+        assert refresher.snapshot_service.get_snapshot() is previous
+        assert refresher.status()["last_error"] == "Sheets API error"
+        assert refresher.status()["failure_count"] == 1
+
+    def test_stale_after_max_age(self, refresher):
+        """最後の更新から snapshot_max_stale を超えると古いと判定されることを確認"""
+        assert not refresher.is_stale()
+
+        refresher.refresh()
+        refresher.last_refresh_at -= 10 ** 7
+
+        assert refresher.is_stale()
+
+    def test_dense_index_published_with_snapshot(self, refresher, cache):
+        """Denseインデックスは構築時には公開されず、スナップショットと同時に公開されることを確認"""
+        dense_index_service = refresher.dense_index_service
+        dense_index_service.enabled = True
+        index = object()
+
+        def build_index(matrix):
+            # 構築中はまだ旧スナップショット・旧行列のまま
+            assert cache.get("vector_db", "embedding_matrix") is None
+            dense_index_service.install.assert_not_called()
+            return index
+
+        dense_index_service.build_index.side_effect = build_index
+
+        assert refresher.refresh() is True
+
+        matrix = cache.get("vector_db", "embedding_matrix")
+        dense_index_service.install.assert_called_once_with(matrix, index)
+        assert refresher.snapshot_service.current.dense_index_for(matrix) is index
+        assert refresher.snapshot_service.current.dense_index_for(make_matrix()) is None
@@ -0,0 +1,44 @@
+"""
+ベクトルのバイナリ変換の単体テスト
+
+テスト対象: app.utils.vector_codec
+"""
+
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from app.utils.vector_codec import encode_vector_param, pack_vector, unpack_vector, vector_param_sql
+
+
+class TestVectorCodec:
+    """pack_vector / unpack_vector のテスト"""
+
+    def test_little_endian_float32(self):
+        """リトルエンディアンfloat32の連結になることを確認"""
+        data = pack_vector([1.0, -0.5, 0.25])
+
+        assert data == struct.pack("<3f", 1.0, -0.5, 0.25)
+        assert len(pack_vector([0.1] * 2048)) == 2048 * 4
+
+    def test_round_trip(self):
+        """バイナリから元のベクトルに戻せることを確認"""
+        vector = [0.1 * i for i in range(16)]
+
+        assert unpack_vector(pack_vector(vector)) == pytest.approx(vector, abs=1e-6)
+
+    def test_dimension_mismatch(self):
+        """期待する次元数と異なる場合はValueErrorを送出することを確認"""
+        with pytest.raises(ValueError):
+            pack_vector([0.1] * 100, dimension=2048)
+
+    def test_param_formats(self):
+        """バインド形式ごとのパラメータ・SQL式を確認"""
+        vector = np.array([1.0, -0.5], dtype=np.float32)
+
+        assert encode_vector_param(vector, "binary") == pack_vector(vector)
+        assert json.loads(encode_vector_param(vector, "json")) == [1.0, -0.5]
+        assert vector_param_sql("%s", "binary", 2048) == "%s"
+        assert vector_param_sql(":embedding", "json", 2048) == "CAST(:embedding AS VECTOR(2048))"